@@ -0,0 +1,111 @@
+"""
+Async HTTP server for the dashboard in ``templates/index.html``.
+
+Serves the page and the JSON endpoints it calls from the payloads that
+project.py precomputes with ``dashboard_artifacts.write_dashboard_artifacts``:
+
+* ``GET /api/volatility/<ticker>``
+* ``GET /api/prices/<ticker>``
+* ``GET /api/statistics``
+* ``GET /api/correlations``
+
+Every response comes from ``ArtifactStore`` memory, gzip-encoded when the
+client accepts it, with ``ETag`` / ``Last-Modified`` so revalidations are
+answered with 304 and no body. Nothing is computed per request, so one
+event loop on one core keeps up with many concurrent dashboard users.
+
+    python api_server.py --port 5000
+"""
+import argparse
+import os
+from typing import Optional
+
+from aiohttp import web  # type: ignore
+
+from dashboard_artifacts import DEFAULT_ARTIFACT_DIR, ArtifactStore, Payload
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+STORE_KEY = web.AppKey('store', ArtifactStore)
+
+
+def _not_modified(request: web.Request, payload: Payload) -> bool:
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return payload.etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = request.headers.get('If-Modified-Since')
+    return if_modified_since is not None and if_modified_since == payload.last_modified
+
+
+def respond(request: web.Request, payload: Optional[Payload], content_type: str = 'application/json') -> web.Response:
+    """
+    ``payload`` as a cacheable response, 304 when the client's copy is
+    current, 404 when there is no payload.
+    """
+    if payload is None:
+        raise web.HTTPNotFound(text='{"error":"not found"}', content_type='application/json')
+    headers = {
+        'ETag': payload.etag,
+        'Last-Modified': payload.last_modified,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+    }
+    if _not_modified(request, payload):
+        return web.Response(status=304, headers=headers)
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        headers['Content-Encoding'] = 'gzip'
+        return web.Response(body=payload.gzipped, content_type=content_type, headers=headers)
+    return web.Response(body=payload.body, content_type=content_type, headers=headers)
+
+
+async def volatility(request: web.Request) -> web.Response:
+    return respond(request, request.app[STORE_KEY].get('volatility', request.match_info['ticker']))
+
+
+async def prices(request: web.Request) -> web.Response:
+    return respond(request, request.app[STORE_KEY].get('prices', request.match_info['ticker']))
+
+
+async def statistics(request: web.Request) -> web.Response:
+    return respond(request, request.app[STORE_KEY].get('statistics'))
+
+
+async def correlations(request: web.Request) -> web.Response:
+    return respond(request, request.app[STORE_KEY].get('correlations'))
+
+
+async def index(request: web.Request) -> web.Response:
+    store = request.app[STORE_KEY]
+    payload = store.cached('index.html')
+    if payload is None:
+        import jinja2  # type: ignore
+
+        environment = jinja2.Environment(loader=jinja2.FileSystemLoader(TEMPLATE_DIR), autoescape=True)
+        html = environment.get_template('index.html').render(tickers=store.tickers())
+        payload = store.add('index.html', html.encode())
+    return respond(request, payload, content_type='text/html')
+
+
+def create_app(artifact_dir: str = DEFAULT_ARTIFACT_DIR, check_interval: float = 1.0) -> web.Application:
+    app = web.Application()
+    app[STORE_KEY] = ArtifactStore(artifact_dir, check_interval)
+    app.router.add_get('/', index)
+    app.router.add_get('/api/volatility/{ticker}', volatility)
+    app.router.add_get('/api/prices/{ticker}', prices)
+    app.router.add_get('/api/statistics', statistics)
+    app.router.add_get('/api/correlations', correlations)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--artifacts', default=DEFAULT_ARTIFACT_DIR,
+                        help="directory written by project.py (default: %(default)s)")
+    args = parser.parse_args()
+    web.run_app(create_app(args.artifacts), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
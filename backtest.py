@@ -0,0 +1,229 @@
+"""
+Walk-forward backtest of the snapshot GCN + GAT model.
+
+The sample is cut into consecutive test blocks. Before each block the model
+is refit on everything before it (``expanding``) or on the last ``window``
+days (``rolling``) and then forecasts the block out of sample. One
+``SnapshotDataset`` over the whole panel serves every fold through index
+lists, so the realized volatility tensor and the (cached, memory-mapped)
+dynamic spillover graphs are built once and shared.
+
+Refits are warm-started: a fold starts from the previous fold's weights and
+Adam state and only trains ``refit_epochs``, which is what makes daily
+refits over many years affordable. Folds are grouped into contiguous
+chains; a chain warm-starts internally, and chains are independent, so
+they run in parallel worker processes.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import torch  # type: ignore
+import torch.multiprocessing as mp  # type: ignore
+
+from metrics import forecast_metrics
+from models import GCN_GAT_Model
+from snapshots import SnapshotDataset, snapshot_loader, snapshot_predictions, train_snapshots
+
+
+class Fold(NamedTuple):
+    index: int
+    # Half-open row ranges of the volatility panel (target rows of the snapshots)
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+class FoldResult(NamedTuple):
+    fold: Fold
+    predictions: np.ndarray
+    train_losses: List[float]
+
+
+class BacktestResult(NamedTuple):
+    predictions: pd.DataFrame
+    actuals: pd.DataFrame
+    folds: pd.DataFrame
+    metrics: pd.DataFrame
+
+
+def walk_forward_folds(
+    num_rows: int,
+    initial_train: int,
+    test_size: int = 21,
+    mode: str = 'expanding',
+    window: Optional[int] = None,
+    start: int = 0,
+) -> List[Fold]:
+    """
+    Consecutive test blocks of ``test_size`` rows after the first
+    ``initial_train`` rows (counted from ``start``). ``rolling`` keeps the
+    last ``window`` rows (default ``initial_train``) for training.
+    """
+    if mode not in ('expanding', 'rolling'):
+        raise ValueError(f"unknown walk-forward mode: {mode}")
+    window = window or initial_train
+    folds = []
+    test_start = start + initial_train
+    while test_start < num_rows:
+        test_end = min(test_start + test_size, num_rows)
+        train_start = start if mode == 'expanding' else max(start, test_start - window)
+        folds.append(Fold(len(folds), train_start, test_start, test_start, test_end))
+        test_start = test_end
+    return folds
+
+
+def split_chains(folds: Sequence[Fold], num_chains: int) -> List[List[Fold]]:
+    """
+    ``num_chains`` contiguous, roughly equal runs of folds.
+    """
+    num_chains = max(1, min(num_chains, len(folds)))
+    bounds = np.linspace(0, len(folds), num_chains + 1).round().astype(int)
+    return [list(folds[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def _snapshot_indices(dataset: SnapshotDataset, lo: int, hi: int) -> List[int]:
+    # Snapshots whose target row falls in [lo, hi)
+    first_target = dataset.target_row(0)
+    return list(range(max(0, lo - first_target), max(0, min(len(dataset), hi - first_target))))
+
+
+def run_chain(
+    dataset: SnapshotDataset,
+    chain: Sequence[Fold],
+    params: Tuple[Any, ...],
+    initial_epochs: int = 50,
+    refit_epochs: int = 5,
+    batch_size: int = 64,
+    warm_start: bool = True,
+    seed: Optional[int] = None,
+) -> List[FoldResult]:
+    """
+    Fit and forecast every fold of ``chain`` in order.
+    """
+    hidden_dim, num_heads, num_layers, lr, dropout_rate = params
+    if seed is not None:
+        torch.manual_seed(seed + chain[0].index)
+
+    model: Optional[torch.nn.Module] = None
+    optimizer: Optional[torch.optim.Optimizer] = None
+    results = []
+    for fold in chain:
+        train_indices = _snapshot_indices(dataset, fold.train_start, fold.train_end)
+        test_indices = _snapshot_indices(dataset, fold.test_start, fold.test_end)
+        if not test_indices:
+            continue
+
+        epochs = refit_epochs
+        if model is None or not warm_start:
+            model = GCN_GAT_Model(dataset.lookback, hidden_dim, num_heads, num_layers,
+                                  dropout_p=dropout_rate, output_dim=1)
+            optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+            epochs = initial_epochs
+
+        train_losses: List[float] = []
+        if train_indices:
+            train_loader = snapshot_loader(dataset, batch_size=batch_size, shuffle=True, indices=train_indices)
+            train_losses, _ = train_snapshots(model, train_loader, None, lr, epochs, optimizer=optimizer)
+
+        test_loader = snapshot_loader(dataset, batch_size=max(batch_size, len(test_indices)), indices=test_indices)
+        predictions = snapshot_predictions(model, test_loader).numpy()
+        results.append(FoldResult(fold, predictions, train_losses))
+    return results
+
+
+# =========================
+# WORKER PROCESS STATE
+# =========================
+
+_worker_dataset: Dict[str, SnapshotDataset] = {}
+
+
+def _init_worker(num_threads: int, dataset: SnapshotDataset) -> None:
+    torch.set_num_threads(num_threads)
+    _worker_dataset['dataset'] = dataset
+
+
+def _run_chain_in_worker(chain: Sequence[Fold], params: Tuple[Any, ...], kwargs: Dict[str, Any]) -> List[FoldResult]:
+    return run_chain(_worker_dataset['dataset'], chain, params, **kwargs)
+
+
+def walk_forward(
+    dataset: SnapshotDataset,
+    params: Tuple[Any, ...],
+    initial_train: int,
+    test_size: int = 21,
+    mode: str = 'expanding',
+    window: Optional[int] = None,
+    initial_epochs: int = 50,
+    refit_epochs: int = 5,
+    batch_size: int = 64,
+    warm_start: bool = True,
+    num_chains: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    markets: Optional[Sequence[str]] = None,
+) -> BacktestResult:
+    """
+    Walk-forward backtest of GCN + GAT ``params`` (hidden_dim, num_heads,
+    num_layers, lr, dropout_rate) over ``dataset``.
+
+    ``initial_train`` / ``test_size`` / ``window`` count rows of the
+    volatility panel. Without warm starts every fold is its own chain;
+    otherwise folds are split into ``num_chains`` chains (default: one per
+    worker). ``max_workers=1`` runs in-process.
+    """
+    T = dataset.volatility.shape[0]
+    folds = walk_forward_folds(T, initial_train, test_size, mode, window, start=dataset.target_row(0))
+
+    cpu_count = os.cpu_count() or 1
+    workers = 1 if max_workers == 1 else min(max_workers or cpu_count, len(folds))
+    if not warm_start:
+        chains = [[fold] for fold in folds]
+    else:
+        chains = split_chains(folds, num_chains or workers)
+
+    kwargs = {'initial_epochs': initial_epochs, 'refit_epochs': refit_epochs, 'batch_size': batch_size,
+              'warm_start': warm_start, 'seed': seed}
+    if workers <= 1:
+        chain_results = [run_chain(dataset, chain, params, **kwargs) for chain in chains]
+    else:
+        dataset.share_memory_()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context(), initializer=_init_worker,
+                                 initargs=(max(1, cpu_count // workers), dataset)) as executor:
+            chain_results = list(executor.map(_run_chain_in_worker, chains, [params] * len(chains),
+                                              [kwargs] * len(chains)))
+
+    fold_results = [result for results in chain_results for result in results]
+    rows = np.concatenate([np.arange(r.fold.test_start, r.fold.test_start + len(r.predictions))
+                           for r in fold_results])
+    predictions = np.concatenate([r.predictions for r in fold_results])
+    actuals = dataset.volatility[torch.as_tensor(rows)].numpy()
+
+    N = actuals.shape[1]
+    markets = list(markets) if markets is not None else [f"Index {i + 1}" for i in range(N)]
+    dates = dataset.dates[rows] if dataset.dates is not None else pd.RangeIndex(len(rows))
+    folds_frame = pd.DataFrame([
+        {
+            'fold': r.fold.index,
+            'train_start': r.fold.train_start,
+            'train_end': r.fold.train_end,
+            'test_start': r.fold.test_start,
+            'test_end': r.fold.test_end,
+            'epochs': len(r.train_losses),
+            'final_train_loss': r.train_losses[-1] if r.train_losses else np.nan,
+        }
+        for r in fold_results
+    ])
+    # Predictions already target their own row, so they are scored at shift 0
+    metrics = forecast_metrics(actuals, predictions, horizons=[0], markets=markets)
+    metrics['horizon'] = dataset.horizon
+    return BacktestResult(
+        predictions=pd.DataFrame(predictions, index=dates, columns=markets),
+        actuals=pd.DataFrame(actuals, index=dates, columns=markets),
+        folds=folds_frame,
+        metrics=metrics,
+    )
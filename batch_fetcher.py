@@ -0,0 +1,212 @@
+"""
+Concurrent multi-ticker download of daily bars.
+
+``fetch_many`` pulls many symbols at once through a thread pool. Each
+download runs with a per-request timeout and is retried with exponential
+backoff. Results come back as the same ``stock_data`` /
+``filled_days_counts`` dictionaries that project.py builds ticker by ticker.
+``YahooChartClient`` talks to the Yahoo chart endpoint through one bounded,
+keep-alive connection pool; its ``base_url`` can point at a local fake
+server for offline testing.
+"""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+YAHOO_BASE_URL = 'https://query1.finance.yahoo.com'
+
+# Same signature as data_store.Fetcher, so ColumnarDataStore.get plugs in directly
+Download = Callable[[str, str, str], Optional[pd.DataFrame]]
+
+
+class RetryableError(Exception):
+    """
+    Transient failure (timeout, connection reset, HTTP 429/5xx) worth retrying.
+    """
+
+
+class FetchResult(NamedTuple):
+    stock_data: Dict[str, pd.DataFrame]
+    filled_days_counts: Dict[str, pd.Series]
+    errors: Dict[str, str]
+
+
+def align_to_business_days(data: pd.DataFrame, start: str, end: str) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Align to full business-day range, forward/backward fill, and also return
+    count of filled cells.
+    """
+    full_range = pd.date_range(start=start, end=end, freq='B')
+
+    original_data = data.copy()
+    data = data.reindex(full_range)
+
+    data_filled = data.ffill().bfill()
+
+    # Count how many values were filled (per column)
+    filled_days_count = data_filled.notna().sum() - original_data.notna().sum()
+
+    return data_filled, filled_days_count
+
+
+class YahooChartClient:
+    """
+    Minimal Yahoo Finance chart API client sharing one bounded connection pool.
+    """
+
+    def __init__(
+        self,
+        base_url: str = YAHOO_BASE_URL,
+        pool_size: int = 32,
+        timeout: float = 10.0,
+    ) -> None:
+        import requests  # type: ignore
+        from requests.adapters import HTTPAdapter  # type: ignore
+
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        # pool_block makes threads wait for a free connection instead of
+        # opening more than pool_size sockets to the same host
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0'
+
+    def download(self, symbol: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        """
+        Daily bars for [start, end) in the (Price, Ticker) layout of ``yf.download``.
+        """
+        import requests  # type: ignore
+
+        params = {
+            'period1': int(pd.Timestamp(start, tz='UTC').timestamp()),
+            'period2': int(pd.Timestamp(end, tz='UTC').timestamp()),
+            'interval': '1d',
+            'events': 'history',
+        }
+        url = f"{self.base_url}/v8/finance/chart/{quote(symbol)}"
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise RetryableError(str(e)) from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableError(f"HTTP {response.status_code} for {symbol}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        return parse_chart_payload(symbol, response.json())
+
+
+def parse_chart_payload(symbol: str, payload: dict) -> Optional[pd.DataFrame]:  # type: ignore
+    """
+    Convert a ``/v8/finance/chart`` JSON document into a DataFrame.
+    """
+    results = (payload.get('chart') or {}).get('result') or []
+    if not results:
+        return None
+    result = results[0]
+    timestamps = result.get('timestamp') or []
+    if not timestamps:
+        return None
+
+    # Timestamps mark the session open in UTC; shift to exchange time for the date
+    offset = int(result.get('meta', {}).get('gmtoffset', 0))
+    days = (np.asarray(timestamps, dtype=np.int64) + offset) // 86400
+    dates = days.astype('datetime64[D]').astype('datetime64[ns]')
+
+    quote_block = result['indicators']['quote'][0]
+    fields = ['Close', 'High', 'Low', 'Open', 'Volume']
+    values = np.empty((len(dates), len(fields)), dtype=np.float64)
+    for col, field in enumerate(fields):
+        column = quote_block.get(field.lower())
+        # The API sends null for missing bars; map those to NaN
+        values[:, col] = np.nan if column is None else [np.nan if v is None else v for v in column]
+
+    if len(days) > 1 and not (np.diff(days) > 0).all():
+        # Keep the last bar for each day (a live session can repeat the date)
+        keep = np.r_[days[1:] != days[:-1], True]
+        dates, values = dates[keep], values[keep]
+
+    columns = pd.MultiIndex.from_arrays([fields, [symbol] * len(fields)], names=['Price', 'Ticker'])
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='Date'), columns=columns)
+
+
+def download_with_retry(
+    download: Download,
+    symbol: str,
+    start: str,
+    end: str,
+    retries: int = 3,
+    backoff: float = 0.5,
+    max_backoff: float = 8.0,
+) -> Optional[pd.DataFrame]:
+    """
+    Call ``download`` and retry transient failures with jittered exponential backoff.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return download(symbol, start, end)
+        except RetryableError as e:
+            if attempt == retries:
+                raise
+            delay = min(max_backoff, backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            logger.info("Retrying %s in %.2fs after: %s", symbol, delay, e)
+            time.sleep(delay)
+    return None
+
+
+def fetch_many(
+    symbols: Sequence[str],
+    start: str,
+    end: str,
+    download: Optional[Download] = None,
+    max_workers: int = 32,
+    retries: int = 3,
+    backoff: float = 0.5,
+) -> FetchResult:
+    """
+    Fetch and fill every symbol concurrently. Symbols that fail after all
+    retries are left out of the dictionaries and reported in ``errors``.
+    """
+    if download is None:
+        download = YahooChartClient(pool_size=max_workers).download
+
+    def fetch_one(symbol: str) -> Tuple[Optional[pd.DataFrame], Optional[pd.Series]]:
+        data = download_with_retry(download, symbol, start, end, retries=retries, backoff=backoff)  # type: ignore
+        if data is None or data.empty:
+            return None, None
+        return align_to_business_days(data, start, end)
+
+    stock_data: Dict[str, pd.DataFrame] = {}
+    filled_days_counts: Dict[str, pd.Series] = {}
+    errors: Dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as executor:
+        futures = {symbol: executor.submit(fetch_one, symbol) for symbol in symbols}
+        # Collect in input order so the dictionaries keep the ticker order
+        for symbol, future in futures.items():
+            try:
+                data, filled_days_count = future.result()
+            except Exception as e:
+                errors[symbol] = str(e)
+                logger.warning("Error fetching data for %s: %s", symbol, e)
+                continue
+            if data is None or filled_days_count is None:
+                errors[symbol] = 'no data returned'
+                logger.warning("No data returned for %s", symbol)
+                continue
+            stock_data[symbol] = data
+            filled_days_counts[symbol] = filled_days_count
+
+    return FetchResult(stock_data, filled_days_counts, errors)
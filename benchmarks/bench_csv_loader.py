@@ -0,0 +1,69 @@
+"""
+Compare csv_loader against plain ``pd.read_csv`` on the checked-in CSVs.
+
+Usage: python benchmarks/bench_csv_loader.py [--repeat N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from csv_loader import csv_path, load_panel  # noqa: E402
+
+TICKERS = ['^GSPC', '^GDAXI', '^FCHI', '^FTSE', '^NSEI', '^N225', '^KS11', '^HSI']
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> float:
+    """
+    Best-of-``repeat`` wall time in milliseconds.
+    """
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='panel_cache_')
+    try:
+        def plain_read_csv() -> None:
+            for ticker in TICKERS:
+                pd.read_csv(csv_path(ticker, ROOT), header=[0, 1], index_col=0, parse_dates=True)
+
+        def cold_parse() -> None:
+            load_panel(TICKERS, ROOT, cache_dir=None)
+
+        def cached_mmap() -> None:
+            load_panel(TICKERS, ROOT, cache_dir=cache_dir)
+
+        cached_mmap()  # populate the sidecar once
+
+        results = [
+            ('pd.read_csv (8 files, untyped)', time_call(plain_read_csv, args.repeat)),
+            ('load_panel, no cache', time_call(cold_parse, args.repeat)),
+            ('load_panel, mmap sidecar', time_call(cached_mmap, args.repeat)),
+        ]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"{'Loader':<34} {'Best (ms)':>10}")
+    for name, ms in results:
+        print(f"{name:<34} {ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+"""
+Time and memory of the pipeline's computational kernels on synthetic panels.
+
+Every kernel runs on a random-walk panel of T days x N assets (``--size
+TxN``, repeatable; T up to 50k and N up to 2000 are supported). Each
+(kernel, size) case runs in a fresh worker process that builds its inputs,
+warms up once and then times ``--repeat`` calls, so its peak RSS growth is
+its own and not left over from an earlier case.
+
+Kernels whose cost grows much faster than the panel use at most a few
+assets unless ``--no-caps`` is given:
+
+* ``calculate_descriptive_statistics`` runs once per asset (ADF test on each)
+* ``calculate_spillover_index`` fits a VAR with N * lag_order regressors
+* ``create_spillover_graph`` walks all N^2 matrix cells in Python
+
+The N a case actually used is part of its key in the results.
+
+``--output`` writes the results as a JSON baseline, and ``--compare`` runs
+again and flags every case whose best time is more than ``--threshold``
+slower than in that baseline (the exit status is then 1):
+
+    python benchmarks/bench_kernels.py --size 2500x8 --size 20000x200 --output baseline.json
+    git checkout other-branch
+    python benchmarks/bench_kernels.py --size 2500x8 --size 20000x200 --compare baseline.json
+
+Usage: python benchmarks/bench_kernels.py [--size TxN ...] [--only NAME ...] [--repeat N]
+       [--output PATH] [--compare PATH] [--threshold F] [--no-caps]
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from profiling import MB, peak_rss, tensor_bytes  # noqa: E402
+
+DEFAULT_SIZES = ['2500x8', '20000x200']
+
+HORIZONS = (1, 5, 10, 22)
+
+# Hyperparameters of the timed training epochs, from the project's search grids
+GCN_GAT_PARAMS = (64, 4, 2, 0.001, 0.1)
+MLP_PARAMS = (64, 0.01, 0.5)
+
+
+# =========================
+# SYNTHETIC INPUTS
+# =========================
+
+def synthetic_closes(T: int, N: int, seed: int) -> pd.DataFrame:
+    """
+    (T x N) business-day panel of geometric random-walk prices whose
+    volatility drifts slowly per asset, so realized volatility is not flat.
+    """
+    rng = np.random.default_rng(seed)
+    scale = 0.01 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(T, N)), axis=0) / np.sqrt(T) * 10)
+    returns = rng.standard_normal((T, N)) * scale
+    closes = 100 * np.exp(np.cumsum(returns, axis=0))
+    index = pd.bdate_range('1900-01-01', periods=T)
+    return pd.DataFrame(closes, index=index, columns=[f'A{i:04d}' for i in range(N)])
+
+
+def synthetic_realized_vol(T: int, N: int, seed: int) -> Dict[str, pd.Series]:
+    from volatility import realized_volatility_frame
+
+    realized_vol = realized_volatility_frame(synthetic_closes(T, N, seed), windows=(21,))[21].dropna()
+    return {column: realized_vol[column] for column in realized_vol.columns}
+
+
+def synthetic_spillover_matrix(columns: List[str], seed: int) -> pd.DataFrame:
+    """
+    Row-normalized positive matrix with a dominant diagonal, shaped like a
+    FEVD spillover table in percent.
+    """
+    rng = np.random.default_rng(seed)
+    N = len(columns)
+    weights = rng.random((N, N)) + np.eye(N) * N
+    weights = weights / weights.sum(axis=1, keepdims=True) * 100
+    return pd.DataFrame(weights, index=columns, columns=columns)
+
+
+# =========================
+# KERNELS
+# =========================
+
+# setup(T, N, seed) -> zero-argument call to time
+Setup = Callable[[int, int, int], Callable[[], Any]]
+
+
+class Benchmark(NamedTuple):
+    setup: Setup
+    # Largest N used unless --no-caps
+    max_assets: Optional[int] = None
+
+
+def realized_volatility_setup(T: int, N: int, seed: int) -> Callable[[], Any]:
+    from project import calculate_realized_volatility
+
+    closes = synthetic_closes(T, N, seed)
+    frames = [pd.DataFrame({'Close': closes[column]}) for column in closes.columns]
+    return lambda: [calculate_realized_volatility(frame) for frame in frames]
+
+
+def descriptive_statistics_setup(T: int, N: int, seed: int) -> Callable[[], Any]:
+    import scipy.stats  # type: ignore  # noqa: F401
+    import statsmodels.tsa.stattools  # type: ignore  # noqa: F401
+
+    from project import calculate_descriptive_statistics
+
+    realized_vol_dict = synthetic_realized_vol(T, N, seed)
+    return lambda: [calculate_descriptive_statistics(series) for series in realized_vol_dict.values()]
+
+
+def spillover_index_setup(T: int, N: int, seed: int) -> Callable[[], Any]:
+    import statsmodels.tsa.api  # type: ignore  # noqa: F401
+
+    from spillover import calculate_spillover_index
+
+    realized_vol_dict = synthetic_realized_vol(T, N, seed)
+    return lambda: calculate_spillover_index(realized_vol_dict, lag_order=2, forecast_horizon=10)
+
+
+def spillover_graph_setup(T: int, N: int, seed: int) -> Callable[[], Any]:
+    import torch_geometric.utils  # type: ignore  # noqa: F401
+
+    from project import create_spillover_graph, networkx_to_pyg_data
+
+    realized_vol_dict = synthetic_realized_vol(T, N, seed)
+    matrix = synthetic_spillover_matrix(list(realized_vol_dict), seed)
+    return lambda: networkx_to_pyg_data(create_spillover_graph(matrix), realized_vol_dict)
+
+
+def _graph_data(T: int, N: int, seed: int) -> Any:
+    from graph import build_graph_data
+
+    realized_vol_dict = synthetic_realized_vol(T, N, seed)
+    return build_graph_data(synthetic_spillover_matrix(list(realized_vol_dict), seed), realized_vol_dict)
+
+
+def epoch_setup(model_name: str, params: Tuple[Any, ...]) -> Setup:
+    """
+    One epoch of ``search.train_config``: the same forward, backward, Adam
+    step and validation pass the grid search runs.
+    """
+    def setup(T: int, N: int, seed: int) -> Callable[[], Any]:
+        from search import train_config
+
+        data = _graph_data(T, N, seed)
+        return lambda: train_config(model_name, params, data, data, num_epochs=1, seed=seed)
+    return setup
+
+
+def forecast_metrics_setup(T: int, N: int, seed: int) -> Callable[[], Any]:
+    import torch  # type: ignore
+
+    from metrics import forecast_metrics
+
+    actuals = torch.tensor(synthetic_closes(T, N, seed).to_numpy(dtype=np.float32))
+    predictions = actuals * (1 + 0.01 * torch.randn_like(actuals))
+    return lambda: forecast_metrics(actuals, predictions, HORIZONS)
+
+
+def metrics_by_horizon_setup(T: int, N: int, seed: int) -> Callable[[], Any]:
+    import torch  # type: ignore
+
+    from metrics import forecast_metrics, metrics_by_horizon
+
+    actuals = torch.tensor(synthetic_closes(T, N, seed).to_numpy(dtype=np.float32))
+    table = forecast_metrics(actuals, actuals * 1.01, HORIZONS)
+    return lambda: metrics_by_horizon(table)
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    'calculate_realized_volatility': Benchmark(realized_volatility_setup),
+    'calculate_descriptive_statistics': Benchmark(descriptive_statistics_setup, max_assets=8),
+    'calculate_spillover_index': Benchmark(spillover_index_setup, max_assets=50),
+    'create_spillover_graph+networkx_to_pyg_data': Benchmark(spillover_graph_setup, max_assets=200),
+    'GCN_GAT_Model epoch': Benchmark(epoch_setup('gcn_gat', GCN_GAT_PARAMS)),
+    'BaselineMLPModel epoch': Benchmark(epoch_setup('mlp', MLP_PARAMS)),
+    'forecast_metrics': Benchmark(forecast_metrics_setup),
+    'metrics_by_horizon': Benchmark(metrics_by_horizon_setup),
+}
+
+
+# =========================
+# RUNNER
+# =========================
+
+def reset_peak_rss() -> None:
+    """
+    Restart the peak RSS from the current RSS (Linux), so the memory of
+    building the inputs does not hide the kernel's own peak.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def run_case(name: str, T: int, N: int, repeat: int, seed: int, threads: int) -> Dict[str, Any]:
+    """
+    Build the inputs of one case, warm up once and time ``repeat`` calls.
+    Runs in its own worker process.
+    """
+    import torch  # type: ignore
+
+    # ADF interpolation and torch deprecation warnings would repeat on every call
+    warnings.simplefilter('ignore')
+    torch.set_num_threads(threads)
+    torch.manual_seed(seed)
+    call = BENCHMARKS[name].setup(T, N, seed)
+
+    gc.collect()
+    reset_peak_rss()
+    rss_before = peak_rss()
+    output = call()
+    timings: List[float] = []
+    cpu_timings: List[float] = []
+    for _ in range(repeat):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        output = call()
+        timings.append(time.perf_counter() - start)
+        cpu_timings.append(time.process_time() - cpu_start)
+
+    return {
+        'name': name, 'T': T, 'N': N,
+        'best_ms': round(min(timings) * 1e3, 3),
+        'median_ms': round(statistics.median(timings) * 1e3, 3),
+        'cpu_ms': round(statistics.median(cpu_timings) * 1e3, 3),
+        'peak_rss_mb': round(peak_rss() / MB, 1),
+        'rss_growth_mb': round((peak_rss() - rss_before) / MB, 1),
+        'output_tensor_mb': round(tensor_bytes(output) / MB, 3),
+    }
+
+
+def case_key(result: Dict[str, Any]) -> str:
+    return f"{result['name']} [{result['T']}x{result['N']}]"
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    try:
+        T, N = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected TxN, e.g. 2500x8, got {text!r}")
+    return T, N
+
+
+def environment() -> Dict[str, Any]:
+    import torch  # type: ignore
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'torch': torch.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> bool:
+    """
+    Print current vs baseline best times; returns whether any case got
+    slower by more than ``threshold``.
+    """
+    previous = {case_key(result): result for result in baseline['results']}
+    print(f"\nAgainst {baseline['meta'].get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+    print(f"{'Case':<58} {'Base ms':>10} {'Now ms':>10} {'Ratio':>7}  {'RSS MB':>13}")
+    slower = False
+    for result in results:
+        key = case_key(result)
+        if key not in previous:
+            print(f"{key:<58} {'-':>10} {result['best_ms']:>10.2f} {'':>7}  (not in baseline)")
+            continue
+        base = previous[key]
+        ratio = result['best_ms'] / base['best_ms'] if base['best_ms'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = 'SLOWER'
+            slower = True
+        elif ratio < 1 / (1 + threshold):
+            flag = 'faster'
+        rss = f"{base['rss_growth_mb']:.0f} -> {result['rss_growth_mb']:.0f}"
+        print(f"{key:<58} {base['best_ms']:>10.2f} {result['best_ms']:>10.2f} {ratio:>6.2f}x  {rss:>13}  {flag}")
+    return slower
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=f"benchmarks: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--size', type=parse_size, action='append', metavar='TxN',
+                        help=f"panel size, repeatable (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument('--only', action='append', metavar='NAME',
+                        help="run only benchmarks whose name contains NAME (repeatable)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=1, help="torch threads per case (default: %(default)s)")
+    parser.add_argument('--no-caps', action='store_true', help="run every kernel on all N assets")
+    parser.add_argument('--output', metavar='PATH', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="flag slowdowns against a baseline written by --output")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="relative slowdown that counts as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    sizes = args.size or [parse_size(size) for size in DEFAULT_SIZES]
+    names = [name for name in BENCHMARKS if not args.only or any(part in name for part in args.only)]
+    if not names:
+        parser.error(f"no benchmark matches {args.only}")
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results: List[Dict[str, Any]] = []
+    print(f"{'Case':<58} {'Best ms':>10} {'Median ms':>10} {'RSS +MB':>9} {'Out MB':>8}")
+    for T, N in sizes:
+        for name in names:
+            max_assets = BENCHMARKS[name].max_assets
+            n_assets = N if args.no_caps or max_assets is None else min(N, max_assets)
+            # A fresh process per case, so peak RSS and warm caches do not carry over
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                try:
+                    result = executor.submit(run_case, name, T, n_assets, args.repeat, args.seed,
+                                             args.threads).result()
+                except Exception as e:
+                    print(f"{name} [{T}x{n_assets}] failed: {e!r}", flush=True)
+                    continue
+            results.append(result)
+            print(f"{case_key(result):<58} {result['best_ms']:>10.2f} {result['median_ms']:>10.2f} "
+                  f"{result['rss_growth_mb']:>9.1f} {result['output_tensor_mb']:>8.2f}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': dict(environment(), repeat=args.repeat, seed=args.seed, threads=args.threads),
+                       'results': results}, f, indent=1)
+        print(f"\nResults written to {args.output}")
+    if baseline is not None and compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
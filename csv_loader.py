@@ -0,0 +1,157 @@
+"""
+Fast loader for the ``{ticker}_stock_data.csv`` files written by project.py.
+
+The files carry two header rows (``Price,Close,High,...`` then
+``Ticker,^GSPC,^GSPC,...``) followed by one row per business day. They are
+parsed in a single pass with explicit dtypes, aligned into one
+(date x ticker x field) array and cached as a binary ``.npy`` sidecar that
+later loads memory-map instead of re-parsing.
+"""
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = '.panel_cache'
+
+
+class Panel(NamedTuple):
+    """
+    Aligned price panel: ``values[d, t, f]`` is field ``f`` of ticker ``t`` on ``dates[d]``.
+    """
+    values: np.ndarray
+    dates: pd.DatetimeIndex
+    tickers: List[str]
+    fields: List[str]
+
+    def frame(self, field: str) -> pd.DataFrame:
+        """
+        Date x ticker DataFrame for one field (e.g. ``'Close'``).
+        """
+        return pd.DataFrame(
+            self.values[:, :, self.fields.index(field)],
+            index=self.dates,
+            columns=self.tickers,
+        )
+
+
+def csv_path(ticker: str, directory: str = '.') -> str:
+    return os.path.join(directory, f"{ticker}_stock_data.csv")
+
+
+def read_header(path: str) -> Tuple[List[str], str]:
+    """
+    Return the field names and the ticker from the two header rows.
+    """
+    with open(path) as f:
+        price_row = f.readline().rstrip('\r\n').split(',')
+        ticker_row = f.readline().rstrip('\r\n').split(',')
+    return price_row[1:], ticker_row[1]
+
+
+def read_yfinance_csv(path: str, dtype: type = np.float64) -> pd.DataFrame:
+    """
+    Parse one two-header-row CSV into the (Price, Ticker) column layout
+    that ``yf.download`` returns, with a datetime index and typed columns.
+    """
+    fields, ticker = read_header(path)
+    data = pd.read_csv(
+        path,
+        skiprows=2,
+        header=None,
+        names=['Date'] + fields,
+        index_col=0,
+        dtype={field: dtype for field in fields},
+        parse_dates=[0],
+        engine='c',
+    )
+    data.columns = pd.MultiIndex.from_arrays(
+        [fields, [ticker] * len(fields)], names=['Price', 'Ticker']
+    )
+    return data
+
+
+def build_panel(frames: Dict[str, pd.DataFrame], dtype: type = np.float64) -> Panel:
+    """
+    Align per-ticker frames on the union of their dates into one 3-D array.
+    Days missing for a ticker are left as NaN.
+    """
+    tickers = list(frames)
+    fields = [str(field) for field in frames[tickers[0]].columns.get_level_values(0)]
+
+    dates = pd.DatetimeIndex([])
+    for frame in frames.values():
+        dates = dates.union(pd.DatetimeIndex(frame.index))
+
+    values = np.full((len(dates), len(tickers), len(fields)), np.nan, dtype=dtype)
+    for t, ticker in enumerate(tickers):
+        frame = frames[ticker]
+        rows = dates.get_indexer(frame.index)
+        values[rows, t, :] = frame.to_numpy(dtype=dtype)
+    return Panel(values, dates, tickers, fields)
+
+
+def _fingerprint(paths: Sequence[str], dtype: type) -> List[List[object]]:
+    # Size + mtime is enough to notice the CSVs being rewritten by project.py
+    fingerprint: List[List[object]] = [[np.dtype(dtype).str]]
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def _load_cached(cache_dir: str, fingerprint: List[List[object]]) -> Optional[Panel]:
+    meta_path = os.path.join(cache_dir, 'panel.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta['fingerprint'] != fingerprint:
+        return None
+    values = np.load(os.path.join(cache_dir, 'panel.npy'), mmap_mode='r')
+    dates = np.load(os.path.join(cache_dir, 'dates.npy'), mmap_mode='r')
+    return Panel(values, pd.DatetimeIndex(dates.view('datetime64[ns]')), meta['tickers'], meta['fields'])
+
+
+def _save_cached(cache_dir: str, panel: Panel, fingerprint: List[List[object]]) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, 'panel.npy'), panel.values)
+    np.save(os.path.join(cache_dir, 'dates.npy'), panel.dates.as_unit('ns').asi8)
+    # The metadata is written last so a partial write is never taken as valid
+    with open(os.path.join(cache_dir, 'panel.json'), 'w') as f:
+        json.dump({
+            'fingerprint': fingerprint,
+            'tickers': panel.tickers,
+            'fields': panel.fields,
+        }, f)
+
+
+def load_panel(
+    tickers: Sequence[str],
+    directory: str = '.',
+    dtype: type = np.float64,
+    cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+) -> Panel:
+    """
+    Load the CSVs of ``tickers`` as one aligned panel. When ``cache_dir`` is
+    set, an up-to-date binary sidecar is memory-mapped instead of parsing.
+    """
+    paths = [csv_path(ticker, directory) for ticker in tickers]
+    fingerprint = _fingerprint(paths, dtype)
+
+    if cache_dir is not None:
+        cached = _load_cached(cache_dir, fingerprint)
+        if cached is not None:
+            return cached
+
+    frames = {ticker: read_yfinance_csv(path, dtype) for ticker, path in zip(tickers, paths)}
+    panel = build_panel(frames, dtype)
+
+    if cache_dir is not None:
+        _save_cached(cache_dir, panel, fingerprint)
+        cached = _load_cached(cache_dir, fingerprint)
+        if cached is not None:
+            return cached
+    return panel
@@ -0,0 +1,202 @@
+"""
+Precomputed payloads for the dashboard API.
+
+``write_dashboard_artifacts`` renders every response the dashboard in
+``templates/index.html`` asks for into one directory, once, when project.py
+has the data at hand:
+
+* ``manifest.json``            tickers and payload file names
+* ``statistics.json``          ``[{ticker, mean, std, min, max, dataPoints}]``
+* ``correlations.json``        ``{tickers, matrix}``
+* ``volatility/<ticker>.json`` ``{mean, std, dataPoints, volatility}``
+* ``prices/<ticker>.json``     ``{prices}``
+
+Missing values (the ``std`` of a one-point series, the correlation of a
+constant series) are written as ``null``, since browsers reject ``NaN`` in
+JSON.
+
+``ArtifactStore`` serves them from memory: each payload is read on first
+use, compressed once and tagged with a content hash, so a request never
+touches the data or the disk again until the directory is rewritten.
+"""
+import email.utils
+import gzip
+import hashlib
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ARTIFACT_DIR = 'dashboard_artifacts'
+
+
+def _dump(path: str, payload: Any) -> None:
+    with open(path, 'w') as f:
+        json.dump(payload, f, separators=(',', ':'), allow_nan=False)
+
+
+def _number(value: float, decimals: int) -> Optional[float]:
+    return round(float(value), decimals) if math.isfinite(value) else None
+
+
+def _values(values: Any, decimals: int) -> list:  # type: ignore
+    return [_number(value, decimals) for value in np.asarray(values, dtype=np.float64).tolist()]
+
+
+def write_dashboard_artifacts(
+    directory: str,
+    prices: pd.DataFrame,
+    volatility: Mapping[str, pd.Series],
+    correlations: pd.DataFrame,
+) -> str:
+    """
+    Write the dashboard payloads for date x ticker close ``prices``, per-ticker
+    realized ``volatility`` and a ticker x ticker ``correlations`` matrix, and
+    return the manifest path. The directory is replaced as a whole.
+    """
+    tickers = list(volatility)
+    manifest: Dict[str, Any] = {
+        'tickers': tickers,
+        'statistics': 'statistics.json',
+        'correlations': 'correlations.json',
+        'volatility': {},
+        'prices': {},
+    }
+
+    tmp_path = f"{directory.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_path, 'volatility'))
+    os.makedirs(os.path.join(tmp_path, 'prices'))
+
+    statistics = []
+    for ticker in tickers:
+        series = volatility[ticker].dropna()
+        summary = {
+            'mean': _number(series.mean(), 8),
+            'std': _number(series.std(), 8),
+            'dataPoints': int(len(series)),
+        }
+        statistics.append({'ticker': ticker, 'mean': summary['mean'], 'std': summary['std'],
+                           'min': _number(series.min(), 8), 'max': _number(series.max(), 8),
+                           'dataPoints': summary['dataPoints']})
+
+        manifest['volatility'][ticker] = f"volatility/{ticker}.json"
+        _dump(os.path.join(tmp_path, manifest['volatility'][ticker]), dict(summary, volatility=_values(series, 6)))
+        if ticker in prices:
+            manifest['prices'][ticker] = f"prices/{ticker}.json"
+            _dump(os.path.join(tmp_path, manifest['prices'][ticker]),
+                  {'prices': _values(prices[ticker].dropna(), 4)})
+
+    _dump(os.path.join(tmp_path, manifest['statistics']), statistics)
+    matrix = correlations.reindex(index=tickers, columns=tickers).to_numpy(dtype=np.float64)
+    _dump(os.path.join(tmp_path, manifest['correlations']),
+          {'tickers': tickers, 'matrix': [_values(row, 4) for row in matrix]})
+    # Manifest last: readers key their cache on its modification time
+    _dump(os.path.join(tmp_path, 'manifest.json'), manifest)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_path, directory)
+    return os.path.join(directory, 'manifest.json')
+
+
+class Payload(NamedTuple):
+    body: bytes
+    gzipped: bytes
+    etag: str
+    last_modified: str
+
+
+def make_payload(body: bytes, modified: float) -> Payload:
+    """
+    ``body`` with its gzip encoding, a strong ETag and an HTTP date.
+    """
+    return Payload(
+        body=body,
+        gzipped=gzip.compress(body, compresslevel=6, mtime=0),
+        etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        last_modified=email.utils.formatdate(modified, usegmt=True),
+    )
+
+
+class ArtifactStore:
+    """
+    In-memory view of a ``write_dashboard_artifacts`` directory.
+
+    The manifest's modification time is checked at most every
+    ``check_interval`` seconds; when project.py rewrites the directory all
+    cached payloads are dropped and reloaded on demand.
+    """
+
+    def __init__(self, directory: str = DEFAULT_ARTIFACT_DIR, check_interval: float = 1.0) -> None:
+        self.directory = directory
+        self.check_interval = check_interval
+        self.manifest: Dict[str, Any] = {}
+        self.modified = 0.0
+        self._payloads: Dict[str, Payload] = {}
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        path = os.path.join(self.directory, 'manifest.json')
+        try:
+            modified = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.manifest, self.modified, self._payloads = {}, 0.0, {}
+            return
+        if modified != self.modified:
+            with open(path) as f:
+                manifest = json.load(f)
+            self.manifest, self.modified, self._payloads = manifest, modified, {}
+
+    def tickers(self) -> list:  # type: ignore
+        self._refresh()
+        return list(self.manifest.get('tickers', []))
+
+    def get(self, kind: str, ticker: Optional[str] = None) -> Optional[Payload]:
+        """
+        Payload for ``statistics`` / ``correlations``, or for ``volatility`` /
+        ``prices`` of one ``ticker``; None if there is none.
+        """
+        with self._lock:
+            self._refresh()
+            key = kind if ticker is None else f"{kind}/{ticker}"
+            payload = self._payloads.get(key)
+            if payload is not None:
+                return payload
+
+            entry = self.manifest.get(kind)
+            name = entry.get(ticker) if isinstance(entry, dict) else entry
+            if not isinstance(name, str):
+                return None
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as f:
+                    body = f.read()
+            except FileNotFoundError:
+                return None
+            payload = self._payloads[key] = make_payload(body, self.modified)
+            return payload
+
+    def add(self, key: str, body: bytes) -> Payload:
+        """
+        Cache a payload rendered elsewhere (the dashboard page) alongside the
+        artifacts, so it is dropped with them on the next rewrite.
+        """
+        with self._lock:
+            self._refresh()
+            payload = self._payloads[key] = make_payload(body, self.modified or time.time())
+            return payload
+
+    def cached(self, key: str) -> Optional[Payload]:
+        with self._lock:
+            self._refresh()
+            return self._payloads.get(key)
@@ -0,0 +1,213 @@
+"""
+Local columnar store for daily OHLCV data.
+
+Every ticker gets its own directory holding a memory-mapped NumPy layout:
+``dates.npy`` (int64 nanoseconds since epoch), ``values.npy`` (float64,
+days x fields) and ``meta.json`` (field names and the date range that has
+already been requested from the network). Reads only touch the ticker that
+is asked for, and only the missing part of a date range is ever fetched.
+"""
+import json
+import os
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import read_yfinance_csv
+
+# A fetcher downloads ``symbol`` for the half-open range [start, end) and
+# returns a yfinance-shaped DataFrame, or None when nothing could be fetched.
+Fetcher = Callable[[str, str, str], Optional[pd.DataFrame]]
+
+DEFAULT_STORE_DIR = '.data_store'
+
+
+def yfinance_fetcher(symbol: str, start: str, end: str) -> Optional[pd.DataFrame]:
+    """
+    Download daily bars from Yahoo Finance.
+    """
+    import yfinance as yf  # type: ignore
+
+    return yf.download(symbol, start=start, end=end)  # type: ignore
+
+
+def csv_fetcher(directory: str = '.') -> Fetcher:
+    """
+    Build an offline fetcher that serves the ``{ticker}_stock_data.csv`` files
+    written by project.py instead of hitting the network.
+    """
+    def fetch(symbol: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        path = os.path.join(directory, f"{symbol}_stock_data.csv")
+        if not os.path.exists(path):
+            return None
+        data = read_yfinance_csv(path)
+        mask = (data.index >= pd.Timestamp(start)) & (data.index < pd.Timestamp(end))
+        return data.loc[mask]
+
+    return fetch
+
+
+def null_fetcher(symbol: str, start: str, end: str) -> Optional[pd.DataFrame]:
+    """
+    Fetcher for fully offline runs: only what is already stored is returned.
+    """
+    return None
+
+
+class ColumnarDataStore:
+    """
+    One columnar file set per ticker, filled lazily from a pluggable fetcher.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, fetcher: Fetcher = yfinance_fetcher) -> None:
+        self.root = root
+        self.fetcher = fetcher
+
+    def _ticker_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol)
+
+    def _read_meta(self, symbol: str) -> Optional[dict]:  # type: ignore
+        path = os.path.join(self._ticker_dir(symbol), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def covered_range(self, symbol: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Half-open date range [start, end) already requested for ``symbol``.
+        """
+        meta = self._read_meta(symbol)
+        if meta is None:
+            return None
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def read(self, symbol: str) -> Optional[pd.DataFrame]:
+        """
+        Load everything stored for ``symbol`` through memory maps.
+        """
+        meta = self._read_meta(symbol)
+        if meta is None:
+            return None
+        ticker_dir = self._ticker_dir(symbol)
+        dates = np.load(os.path.join(ticker_dir, 'dates.npy'), mmap_mode='r')
+        values = np.load(os.path.join(ticker_dir, 'values.npy'), mmap_mode='r')
+        return self._to_frame(symbol, dates, values, meta['fields'])
+
+    def write(self, symbol: str, data: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> None:
+        """
+        Replace the stored bars for ``symbol`` and record [start, end) as covered.
+        """
+        fields, dates, values = self._normalize(data)
+        ticker_dir = self._ticker_dir(symbol)
+        os.makedirs(ticker_dir, exist_ok=True)
+
+        # Write to temporary names first so a crash never leaves a torn file set
+        for name, array in (('dates.npy', dates), ('values.npy', values)):
+            tmp_path = os.path.join(ticker_dir, f".{name}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(ticker_dir, name))
+
+        self._write_meta(symbol, fields, start, end)
+
+    def _write_meta(self, symbol: str, fields: List[str], start: pd.Timestamp, end: pd.Timestamp) -> None:
+        ticker_dir = self._ticker_dir(symbol)
+        meta = {'fields': fields, 'start': str(start.date()), 'end': str(end.date())}
+        tmp_path = os.path.join(ticker_dir, '.meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(ticker_dir, 'meta.json'))
+
+    def missing_ranges(self, symbol: str, start: str, end: str) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Parts of [start, end) that still have to be fetched for ``symbol``.
+        """
+        start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+        covered = self.covered_range(symbol)
+        if covered is None:
+            ranges = [(start_ts, end_ts)]
+        else:
+            covered_start, covered_end = covered
+            ranges = []
+            if start_ts < covered_start:
+                ranges.append((start_ts, covered_start))
+            if end_ts > covered_end:
+                ranges.append((covered_end, end_ts))
+
+        # Skip pieces without a single business day (e.g. a weekend start date)
+        return [
+            (lo, hi) for lo, hi in ranges
+            if len(pd.bdate_range(lo, hi - pd.Timedelta(days=1))) > 0
+        ]
+
+    def get(self, symbol: str, start: str, end: str) -> Optional[pd.DataFrame]:
+        """
+        Return bars for [start, end), fetching only the range not stored yet.
+        """
+        stored = self.read(symbol)
+        covered = self.covered_range(symbol)
+
+        fetched = []
+        empty: Optional[pd.DataFrame] = None
+        for lo, hi in self.missing_ranges(symbol, start, end):
+            data = self.fetcher(symbol, str(lo.date()), str(hi.date()))
+            if data is None:
+                continue
+            # A range that came back without rows (holiday tail, delisted
+            # period) is covered too, so it is not requested again
+            covered = (lo, hi) if covered is None else (min(covered[0], lo), max(covered[1], hi))
+            if data.empty:
+                empty = data
+            else:
+                fetched.append(data)
+
+        if fetched:
+            frames = ([stored] if stored is not None else []) + fetched
+            merged = self._merge(symbol, frames)
+            self.write(symbol, merged, covered[0], covered[1])  # type: ignore
+            stored = self.read(symbol)
+        elif empty is not None:
+            if stored is None:
+                self.write(symbol, empty, covered[0], covered[1])  # type: ignore
+                stored = self.read(symbol)
+            else:
+                self._write_meta(symbol, [str(field) for field in stored.columns.get_level_values(0)],
+                                 covered[0], covered[1])  # type: ignore
+
+        if stored is None:
+            return None
+        mask = (stored.index >= pd.Timestamp(start)) & (stored.index < pd.Timestamp(end))
+        return stored.loc[mask]
+
+    def _merge(self, symbol: str, frames: List[pd.DataFrame]) -> pd.DataFrame:
+        parts = []
+        for frame in frames:
+            fields, dates, values = self._normalize(frame)
+            parts.append(self._to_frame(symbol, dates, values, fields))
+        merged = pd.concat(parts)
+        merged = merged[~merged.index.duplicated(keep='last')]
+        return merged.sort_index()
+
+    @staticmethod
+    def _normalize(data: pd.DataFrame) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        if isinstance(data.columns, pd.MultiIndex):
+            fields = [str(field) for field in data.columns.get_level_values(0)]
+        else:
+            fields = [str(field) for field in data.columns]
+        index = pd.DatetimeIndex(data.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        dates = index.as_unit('ns').asi8.astype(np.int64)
+        values = np.ascontiguousarray(data.to_numpy(dtype=np.float64))
+        return fields, dates, values
+
+    @staticmethod
+    def _to_frame(symbol: str, dates: np.ndarray, values: np.ndarray, fields: List[str]) -> pd.DataFrame:
+        # Same (Price, Ticker) column layout that yf.download returns
+        columns = pd.MultiIndex.from_arrays(
+            [fields, [symbol] * len(fields)], names=['Price', 'Ticker']
+        )
+        index = pd.DatetimeIndex(np.asarray(dates).view('datetime64[ns]'), name='Date')
+        return pd.DataFrame(values, index=index, columns=columns, copy=False)
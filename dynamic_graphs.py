@@ -0,0 +1,160 @@
+"""
+Time-varying spillover graphs with an on-disk cache.
+
+``DynamicGraphCache`` estimates the spillover graph of every trailing
+window once (``rolling_spillover``) and stores all of them as flat,
+memory-mapped arrays in one directory:
+
+* ``dates.npy``       int64 nanoseconds, the last day of each window
+* ``offsets.npy``     int64 (W + 1), edges of window w are ``offsets[w]:offsets[w + 1]``
+* ``edge_index.npy``  int64 (2 x E), all windows' edges concatenated
+* ``edge_weight.npy`` float32 (E)
+* ``meta.json``       cache key, columns and estimation settings
+
+The directory name is a hash of the volatility data and the settings, so a
+rerun on the same data opens the existing arrays without fitting any VAR.
+"""
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import torch  # type: ignore
+
+from graph import spillover_edges
+from model_cache import cache_key
+from spillover import rolling_spillover
+
+DEFAULT_GRAPH_CACHE_DIR = '.graph_cache'
+
+ARRAY_NAMES = ('dates', 'offsets', 'edge_index', 'edge_weight')
+
+
+def volatility_fingerprint(data: pd.DataFrame) -> str:
+    """
+    Content hash of a date x market frame (values, dates and column names).
+    """
+    digest = hashlib.sha256(json.dumps([str(column) for column in data.columns]).encode())
+    digest.update(np.ascontiguousarray(data.index.values.astype('datetime64[ns]').astype(np.int64)).tobytes())
+    digest.update(np.ascontiguousarray(data.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+class DynamicGraphCache:
+    """
+    Memory-mapped per-window spillover graphs, indexed by date.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self._open()
+
+    def _open(self) -> None:
+        arrays = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r') for name in ARRAY_NAMES}
+        self._dates = arrays['dates']
+        self._offsets = arrays['offsets']
+        self._edge_index = arrays['edge_index']
+        self._edge_weight = arrays['edge_weight']
+        self.dates = pd.DatetimeIndex(np.asarray(self._dates).astype('datetime64[ns]'))
+
+    # Memory maps are reopened rather than pickled when sent to loader workers
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'path': self.path, 'meta': self.meta}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.path = state['path']
+        self.meta = state['meta']
+        self._open()
+
+    @classmethod
+    def build(
+        cls,
+        data: pd.DataFrame,
+        root: str = DEFAULT_GRAPH_CACHE_DIR,
+        window: int = 200,
+        lag_order: int = 2,
+        forecast_horizon: int = 10,
+        threshold: float = 0.0,
+        top_k: Optional[int] = None,
+    ) -> 'DynamicGraphCache':
+        """
+        Open the cached graphs for ``data`` and these settings, estimating
+        and writing them first if they are not on disk yet.
+        """
+        data = data.dropna()
+        settings = {'window': window, 'lag_order': lag_order, 'forecast_horizon': forecast_horizon,
+                    'threshold': threshold, 'top_k': top_k}
+        key = cache_key(data=volatility_fingerprint(data), **settings)
+        path = os.path.join(root, key)
+        if os.path.exists(os.path.join(path, 'meta.json')):
+            return cls(path)
+
+        rolling = rolling_spillover(data, window=window, lag_order=lag_order, forecast_horizon=forecast_horizon)
+        edge_indices: List[np.ndarray] = []
+        edge_weights: List[np.ndarray] = []
+        offsets = np.zeros(len(rolling.matrices) + 1, dtype=np.int64)
+        for w, matrix in enumerate(rolling.matrices):
+            edge_index, edge_weight = spillover_edges(matrix, threshold, top_k)
+            edge_indices.append(edge_index.numpy())
+            edge_weights.append(edge_weight.numpy())
+            offsets[w + 1] = offsets[w] + edge_weight.shape[0]
+
+        arrays = {
+            'dates': rolling.total.index.values.astype('datetime64[ns]').astype(np.int64),
+            'offsets': offsets,
+            'edge_index': np.concatenate(edge_indices, axis=1) if edge_indices else np.zeros((2, 0), np.int64),
+            'edge_weight': np.concatenate(edge_weights) if edge_weights else np.zeros(0, np.float32),
+        }
+        meta = dict(settings, key=key, columns=list(data.columns), num_windows=len(rolling.matrices))
+
+        # Build in a scratch directory and rename, so a half-written cache is never opened
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def graph_at(self, position: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        ``edge_index`` / ``edge_weight`` of the ``position``-th window.
+        """
+        lo, hi = int(self._offsets[position]), int(self._offsets[position + 1])
+        edge_index = torch.from_numpy(np.array(self._edge_index[:, lo:hi]))
+        edge_weight = torch.from_numpy(np.array(self._edge_weight[lo:hi]))
+        return edge_index, edge_weight
+
+    def graphs_at(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Concatenated ``edge_index`` / ``edge_weight`` of several windows and the
+        edge count of each, gathered from the memory maps in one read.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        lo = np.asarray(self._offsets[positions])
+        counts = np.asarray(self._offsets[positions + 1]) - lo
+        starts = np.cumsum(counts) - counts
+        rows = np.repeat(lo - starts, counts) + np.arange(int(counts.sum()))
+        return np.asarray(self._edge_index[:, rows]), np.asarray(self._edge_weight[rows]), counts
+
+    def position_for(self, date: Any) -> int:
+        """
+        Latest window ending on or before ``date``; KeyError if none does.
+        """
+        position = int(self.dates.searchsorted(pd.Timestamp(date), side='right')) - 1
+        if position < 0:
+            raise KeyError(f"no spillover window ends on or before {date}")
+        return position
+
+    def graph_for_date(self, date: Any) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self.graph_at(self.position_for(date))
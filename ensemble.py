@@ -0,0 +1,263 @@
+"""
+Stacked-ensemble training for the baseline MLP grid.
+
+Configurations that share a hidden size have identically shaped weights, so
+they are stacked with ``torch.func.stack_module_state`` and trained as one
+model: a single ``vmap``-ed forward and backward pass per epoch covers every
+member. Learning rate and dropout stay per member; Adam is applied to the
+stacked tensors directly so each member keeps its own step size.
+
+Each group follows the successive-halving schedule of ``search``: after
+every rung only the best third keeps training, and members that hit
+``patience`` stop. Members that stop are cut out of the stacked tensors and
+the Adam state, so later epochs only pay for the members still training.
+With a ``ModelCache`` a group is only trained when one of its members has
+no stored run.
+"""
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import torch  # type: ignore
+import torch.nn.functional as F  # type: ignore
+from torch.func import stack_module_state, vmap  # type: ignore
+
+import profiling
+from model_cache import ModelCache, cache_key, class_fingerprint, data_fingerprint
+from models import BaselineMLPModel
+from search import WEIGHTS_VERSION, EpochCallback, SearchResult, build_mlp, load_cached, rung_budgets, store_cached
+
+# Hidden layers of BaselineMLPModel, each followed by ReLU and dropout
+HIDDEN_LAYERS = ('fc1', 'fc2', 'fc3')
+
+
+def _mlp_forward(params: Dict[str, torch.Tensor], x: torch.Tensor,
+                 masks: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """
+    ``BaselineMLPModel.forward`` for one member, with dropout given as
+    precomputed (already rescaled) keep masks.
+    """
+    for layer, name in enumerate(HIDDEN_LAYERS):
+        x = F.relu(F.linear(x, params[f'{name}.weight'], params[f'{name}.bias']))
+        if masks is not None:
+            x = x * masks[layer]
+    return F.linear(x, params['fc_final.weight'], params['fc_final.bias'])
+
+
+def _member_losses(out: torch.Tensor, x: torch.Tensor) -> torch.Tensor:
+    # Same next-step MSE as train_config, one value per member
+    return ((out[:, :-1] - x[1:]) ** 2).mean(dim=tuple(range(1, out.dim())))
+
+
+class StackedAdam:
+    """
+    Adam over stacked parameters with one learning rate per member, matching
+    ``torch.optim.Adam`` defaults step for step.
+    """
+
+    def __init__(self, params: Dict[str, torch.Tensor], lr: torch.Tensor,
+                 betas: Tuple[float, float] = (0.9, 0.999), eps: float = 1e-8) -> None:
+        self.params = params
+        self.lr = lr
+        self.betas = betas
+        self.eps = eps
+        self.step_count = 0
+        self.exp_avg = {name: torch.zeros_like(p) for name, p in params.items()}
+        self.exp_avg_sq = {name: torch.zeros_like(p) for name, p in params.items()}
+
+    @torch.no_grad()
+    def step(self, grads: Dict[str, torch.Tensor]) -> None:
+        beta1, beta2 = self.betas
+        self.step_count += 1
+        bias_correction1 = 1 - beta1 ** self.step_count
+        bias_correction2 = 1 - beta2 ** self.step_count
+        step_size = self.lr / bias_correction1
+
+        for name, param in self.params.items():
+            grad = grads[name]
+            exp_avg, exp_avg_sq = self.exp_avg[name], self.exp_avg_sq[name]
+            exp_avg.lerp_(grad, 1 - beta1)
+            exp_avg_sq.mul_(beta2).addcmul_(grad, grad, value=1 - beta2)
+            denom = (exp_avg_sq.sqrt() / bias_correction2 ** 0.5).add_(self.eps)
+            shape = (-1,) + (1,) * (param.dim() - 1)
+            param.sub_(step_size.view(shape) * exp_avg / denom)
+
+    def keep(self, rows: torch.Tensor) -> None:
+        """
+        Drop every member but ``rows`` from the parameters and the moments.
+        """
+        self.params = {name: p.detach()[rows].requires_grad_() for name, p in self.params.items()}
+        self.exp_avg = {name: m[rows] for name, m in self.exp_avg.items()}
+        self.exp_avg_sq = {name: m[rows] for name, m in self.exp_avg_sq.items()}
+        self.lr = self.lr[rows]
+
+
+def _train_group(
+    param_combinations: List[Tuple[Any, ...]],
+    train_data: Any,
+    validation_data: Any,
+    num_epochs: int,
+    min_epochs: int,
+    eta: int,
+    patience: Optional[int],
+    min_delta: float,
+    on_epoch: Optional[EpochCallback],
+) -> List[SearchResult]:
+    members = []
+    learning_rates = []
+    for params in param_combinations:
+        model, lr = build_mlp(params, train_data.x.shape[1])
+        members.append(model)
+        learning_rates.append(lr)
+    stacked, _ = stack_module_state(members)  # type: ignore
+    stacked = {name: p.detach().requires_grad_() for name, p in stacked.items()}
+
+    num_members = len(members)
+    hidden_dim = param_combinations[0][0]
+    dropout = torch.tensor([params[2] for params in param_combinations], dtype=torch.float32)
+    keep = (1 - dropout).view(-1, 1, 1, 1)
+    optimizer = StackedAdam(stacked, torch.tensor(learning_rates, dtype=torch.float32))
+
+    train_forward = vmap(_mlp_forward, in_dims=(0, None, 0))
+    eval_forward = vmap(_mlp_forward, in_dims=(0, None))
+
+    train_x, validation_x = train_data.x, validation_data.x
+    rung_ends = set(rung_budgets(num_epochs, min_epochs, eta)[:-1])
+
+    # Row r of the stacked tensors holds member active[r]
+    active = list(range(num_members))
+    best_loss = [float('inf')] * num_members
+    lowest_loss = [float('inf')] * num_members
+    best_state: List[Optional[Dict[str, torch.Tensor]]] = [None] * num_members
+    last_state: List[Optional[Dict[str, torch.Tensor]]] = [None] * num_members
+    epochs_without_improvement = [0] * num_members
+    stopped_early = [False] * num_members
+    train_loss_values: List[List[float]] = [[] for _ in range(num_members)]
+    validation_loss_values: List[List[float]] = [[] for _ in range(num_members)]
+
+    for epoch in range(num_epochs):
+        with profiling.span('mlp (stacked) epoch', 'epoch', hidden_dim=hidden_dim,
+                            members=len(active), epoch=epoch) as span:
+            stacked = optimizer.params
+            masks = (torch.rand((len(active), len(HIDDEN_LAYERS), train_x.shape[0], hidden_dim)) < keep)
+            masks = masks.to(train_x.dtype) / keep
+            train_losses = _member_losses(train_forward(stacked, train_x, masks), train_x)
+            # Members are independent, so the gradient of the sum is each member's own gradient
+            grads = torch.autograd.grad(train_losses.sum(), list(stacked.values()))
+            optimizer.step(dict(zip(stacked.keys(), grads)))
+
+            with torch.no_grad():
+                validation_losses = _member_losses(eval_forward(stacked, validation_x), validation_x)
+            span.tensors.extend((stacked, optimizer, grads))
+
+        epoch_train_losses, epoch_validation_losses = train_losses.tolist(), validation_losses.tolist()
+        leaving = []
+        for row, member in enumerate(active):
+            train_loss, validation_loss = epoch_train_losses[row], epoch_validation_losses[row]
+            train_loss_values[member].append(train_loss)
+            validation_loss_values[member].append(validation_loss)
+            if on_epoch is not None:
+                on_epoch(param_combinations[member], epoch, train_loss, validation_loss)
+
+            if validation_loss < lowest_loss[member]:
+                lowest_loss[member] = validation_loss
+                best_state[member] = {name: p[row].detach().clone() for name, p in stacked.items()}
+            if validation_loss < best_loss[member] - min_delta:
+                best_loss[member] = validation_loss
+                epochs_without_improvement[member] = 0
+            else:
+                epochs_without_improvement[member] += 1
+            if patience is not None and epochs_without_improvement[member] >= patience:
+                stopped_early[member] = True
+                leaving.append(row)
+
+        # End of a rung: only the best 1 / eta by latest validation loss go on
+        if epoch + 1 in rung_ends:
+            ranked = sorted((row for row in range(len(active)) if row not in leaving),
+                            key=lambda row: epoch_validation_losses[row])
+            leaving.extend(ranked[math.ceil(len(ranked) / eta):])
+
+        if leaving:
+            for row in leaving:
+                last_state[active[row]] = {name: p[row].detach().clone() for name, p in stacked.items()}
+            rows = [row for row in range(len(active)) if row not in leaving]
+            active = [active[row] for row in rows]
+            if not active:
+                break
+            optimizer.keep(torch.tensor(rows))
+            keep = keep[rows]
+
+    for row, member in enumerate(active):
+        last_state[member] = {name: p[row].detach().clone() for name, p in optimizer.params.items()}
+
+    results = []
+    for member, params in enumerate(param_combinations):
+        results.append(SearchResult(
+            params,
+            train_loss_values[member],
+            validation_loss_values[member],
+            best_state[member] if best_state[member] is not None else last_state[member],
+            None,
+            stopped_early[member],
+            last_state_dict=last_state[member],
+        ))
+    return results
+
+
+def train_stacked_mlp(
+    param_combinations: Sequence[Tuple[Any, ...]],
+    train_data: Any,
+    validation_data: Any,
+    num_epochs: int = 50,
+    min_epochs: int = 5,
+    eta: int = 3,
+    patience: Optional[int] = None,
+    min_delta: float = 0.0,
+    on_epoch: Optional[EpochCallback] = None,
+    seed: Optional[int] = None,
+    cache: Optional[ModelCache] = None,
+) -> List[SearchResult]:
+    """
+    Successive-halving search over (hidden_dim, lr, dropout_rate) MLP
+    configurations, one stacked model per hidden size, with the rungs of
+    ``successive_halving('mlp', ...)`` applied within each group
+    (``min_epochs >= num_epochs`` trains every member for the full budget).
+    Results come back in ``param_combinations`` order and hold the epochs
+    each member actually trained.
+
+    Members of a group share the random stream, so a member's cache key
+    covers the whole group it was trained with.
+    """
+    param_combinations = list(param_combinations)
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for index, params in enumerate(param_combinations):
+        groups[params[0]].append(index)
+
+    data_hash = data_fingerprint(train_data, validation_data) if cache is not None else ''
+    results: List[Optional[SearchResult]] = [None] * len(param_combinations)
+    for indices in groups.values():
+        group = [param_combinations[i] for i in indices]
+        if cache is not None:
+            keys = [
+                cache_key(model=f"stacked:{class_fingerprint(BaselineMLPModel)}",
+                          builder=class_fingerprint(build_mlp), params=tuple(params), input_dim=train_data.x.shape[1],
+                          group=tuple(map(tuple, group)), data=data_hash, num_epochs=num_epochs,
+                          rungs=tuple(rung_budgets(num_epochs, min_epochs, eta)), eta=eta, seed=seed,
+                          patience=patience, min_delta=min_delta, weights=WEIGHTS_VERSION)
+                for params in group
+            ]
+            cached = [load_cached(cache, key, params) for key, params in zip(keys, group)]
+            if all(result is not None for result in cached):
+                for index, result in zip(indices, cached):
+                    results[index] = result
+                continue
+
+        if seed is not None:
+            torch.manual_seed(seed)
+        group_results = _train_group(group, train_data, validation_data, num_epochs, min_epochs, eta,
+                                     patience, min_delta, on_epoch)
+        for position, (index, result) in enumerate(zip(indices, group_results)):
+            if cache is not None:
+                result = store_cached(cache, keys[position], 'mlp', result, data_hash, seed)
+            results[index] = result
+    return results  # type: ignore
@@ -0,0 +1,254 @@
+"""
+Figures of the pipeline and where they go.
+
+Every chart project.py draws is built by one of the module-level builders
+below, called through ``plot``. What happens to it depends on the active
+``FigureReport``:
+
+* ``show``   build it in-process and block on ``plt.show()`` / ``fig.show()``
+             (the interactive behaviour of the original script)
+* ``report`` hand the builder and its data to a pool of worker processes
+             that render on the non-interactive Agg backend, matplotlib
+             figures to PNG and plotly figures to HTML, and write an
+             ``index.html`` linking all of them when the run ends
+* ``none``   skip figures altogether
+
+In report mode ``plot`` returns immediately, so rendering runs alongside
+the computation instead of in front of it.
+"""
+import html
+import multiprocessing
+import os
+import re
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, List, NamedTuple, Optional
+
+import pandas as pd
+
+PLOT_MODES = ('show', 'report', 'none')
+
+DEFAULT_REPORT_DIR = 'report'
+
+
+# =========================
+# FIGURE BUILDERS
+# =========================
+
+def close_price_figure(ticker: str, close: pd.Series) -> Any:
+    import matplotlib.pyplot as plt
+
+    figure = plt.figure(figsize=(14, 7))  # type: ignore
+    plt.plot(close.index, close, label=f'{ticker} Close Price')  # type: ignore
+    plt.title(f'{ticker} Close Price Over Time')  # type: ignore
+    plt.xlabel('Date')  # type: ignore
+    plt.ylabel('Close Price')  # type: ignore
+    plt.legend()  # type: ignore
+    return figure
+
+
+def line_chart(series: pd.Series, column: str, label: str, title: str) -> Any:
+    import plotly.express as px  # type: ignore
+
+    df = series.reset_index()
+    df.columns = ['date', column]
+
+    fig = px.line(df, x='date', y=column,  # type: ignore
+                  labels={'date': 'Date', column: label})
+    fig.update_traces(marker_line_width=2, opacity=0.8)  # type: ignore
+    fig.update_layout(  # type: ignore
+        title_text=title,
+        plot_bgcolor='white',
+        font_size=15,
+        font_color='black'
+    )
+    fig.update_xaxes(showgrid=False)  # type: ignore
+    fig.update_yaxes(showgrid=False)  # type: ignore
+    return fig
+
+
+def spillover_heatmap(spillover_matrix: pd.DataFrame, title: str) -> Any:
+    import matplotlib.pyplot as plt
+    import seaborn as sns  # type: ignore
+
+    figure = plt.figure(figsize=(10, 8))  # type: ignore
+    plt.title(title)  # type: ignore
+    sns.heatmap(spillover_matrix, annot=True, cmap="coolwarm", fmt=".2f", linewidths=0.5)  # type: ignore
+    return figure
+
+
+def spillover_graph(spillover_matrix: pd.DataFrame, title: str, node_color: str) -> Any:
+    """
+    The spillover graph drawn with a spring layout.
+    """
+    import matplotlib.pyplot as plt
+    import networkx as nx  # type: ignore
+
+    from project import create_spillover_graph
+
+    G = create_spillover_graph(spillover_matrix)
+
+    figure = plt.figure(figsize=(12, 8))  # type: ignore
+    pos = nx.spring_layout(G)  # type: ignore
+    nx.draw(G, pos, with_labels=True, node_color=node_color, node_size=3000,  # type: ignore
+            font_size=12, font_weight='bold', edge_color='gray', width=2)
+    edge_labels = nx.get_edge_attributes(G, 'weight')  # type: ignore
+    nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=10)  # type: ignore
+    plt.title(title)  # type: ignore
+    return figure
+
+
+def loss_curves(train_losses: List[float], validation_losses: List[float], title: str) -> Any:
+    import matplotlib.pyplot as plt
+
+    figure = plt.figure(figsize=(12, 6))  # type: ignore
+    plt.plot(range(len(train_losses)), train_losses, label='Training Loss', color='blue')  # type: ignore
+    plt.plot(range(len(validation_losses)), validation_losses, label='Validation Loss', color='red')  # type: ignore
+    plt.title(title)  # type: ignore
+    plt.xlabel('Epochs')  # type: ignore
+    plt.ylabel('Loss')  # type: ignore
+    plt.legend()  # type: ignore
+    plt.grid(True)  # type: ignore
+    return figure
+
+
+# =========================
+# RENDERING
+# =========================
+
+def _is_plotly(figure: Any) -> bool:
+    return hasattr(figure, 'write_html')
+
+
+def _init_worker() -> None:
+    import matplotlib
+
+    matplotlib.use('Agg')
+    # Lower priority, so rendering only takes CPU time the computation leaves idle
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+
+def _render(builder: Callable[..., Any], args: tuple, path_stem: str) -> str:  # type: ignore
+    """
+    Build one figure and write it next to ``path_stem``; returns the file name.
+    """
+    figure = builder(*args)
+    if _is_plotly(figure):
+        path = f"{path_stem}.html"
+        figure.write_html(path, include_plotlyjs='cdn')
+    else:
+        import matplotlib.pyplot as plt
+
+        path = f"{path_stem}.png"
+        figure.savefig(path, dpi=100)
+        plt.close(figure)
+    return os.path.basename(path)
+
+
+class ReportEntry(NamedTuple):
+    section: str
+    title: str
+    future: 'Future[str]'
+
+
+class FigureReport:
+    """
+    Destination of the figures of one pipeline run (see the module docstring
+    for the modes). ``section`` labels the figures in the index; project.py
+    sets it to the running stage.
+    """
+
+    def __init__(self, mode: str = 'show', directory: str = DEFAULT_REPORT_DIR,
+                 max_workers: Optional[int] = None) -> None:
+        if mode not in PLOT_MODES:
+            raise ValueError(f"unknown plot mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.section = ''
+        self.entries: List[ReportEntry] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if mode == 'report':
+            os.makedirs(directory, exist_ok=True)
+            # Spawned workers start without the parent's torch threads or GUI state
+            self._executor = ProcessPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1),
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker)
+
+    def plot(self, builder: Callable[..., Any], *args: Any, title: str = '') -> None:
+        if self.mode == 'none':
+            return
+        if self.mode == 'show':
+            figure = builder(*args)
+            if _is_plotly(figure):
+                figure.show()
+            else:
+                import matplotlib.pyplot as plt
+
+                plt.show()  # type: ignore
+            return
+
+        slug = re.sub(r'[^0-9A-Za-z]+', '-', f"{self.section} {title}").strip('-').lower()
+        path_stem = os.path.join(self.directory, f"{len(self.entries):03d}-{slug}")
+        future = self._executor.submit(_render, builder, args, path_stem)  # type: ignore
+        self.entries.append(ReportEntry(self.section, title, future))
+
+    def close(self) -> Optional[str]:
+        """
+        Wait for every figure and write the index page; returns its path in
+        report mode.
+        """
+        if self._executor is None:
+            return None
+        items = []
+        current_section = None
+        for entry in self.entries:
+            if entry.section != current_section:
+                current_section = entry.section
+                items.append(f"<h2>{html.escape(entry.section)}</h2>")
+            title = html.escape(entry.title)
+            try:
+                name = html.escape(entry.future.result())
+            except Exception as e:
+                print(f"Figure '{entry.title}' failed: {e}")
+                items.append(f"<p><b>{title}</b>: failed ({html.escape(str(e))})</p>")
+                continue
+            if name.endswith('.html'):
+                body = f'<iframe src="{name}" width="100%" height="520" frameborder="0"></iframe>'
+            else:
+                body = f'<img src="{name}" alt="{title}" style="max-width: 100%;">'
+            items.append(f'<figure>{body}<figcaption><a href="{name}">{title}</a></figcaption></figure>')
+        self._executor.shutdown()
+        self._executor = None
+
+        path = os.path.join(self.directory, 'index.html')
+        with open(path, 'w') as f:
+            f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Pipeline figures</title></head>\n"
+                    "<body style=\"font-family: sans-serif; max-width: 1100px; margin: auto;\">\n"
+                    "<h1>Pipeline figures</h1>\n" + "\n".join(items) + "\n</body></html>\n")
+        return path
+
+    def __enter__(self) -> 'FigureReport':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# Report of the running pipeline; figures outside a run are shown interactively
+_active = FigureReport('show')
+
+
+def plot(builder: Callable[..., Any], *args: Any, title: str = '') -> None:
+    """
+    Send ``builder(*args)`` to the active report.
+    """
+    _active.plot(builder, *args, title=title)
+
+
+def activate(report: FigureReport) -> FigureReport:
+    """
+    Make ``report`` receive ``plot`` calls; returns the previous one.
+    """
+    global _active
+    previous, _active = _active, report
+    return previous
@@ -0,0 +1,113 @@
+"""
+Content hashes used as cache keys.
+
+Kept free of numpy and torch so that deciding whether something is cached
+never has to import the libraries needed to compute it.
+"""
+import ast
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import textwrap
+import types
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional, Set
+
+
+def class_fingerprint(cls: Any) -> str:
+    """
+    Qualified name plus a hash of the class (or function) source, so editing
+    it invalidates whatever was cached with the old code.
+    """
+    try:
+        source = inspect.getsource(cls)
+    except (OSError, TypeError):
+        source = ''
+    return f"{cls.__module__}.{cls.__qualname__}:{hashlib.sha256(source.encode()).hexdigest()[:16]}"
+
+
+def code_fingerprint(func: Any) -> str:
+    """
+    Like ``class_fingerprint``, but also covers the functions of its own
+    module that ``func`` calls and every module next to it that any of them
+    imports, directly or through other such modules. Editing a helper or an
+    imported module of the project therefore invalidates it too.
+    """
+    root = os.path.dirname(os.path.abspath(inspect.getsourcefile(func) or ''))
+    functions: Dict[str, str] = {}
+    modules: Dict[str, str] = {}
+    pending_functions = [func]
+    pending_modules: Set[str] = set()
+    while pending_functions:
+        function = pending_functions.pop()
+        if function.__qualname__ in functions:
+            continue
+        source = textwrap.dedent(inspect.getsource(function))
+        functions[function.__qualname__] = source
+        pending_modules |= _imported_modules(source)
+        for name in _referenced_names(function.__code__):
+            value = function.__globals__.get(name)
+            if isinstance(value, types.FunctionType) and value.__module__ == func.__module__:
+                pending_functions.append(value)
+            elif isinstance(value, types.ModuleType):
+                pending_modules.add(value.__name__)
+
+    while pending_modules:
+        name = pending_modules.pop()
+        if name in modules:
+            continue
+        source = _local_module_source(name, root)
+        if source is not None:
+            modules[name] = source
+            pending_modules |= _imported_modules(source)
+
+    payload = json.dumps({'functions': functions, 'modules': modules}, sort_keys=True)
+    return f"{func.__module__}.{func.__qualname__}:{hashlib.sha256(payload.encode()).hexdigest()[:16]}"
+
+
+def _referenced_names(code: types.CodeType) -> Set[str]:
+    # Global names used by the function and the functions nested in it
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _referenced_names(const)
+    return names
+
+
+@lru_cache(maxsize=None)
+def _imported_modules(source: str) -> FrozenSet[str]:
+    # Top-level names of every absolute import, including function-level ones;
+    # memoized, since every stage walks the same shared modules
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split('.')[0])
+    return frozenset(names)
+
+
+def _local_module_source(name: str, root: str) -> Optional[str]:
+    # Source of ``name`` if it is a module file in ``root``; located without importing it
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin or not spec.origin.endswith('.py'):
+        return None
+    if os.path.dirname(os.path.abspath(spec.origin)) != root:
+        return None
+    with open(spec.origin) as f:
+        return f.read()
+
+
+def cache_key(**fields: Any) -> str:
+    """
+    Stable hash of keyword fields (classes, hyperparameters, seed, schedule,
+    data fingerprint, ...). Values are serialized with ``repr`` after sorting
+    the field names.
+    """
+    payload = json.dumps({name: repr(value) for name, value in sorted(fields.items())})
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,243 @@
+"""
+Standalone CPU inference for the exported forecasting models.
+
+``export_models`` traces the chosen GCN + GAT and MLP models to TorchScript
+(and ONNX when the ``onnx`` package is installed) and writes them to one
+directory with a ``manifest.json`` holding the static ``edge_index``, the
+market names and a recent volatility history. ``ForecastEngine`` loads that
+directory with nothing but torch and numpy, so serving never imports the
+training script, torch_geometric or the model classes.
+
+Both models forecast from the output row of the latest observation. With
+the static spillover graph only touching rows 0 .. N - 1 of ``x``, the last
+``context_rows`` rows of history (N + 1 for the graph model, 1 for the MLP)
+reproduce the full-history forecast exactly, so a request is a small
+(context_rows x N) window. ``MicroBatcher`` merges concurrent requests for
+a model into one forward pass over a disjoint union of their windows.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch  # type: ignore
+
+DEFAULT_EXPORT_DIR = 'exported_models'
+
+
+class _TensorInputs(torch.nn.Module):  # type: ignore
+    """
+    Gives a ``forward(data)`` model a ``forward(x, edge_index)`` signature
+    that TorchScript tracing and ONNX export can handle.
+    """
+
+    def __init__(self, model: torch.nn.Module) -> None:
+        super().__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor, edge_index: torch.Tensor) -> torch.Tensor:
+        return self.model(SimpleNamespace(x=x, edge_index=edge_index))
+
+
+def export_models(
+    directory: str,
+    models: Dict[str, Tuple[torch.nn.Module, bool]],
+    edge_index: torch.Tensor,
+    markets: Sequence[str],
+    history: Optional[np.ndarray] = None,
+    dates: Optional[Sequence[Any]] = None,
+    formats: Sequence[str] = ('torchscript',),
+    cache_keys: Optional[Dict[str, Optional[str]]] = None,
+) -> str:
+    """
+    Export ``models`` ({name: (model, uses_graph)}) for inference and return
+    the manifest path. ``history`` ((T x N) realized volatility, with
+    ``dates``) is stored alongside for clients that forecast from it.
+    ``cache_keys`` records the ``ModelCache`` run each model was selected from.
+    """
+    os.makedirs(directory, exist_ok=True)
+    num_markets = len(markets)
+    edge_index = edge_index.to(torch.long)
+    manifest: Dict[str, Any] = {
+        'markets': list(markets),
+        'edge_index': edge_index.tolist(),
+        'models': {},
+    }
+
+    for name, (model, uses_graph) in models.items():
+        model.eval()
+        context_rows = num_markets + 1 if uses_graph else 1
+        example_x = torch.zeros(context_rows, num_markets)
+        example_edges = edge_index if uses_graph else torch.zeros(2, 0, dtype=torch.long)
+        wrapped = _TensorInputs(model)
+        with torch.no_grad():
+            output_dim = int(wrapped(example_x, example_edges).shape[-1])
+            traced = torch.jit.trace(wrapped, (example_x, example_edges))
+        entry = {'torchscript': f"{name}.pt", 'context_rows': context_rows,
+                 'output_dim': output_dim, 'uses_graph': uses_graph,
+                 'cache_key': (cache_keys or {}).get(name)}
+        torch.jit.save(traced, os.path.join(directory, entry['torchscript']))
+
+        if 'onnx' in formats:
+            import onnx  # type: ignore  # noqa: F401  (fail early with a clear ImportError)
+
+            entry['onnx'] = f"{name}.onnx"
+            torch.onnx.export(wrapped, (example_x, example_edges), os.path.join(directory, entry['onnx']),
+                              input_names=['x', 'edge_index'], output_names=['forecast'],
+                              dynamic_axes={'x': {0: 'rows'}, 'edge_index': {1: 'edges'}, 'forecast': {0: 'rows'}})
+        manifest['models'][name] = entry
+
+    if history is not None:
+        np.save(os.path.join(directory, 'history.npy'), np.asarray(history, dtype=np.float32))
+        manifest['history'] = 'history.npy'
+        if dates is not None:
+            manifest['dates'] = [str(date)[:10] for date in dates]
+
+    path = os.path.join(directory, 'manifest.json')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ForecastEngine:
+    """
+    Exported models loaded from ``export_models`` output, ready for batched
+    CPU inference.
+    """
+
+    def __init__(self, directory: str = DEFAULT_EXPORT_DIR) -> None:
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        self.markets: List[str] = self.manifest['markets']
+        self.edge_index = torch.tensor(self.manifest['edge_index'], dtype=torch.long).view(2, -1)
+        self.models = {
+            name: torch.jit.optimize_for_inference(torch.jit.load(os.path.join(directory, entry['torchscript'])))
+            for name, entry in self.manifest['models'].items()
+        }
+        # Tiled edge_index per (model, batch size); requests of one size reuse it
+        self._batch_edges: Dict[Tuple[str, int], torch.Tensor] = {}
+
+    def context_rows(self, name: str) -> int:
+        return int(self.manifest['models'][name]['context_rows'])
+
+    def history(self) -> Tuple[np.ndarray, List[str]]:
+        """
+        Stored (T x N) volatility history and its dates.
+        """
+        values = np.load(os.path.join(self.directory, self.manifest['history']))
+        return values, self.manifest.get('dates', [])
+
+    def _edges(self, name: str, batch_size: int) -> torch.Tensor:
+        key = (name, batch_size)
+        if key not in self._batch_edges:
+            if not self.manifest['models'][name]['uses_graph']:
+                self._batch_edges[key] = torch.zeros(2, 0, dtype=torch.long)
+            else:
+                rows = self.context_rows(name)
+                E = self.edge_index.shape[1]
+                offsets = torch.arange(batch_size).repeat_interleave(E) * rows
+                self._batch_edges[key] = self.edge_index.repeat(1, batch_size) + offsets
+        return self._batch_edges[key]
+
+    def forecast_batch(self, name: str, windows: np.ndarray) -> np.ndarray:
+        """
+        (B x output_dim) next-step forecasts for B (context_rows x N) windows.
+        """
+        windows = torch.from_numpy(np.ascontiguousarray(windows, dtype=np.float32))
+        B, rows, N = windows.shape
+        if rows != self.context_rows(name):
+            raise ValueError(f"{name} forecasts from {self.context_rows(name)} rows of history, got {rows}")
+        with torch.no_grad():
+            out = self.models[name](windows.reshape(B * rows, N), self._edges(name, B))
+        return out.view(B, rows, -1)[:, -1].numpy()
+
+    def forecast(self, name: str, history: np.ndarray) -> np.ndarray:
+        """
+        Forecast from the most recent rows of a (T x N) history.
+        """
+        rows = self.context_rows(name)
+        return self.forecast_batch(name, np.asarray(history)[None, -rows:])[0]
+
+    def rolling_forecasts(self, name: str, history: np.ndarray) -> np.ndarray:
+        """
+        One-step forecast made at every row of ``history`` that has a full
+        context, in one forward pass: row i forecasts row i + 1.
+        """
+        rows = self.context_rows(name)
+        history = np.asarray(history, dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(history, rows, axis=0).transpose(0, 2, 1)
+        return self.forecast_batch(name, windows)
+
+
+class MicroBatcher:
+    """
+    Request queue in front of one model of a ``ForecastEngine``.
+
+    ``submit`` returns a Future right away; a background thread takes the
+    first waiting request, keeps collecting for at most ``max_delay``
+    seconds or until ``max_batch_size`` requests, and answers all of them
+    from a single ``forecast_batch`` call.
+    """
+
+    def __init__(self, engine: ForecastEngine, name: str, max_batch_size: int = 64, max_delay: float = 0.0005) -> None:
+        self.engine = engine
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._rows = engine.context_rows(name)
+        self._queue: 'queue.Queue[Optional[Tuple[np.ndarray, Future]]]' = queue.Queue()  # type: ignore
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def submit(self, history: np.ndarray) -> Future:  # type: ignore
+        future: Future = Future()  # type: ignore
+        self._queue.put((np.asarray(history, dtype=np.float32)[-self._rows:], future))
+        return future
+
+    def forecast(self, history: np.ndarray) -> np.ndarray:
+        return self.submit(history).result()
+
+    def _serve(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            try:
+                forecasts = self.engine.forecast_batch(self.name, np.stack([window for window, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), forecast in zip(batch, forecasts):
+                future.set_result(forecast)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self) -> 'MicroBatcher':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
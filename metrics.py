@@ -0,0 +1,103 @@
+"""
+Multi-horizon forecast metrics.
+
+``forecast_metrics`` scores predictions against the realized values ``h``
+steps later for every horizon and every market. For each horizon the
+h-shifted targets are a view of the actuals, and MAFE / MSE / RMSE / MAPE
+are reductions over the time axis, computed a block of markets at a time so
+memory stays bounded by ``CHUNK_ELEMENTS`` however wide the panel is. MAPE
+skips zero actuals, which is the definition
+``mean_absolute_percentage_error`` in project.py always used.
+"""
+import math
+from typing import Any, Optional, Sequence
+
+import pandas as pd
+import torch  # type: ignore
+
+METRICS = ('MAFE', 'MSE', 'RMSE', 'MAPE')
+
+# Elements of the (..., time, market) error block reduced at once
+CHUNK_ELEMENTS = 1 << 22
+
+
+def metric_tensor(actuals: torch.Tensor, predictions: torch.Tensor, horizons: Sequence[int]) -> torch.Tensor:
+    """
+    (..., horizon, market, metric) tensor of MAFE, MSE, RMSE and MAPE.
+
+    ``actuals`` is (T x N). ``predictions`` is (P x N) or (P x 1) (one
+    forecast broadcast to every market), optionally with leading batch
+    dimensions for many models or windows at once. For horizon h, row t of
+    the predictions is compared to row t + h of the actuals. The result has
+    the floating dtype of the inputs.
+    """
+    actuals = torch.as_tensor(actuals).detach()
+    predictions = torch.as_tensor(predictions).detach()
+    dtype = torch.promote_types(actuals.dtype, predictions.dtype)
+    if not dtype.is_floating_point:
+        dtype = torch.get_default_dtype()
+    actuals, predictions = actuals.to(dtype), predictions.to(dtype)
+
+    T, N = actuals.shape
+    P = predictions.shape[-2]
+    batch_shape = predictions.shape[:-2]
+    broadcast = predictions.shape[-1] == 1
+    rows = min(P, T - min(horizons))
+    values = torch.full((*batch_shape, len(horizons), N, len(METRICS)), math.nan, dtype=dtype)
+
+    for position, horizon in enumerate(horizons):
+        length = min(rows, T - horizon)
+        if length <= 0:
+            continue
+        chunk = max(1, CHUNK_ELEMENTS // (length * max(1, batch_shape.numel())))
+        for lo in range(0, N, chunk):
+            hi = min(lo + chunk, N)
+            targets = actuals[horizon:horizon + length, lo:hi]                     # (L, n) view
+            forecasts = predictions[..., :length, :] if broadcast else predictions[..., :length, lo:hi]
+
+            errors = torch.sub(forecasts, targets).abs_()                          # (..., L, n)
+            out = values[..., position, lo:hi, :]
+            out[..., 0] = errors.sum(dim=-2) / length
+            out[..., 1] = errors.square().sum(dim=-2) / length
+            out[..., 2] = out[..., 1].sqrt()
+
+            scale = targets.abs()
+            zero = scale == 0
+            errors.div_(scale.masked_fill_(zero, 1)).masked_fill_(zero, 0)
+            out[..., 3] = errors.sum(dim=-2) / (length - zero.sum(dim=-2)) * 100
+    return values
+
+
+def forecast_metrics(
+    actuals: Any,
+    predictions: Any,
+    horizons: Sequence[int] = (1, 5, 10, 22),
+    markets: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    Tidy table with one row per (horizon, market, metric) (plus a leading
+    ``model`` column when ``predictions`` has a batch dimension).
+    """
+    values = metric_tensor(actuals, predictions, horizons).cpu().numpy()
+    num_markets = values.shape[-2]
+    markets = list(markets) if markets is not None else [f"Index {i + 1}" for i in range(num_markets)]
+
+    index_levels = [list(horizons), markets, list(METRICS)]
+    names = ['horizon', 'market', 'metric']
+    if values.ndim == 4:
+        index_levels.insert(0, list(range(values.shape[0])))
+        names.insert(0, 'model')
+    index = pd.MultiIndex.from_product(index_levels, names=names)
+    return pd.DataFrame({'value': values.reshape(-1)}, index=index).reset_index()
+
+
+def metrics_by_horizon(table: pd.DataFrame) -> dict:  # type: ignore
+    """
+    One market x metric frame per horizon, in the layout project.py prints.
+    """
+    wide = table.pivot_table(index=['horizon', 'market'], columns='metric', values='value', sort=False)
+    wide = wide[list(METRICS)]
+    return {
+        horizon: frame.droplevel('horizon').rename_axis(None, axis=1).reset_index().rename(columns={'market': 'Index'})
+        for horizon, frame in wide.groupby(level='horizon', sort=False)
+    }
@@ -0,0 +1,126 @@
+"""
+On-disk cache of trained models.
+
+Every training run is stored under a hash of what determines its outcome:
+the model class (name and source), the hyperparameters, the seed, the
+training schedule and the content of the training/validation tensors. Each
+entry is ``<key>.pt`` (state_dict, optimizer state, loss curves) plus a
+small ``<key>.json`` with the same metadata and loss curves, so listing
+runs never has to unpickle weights. Rerunning on unchanged data turns every
+training call into a file read.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import torch  # type: ignore
+
+from fingerprints import cache_key, class_fingerprint  # noqa: F401  (re-exported)
+
+DEFAULT_CACHE_DIR = '.model_cache'
+
+
+def tensor_fingerprint(tensors: Iterable[torch.Tensor]) -> str:
+    """
+    Content hash of tensors: dtype, shape and raw bytes of each.
+    """
+    digest = hashlib.sha256()
+    for tensor in tensors:
+        array = np.ascontiguousarray(tensor.detach().cpu().numpy())
+        digest.update(f"{array.dtype}{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def data_fingerprint(*datasets: Any) -> str:
+    """
+    Content hash of PyG ``Data`` objects, over ``x`` and ``edge_index``.
+    """
+    return tensor_fingerprint(t for data in datasets for t in (data.x, data.edge_index))
+
+
+class ModelCache:
+    """
+    Directory of trained runs addressed by ``cache_key``.
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR) -> None:
+        self.root = root
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.root, f"{key}{suffix}")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key, '.pt'))
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored entry with ``state_dict``, ``optimizer_state``, ``last_state_dict``,
+        ``train_losses``, ``validation_losses`` and ``meta``, or None on a miss.
+        """
+        path = self._path(key, '.pt')
+        if not os.path.exists(path):
+            return None
+        return torch.load(path, map_location='cpu', weights_only=False)
+
+    def store(
+        self,
+        key: str,
+        state_dict: Dict[str, torch.Tensor],
+        train_losses: List[float],
+        validation_losses: List[float],
+        optimizer_state: Optional[Dict[str, Any]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+        last_state_dict: Optional[Dict[str, torch.Tensor]] = None,
+    ) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        meta = dict(meta or {})
+        entry = {
+            'state_dict': state_dict,
+            'optimizer_state': optimizer_state,
+            'last_state_dict': last_state_dict,
+            'train_losses': list(train_losses),
+            'validation_losses': list(validation_losses),
+            'meta': meta,
+        }
+        # Write to temporary files and rename, so readers never see a partial entry
+        tmp_path = self._path(key, '.pt.tmp')
+        torch.save(entry, tmp_path)
+        os.replace(tmp_path, self._path(key, '.pt'))
+
+        summary = dict(meta, key=key, train_losses=entry['train_losses'],
+                       validation_losses=entry['validation_losses'])
+        tmp_path = self._path(key, '.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f, default=repr)
+        os.replace(tmp_path, self._path(key, '.json'))
+
+    def summary(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadata and loss curves of one stored run, or None on a miss.
+        """
+        path = self._path(key, '.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        Metadata and loss curves of every stored run, newest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        summaries = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.root, name)
+            with open(path) as f:
+                summary = json.load(f)
+            summary['modified'] = os.path.getmtime(path)
+            summaries.append(summary)
+        summaries.sort(key=lambda summary: summary['modified'], reverse=True)
+        return summaries
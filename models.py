@@ -0,0 +1,63 @@
+"""
+Forecasting models trained by project.py: the GCN + GAT spillover network and
+the baseline MLP. Kept in their own module so worker processes can import
+them without running the pipeline.
+"""
+from typing import Any
+
+import torch  # type: ignore
+import torch.nn as nn  # type: ignore
+import torch.nn.functional as F  # type: ignore
+from torch_geometric.nn import GATConv, GCNConv  # type: ignore
+
+
+class GCN_GAT_Model(torch.nn.Module):
+    def __init__(self, node_feature_dim: int, hidden_dim: int, num_heads: int, num_layers: int = 2, dropout_p: float = 0.5, output_dim: int = 8) -> None:  # type: ignore
+        super(GCN_GAT_Model, self).__init__()  # type: ignore
+        self.num_layers = num_layers
+        self.gcn_layers = torch.nn.ModuleList()
+        self.gat_layers = torch.nn.ModuleList()
+        self.dropout = torch.nn.Dropout(p=dropout_p)
+
+        self.gcn_layers.append(GCNConv(node_feature_dim, hidden_dim))
+        for _ in range(1, num_layers):
+            self.gcn_layers.append(GCNConv(hidden_dim, hidden_dim))
+
+        for _ in range(num_layers):
+            self.gat_layers.append(GATConv(hidden_dim, hidden_dim, heads=num_heads, concat=False))
+
+        self.fc = torch.nn.Linear(hidden_dim, output_dim)
+
+    def forward(self, data: Any) -> Any:  # type: ignore
+        x, edge_index = data.x, data.edge_index  # type: ignore
+
+        for gcn in self.gcn_layers:
+            x = gcn(x, edge_index)
+            x = F.relu(x)
+            x = self.dropout(x)
+
+        for gat in self.gat_layers:
+            x = gat(x, edge_index)
+            x = F.relu(x)
+            x = self.dropout(x)
+
+        out = self.fc(x)
+        return out
+
+
+class BaselineMLPModel(nn.Module):
+    def __init__(self, input_dim: int, hidden_dim: int, dropout_rate: float) -> None:  # type: ignore
+        super(BaselineMLPModel, self).__init__()  # type: ignore
+        self.fc1 = nn.Linear(input_dim, hidden_dim)  # type: ignore
+        self.fc2 = nn.Linear(hidden_dim, hidden_dim)  # type: ignore
+        self.fc3 = nn.Linear(hidden_dim, hidden_dim)  # type: ignore
+        self.fc_final = nn.Linear(hidden_dim, 1)  # type: ignore
+        self.dropout = nn.Dropout(p=dropout_rate)  # type: ignore
+
+    def forward(self, data: Any) -> Any:  # type: ignore
+        x = data.x  # type: ignore
+        x = F.relu(self.fc1(x)); x = self.dropout(x)
+        x = F.relu(self.fc2(x)); x = self.dropout(x)
+        x = F.relu(self.fc3(x)); x = self.dropout(x)
+        out = self.fc_final(x)
+        return out
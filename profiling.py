@@ -0,0 +1,282 @@
+"""
+Where the time and memory of a pipeline run go.
+
+A ``Profiler`` records spans: every stage project.py runs or loads from the
+stage cache, the expensive steps inside them (price fetch, realized
+volatility, ADF tests, the VAR/FEVD grid, rolling spillover) and every
+epoch of the GCN+GAT, MLP and snapshot training loops. Each span carries
+
+* wall and CPU time
+* peak RSS of the process at its end, and how much the span raised it
+* tensor memory: the bytes of tensors it produced or trained (model
+  parameters, gradients and optimizer state for an epoch), plus the peak
+  CUDA allocation when running on a GPU
+
+``write`` saves them as one JSON file that is both a Chrome trace (open it
+in ``chrome://tracing`` or https://ui.perfetto.dev) and a per-stage /
+per-epoch summary for scripts to compare. Epochs trained in forked worker
+processes are spooled to disk by the worker and merged into the trace under
+its pid.
+
+With ``cprofile_dir`` every stage that runs is also profiled with cProfile
+and dumped to ``<cprofile_dir>/<stage>.prof`` (``snakeviz``, ``pstats``).
+For sampling instead, run the pipeline under ``py-spy record -o
+profile.svg -- python project.py``; stages are plain functions named after
+the stage, so they show up as such in the flame graph.
+
+    python project.py train --profile profile.json --cprofile prof/
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+MB = 1024 * 1024
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of this process in bytes (0 where unavailable).
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def tensor_bytes(*objects: Any) -> int:
+    """
+    Bytes of the distinct tensor storages reachable from ``objects``: tensors,
+    modules (parameters, gradients, buffers), optimizers, containers and the
+    attributes of plain objects such as PyG ``Data``. Views of one storage
+    count once.
+    """
+    if 'torch' not in sys.modules:
+        return 0
+    import torch  # type: ignore
+
+    storages: Dict[int, int] = {}
+    seen = set()
+    pending = list(objects)
+    while pending:
+        obj = pending.pop()
+        if obj is None or isinstance(obj, (str, bytes, int, float, bool)) or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, torch.Tensor):
+            storage = obj.untyped_storage()
+            storages[storage.data_ptr()] = storage.nbytes()
+            if obj.grad is not None:
+                pending.append(obj.grad)
+        elif isinstance(obj, torch.nn.Module):
+            pending.extend(obj.parameters())
+            pending.extend(obj.buffers())
+        elif isinstance(obj, torch.optim.Optimizer):
+            pending.extend(obj.state.values())
+        elif isinstance(obj, dict):
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            pending.extend(obj)
+        elif hasattr(obj, '__dict__') and type(obj).__module__.split('.')[0] not in ('pandas', 'numpy'):
+            pending.extend(vars(obj).values())
+    return sum(storages.values())
+
+
+def _cuda_in_use() -> bool:
+    torch = sys.modules.get('torch')
+    return torch is not None and torch.cuda.is_available() and torch.cuda.is_initialized()  # type: ignore
+
+
+class Span:
+    """
+    A span being recorded; objects added to ``tensors`` are measured with
+    ``tensor_bytes`` when it ends.
+    """
+
+    def __init__(self, args: Dict[str, Any]) -> None:
+        self.args = args
+        self.tensors: List[Any] = []
+
+
+class Profiler:
+    """
+    Collects spans of one pipeline run (see the module docstring). A disabled
+    profiler records nothing and costs one function call per span.
+    """
+
+    def __init__(self, enabled: bool = True, cprofile_dir: Optional[str] = None) -> None:
+        self.enabled = enabled
+        self.cprofile_dir = cprofile_dir
+        self.events: List[Dict[str, Any]] = []
+        self._pid = os.getpid()
+        self._origin = time.perf_counter()
+        # Forked workers inherit this object and append their spans here
+        self._spool_dir = tempfile.mkdtemp(prefix='profile-') if enabled else None
+
+    @contextmanager
+    def span(self, name: str, category: str = 'step', **args: Any) -> Iterator[Span]:
+        span = Span(args)
+        if not self.enabled:
+            yield span
+            return
+
+        cprofile = None
+        if category == 'stage' and self.cprofile_dir is not None:
+            import cProfile
+
+            cprofile = cProfile.Profile()
+        cuda = _cuda_in_use()
+        if cuda:
+            import torch  # type: ignore
+
+            torch.cuda.reset_peak_memory_stats()
+        rss_before = peak_rss()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        if cprofile is not None:
+            cprofile.enable()
+        try:
+            yield span
+        finally:
+            if cprofile is not None:
+                cprofile.disable()
+            end = time.perf_counter()
+            cpu_end = time.process_time()
+            rss_after = peak_rss()
+
+            measured = dict(span.args,
+                            cpu_ms=round((cpu_end - cpu_start) * 1e3, 3),
+                            peak_rss_mb=round(rss_after / MB, 1),
+                            rss_growth_mb=round((rss_after - rss_before) / MB, 1))
+            if span.tensors:
+                measured['tensor_mb'] = round(tensor_bytes(*span.tensors) / MB, 3)
+            if cuda:
+                measured['cuda_peak_mb'] = round(torch.cuda.max_memory_allocated() / MB, 1)
+            self._record({
+                'name': name, 'cat': category, 'ph': 'X',
+                'ts': round((start - self._origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1),
+                'pid': os.getpid(), 'tid': threading.get_ident(), 'args': measured,
+            })
+            if cprofile is not None:
+                os.makedirs(self.cprofile_dir, exist_ok=True)  # type: ignore
+                cprofile.dump_stats(os.path.join(self.cprofile_dir, f"{name}.prof"))  # type: ignore
+
+    def _record(self, event: Dict[str, Any]) -> None:
+        if event['pid'] == self._pid:
+            self.events.append(event)
+            return
+        # perf_counter is system-wide on Linux, so worker timestamps line up with ours
+        with open(os.path.join(self._spool_dir, f"{event['pid']}.jsonl"), 'a') as f:  # type: ignore
+            f.write(json.dumps(event, default=repr) + '\n')
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """
+        Spans of this process and its workers, by start time.
+        """
+        events = list(self.events)
+        if self._spool_dir is not None and os.path.isdir(self._spool_dir):
+            for name in os.listdir(self._spool_dir):
+                with open(os.path.join(self._spool_dir, name)) as f:
+                    events.extend(json.loads(line) for line in f if line.strip())
+        events.sort(key=lambda event: event['ts'])
+        return events
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totals per stage and per training loop: wall/CPU seconds, peak RSS
+        and tensor memory.
+        """
+        stages: Dict[str, Dict[str, Any]] = {}
+        epochs: Dict[str, Dict[str, Any]] = {}
+        for event in self.collect():
+            args = event['args']
+            if event['cat'] in ('stage', 'cache'):
+                stages[event['name']] = {
+                    'cached': event['cat'] == 'cache',
+                    'wall_s': round(event['dur'] / 1e6, 3),
+                    'cpu_s': round(args['cpu_ms'] / 1e3, 3),
+                    'peak_rss_mb': args['peak_rss_mb'],
+                    'rss_growth_mb': args['rss_growth_mb'],
+                    'tensor_mb': args.get('tensor_mb'),
+                }
+            elif event['cat'] == 'epoch':
+                loop = epochs.setdefault(event['name'], {'epochs': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                         'max_tensor_mb': 0.0})
+                loop['epochs'] += 1
+                loop['wall_s'] += event['dur'] / 1e6
+                loop['cpu_s'] += args['cpu_ms'] / 1e3
+                loop['max_tensor_mb'] = max(loop['max_tensor_mb'], args.get('tensor_mb') or 0.0)
+        for loop in epochs.values():
+            loop['mean_epoch_ms'] = round(loop['wall_s'] * 1e3 / loop['epochs'], 3)
+            loop['wall_s'] = round(loop['wall_s'], 3)
+            loop['cpu_s'] = round(loop['cpu_s'], 3)
+        return {'stages': stages, 'epochs': epochs}
+
+    def write(self, path: str) -> None:
+        """
+        Save the spans as a Chrome trace with the ``summary`` alongside.
+        """
+        events = self.collect()
+        names = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                  'args': {'name': 'pipeline' if pid == self._pid else f'worker {pid}'}}
+                 for pid in sorted({event['pid'] for event in events})]
+        trace = dict(self.summary(), traceEvents=names + events, displayTimeUnit='ms')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(trace, f, default=repr)
+
+    def print_summary(self) -> None:
+        summary = self.summary()
+        print(f"{'stage':<16}{'wall s':>10}{'cpu s':>10}{'peak RSS MB':>14}{'tensor MB':>12}")
+        for name, stage in summary['stages'].items():
+            label = f"{name} (cached)" if stage['cached'] else name
+            tensor_mb = '' if stage['tensor_mb'] is None else f"{stage['tensor_mb']:.1f}"
+            print(f"{label:<16}{stage['wall_s']:>10.2f}{stage['cpu_s']:>10.2f}"
+                  f"{stage['peak_rss_mb']:>14.1f}{tensor_mb:>12}")
+        for name, loop in summary['epochs'].items():
+            print(f"{name}: {loop['epochs']} epochs, {loop['mean_epoch_ms']:.2f} ms/epoch, "
+                  f"{loop['wall_s']:.2f} s total, up to {loop['max_tensor_mb']:.2f} MB of tensors")
+
+    def close(self) -> None:
+        if self._spool_dir is not None and os.getpid() == self._pid:
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+            self._spool_dir = None
+
+    def __enter__(self) -> 'Profiler':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+# Profiler of the running pipeline; spans outside a profiled run cost nothing
+_active = Profiler(enabled=False)
+
+
+def span(name: str, category: str = 'step', **args: Any) -> Any:
+    """
+    Record a span on the active profiler (``with profiling.span(...)``).
+    """
+    return _active.span(name, category, **args)
+
+
+def activate(profiler: Profiler) -> Profiler:
+    """
+    Make ``profiler`` receive ``span`` calls; returns the previous one.
+    """
+    global _active
+    previous, _active = _active, profiler
+    return previous
@@ -1,146 +1,182 @@
-from typing import Optional, Tuple, Dict, Any
-
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import networkx as nx  # type: ignore
-import yfinance as yf  # type: ignore
-import plotly.express as px  # type: ignore
-from scipy.stats import skew, kurtosis  # type: ignore
-from statsmodels.tsa.stattools import adfuller  # type: ignore
-from statsmodels.tsa.api import VAR  # type: ignore
-import seaborn as sns  # type: ignore
-from sklearn.model_selection import train_test_split  # type: ignore
-import torch  # type: ignore
-from torch_geometric.utils import from_networkx  # type: ignore
-import torch.nn.functional as F  # type: ignore
-from torch_geometric.nn import GATConv, GCNConv  # type: ignore
-from sklearn.metrics import mean_squared_error  # type: ignore
-import torch.nn as nn  # type: ignore
+"""
+Cross-market volatility spillover and forecasting pipeline.
+
+The analysis runs as a sequence of stages, each a plain function of the
+pipeline configuration and the outputs of the stages it depends on:
+
+    fetch -> features -> stats
+                      -> spillover -> graph -> train_gnn -> snapshots, evaluate_gnn, backtest
+                                            -> train_mlp -> evaluate_mlp
+                                            -> export (needs both models)
+
+``python project.py`` runs all of them except the walk-forward
+``backtest``, which refits the model dozens of times and only runs when
+asked for; ``python project.py spillover`` runs only what ``spillover``
+needs (``train`` and ``evaluate`` stand for both models). Importing this module runs nothing, and the scientific stack
+(pandas, torch, torch_geometric, statsmodels, plotting) is only imported
+by the stages and helpers that use it.
+
+Stage outputs are cached in ``.stage_cache`` under a fingerprint of the
+stage code (with the helpers and project modules it uses), the config
+fields it reads and its upstream fingerprints, so a rerun only executes
+the stages whose inputs changed: editing ``mlp_grid`` reruns ``train_mlp``
+and what depends on it, and loads the graphs it trains on from the cache.
+Files a stage writes (price CSVs, dashboard payloads, exported models) are
+rewritten from its outputs on cache hits too.
+
+``--profile profile.json`` records the wall/CPU time and memory of every
+stage, its expensive steps and every training epoch (see ``profiling``).
+"""
+from __future__ import annotations
+
+import argparse
 import itertools
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import profiling
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from data_store import ColumnarDataStore
+    from stage_cache import StageCache
+
+# Results of each stage, keyed by output name
+StageOutputs = Dict[str, Any]
+
+
+class PipelineConfig(NamedTuple):
+    tickers: Tuple[str, ...] = ('^GSPC', '^GDAXI', '^FCHI', '^FTSE', '^NSEI', '^N225', '^KS11', '^HSI')
+    start_date: str = '2007-11-06'
+    end_date: str = '2022-06-03'
+    # 'yahoo': local store topped up from the network; 'csv': the
+    # {ticker}_stock_data.csv files in the working directory; 'store': only
+    # what the local store already holds
+    data_source: str = 'yahoo'
+    # Figures: 'show' interactively, render a headless 'report' (PNG/HTML files
+    # plus an index page in report_dir), or 'none'
+    plots: str = 'show'
+    report_dir: str = 'report'
+    seed: int = 0
+    num_epochs: int = 50
+    patience: int = 10
+    horizons: Tuple[int, ...] = (1, 5, 10, 22)
+    volatility_window: int = 21
+    # VAR lag order, FEVD horizon and rolling window of the spillover graphs
+    lag_order: int = 2
+    forecast_horizon: int = 10
+    spillover_window: int = 200
+    # Sensitivity grid of total spillover indices
+    lag_order_grid: Tuple[int, ...] = (1, 2, 3)
+    forecast_horizon_grid: Tuple[int, ...] = (5, 10, 20)
+    # hidden_dim, num_heads, num_layers, learning rate, dropout
+    gcn_gat_grid: Tuple[Tuple[Any, ...], ...] = ((32, 64), (2, 4), (2, 3), (0.001, 0.0005), (0.1, 0.3))
+    # hidden_dim, learning rate, dropout
+    mlp_grid: Tuple[Tuple[Any, ...], ...] = ((32, 64, 128), (0.0001, 0.001, 0.01), (0.3, 0.5, 0.7))
+    lookback: int = 21
+    # 'dynamic': every snapshot uses the spillover graph of the trailing window
+    # ending on its last input day, estimated once and memory-mapped from
+    # .graph_cache; 'static': the whole-split graph for every snapshot
+    snapshot_graph_mode: str = 'dynamic'
+    # Walk-forward backtest: rows per test block (one refit each), epochs of a
+    # warm-started refit, and independent chains of refits (default: one per worker)
+    backtest_test_size: int = 63
+    backtest_refit_epochs: int = 5
+    backtest_chains: Optional[int] = None
+
+
+def parallel_workers() -> Optional[int]:
+    """
+    Worker processes re-import the main module under spawn (Windows/macOS),
+    so process pools only fan out where fork is available and run inline
+    elsewhere.
+    """
+    import multiprocessing
+
+    return None if multiprocessing.get_start_method() == 'fork' else 1
+
+
+def __getattr__(name: str) -> Any:
+    # Model classes stay importable from here without importing torch up front
+    if name in ('GCN_GAT_Model', 'BaselineMLPModel'):
+        import models
+
+        return getattr(models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # =========================
 # 1. DATA FETCHING & CLEAN
 # =========================
 
-# Define the stock tickers
-tickers = ['^GSPC', '^GDAXI', '^FCHI', '^FTSE', '^NSEI', '^N225', '^KS11', '^HSI']
+def open_data_store(data_source: str = 'yahoo') -> ColumnarDataStore:
+    """
+    Local columnar store consulted before any download. Missing ranges go
+    through a pooled chart-API client (yf.download keeps global state and is
+    not safe to call from several threads), the CSV files or nowhere.
+    """
+    from batch_fetcher import YahooChartClient
+    from data_store import DEFAULT_STORE_DIR, ColumnarDataStore, csv_fetcher, null_fetcher
 
-# Define the start and end dates
-start_date = '2007-11-06'
-end_date = '2022-06-03'
+    fetchers = {
+        'yahoo': lambda: YahooChartClient().download,
+        'csv': lambda: csv_fetcher('.'),
+        'store': lambda: null_fetcher,
+    }
+    if data_source not in fetchers:
+        raise ValueError(f"unknown data source: {data_source}")
+    return ColumnarDataStore(DEFAULT_STORE_DIR, fetcher=fetchers[data_source]())
 
 
-def fetch_and_fill_data(
-    symbol: str,
-    start: str,
-    end: str
-) -> Tuple[Optional[pd.DataFrame], Optional[pd.Series]]:
-    """
-    Fetch historical data from yfinance, align to full business-day range,
-    forward/backward fill, and also return count of filled cells.
-    """
-    try:
-        data = yf.download(symbol, start=start, end=end)  # type: ignore
+def fetch(config: PipelineConfig) -> StageOutputs:
+    import pandas as pd
 
-        # Handle None or empty DataFrame explicitly
-        if data is None or data.empty:
-            print(f"No data returned for {symbol}")
-            return None, None
+    import figures
+    from batch_fetcher import fetch_many
 
-        # Full date range (business days)
-        full_range = pd.date_range(start=start, end=end, freq='B')
+    # Fetch and fill data for all tickers concurrently
+    data_store = open_data_store(config.data_source)
+    with profiling.span('fetch prices', tickers=len(config.tickers)):
+        stock_data, filled_days_counts, fetch_errors = fetch_many(list(config.tickers), config.start_date,
+                                                                  config.end_date, download=data_store.get)
+    for ticker, error in fetch_errors.items():
+        print(f"Error fetching data for {ticker}: {error}")
 
-        original_data = data.copy()
-        data = data.reindex(full_range)
+    # Plot the 'Close' price of each ticker in separate graphs
+    for ticker, data in stock_data.items():
+        figures.plot(figures.close_price_figure, ticker, data['Close'], title=f'{ticker} Close Price')
 
-        data_filled = data.ffill().bfill()
+    # Print the head, total count of each processed DataFrame, and the count of filled values
+    for ticker, data in stock_data.items():
+        print(f'Head of {ticker} data:')
+        print(data.head(), '\n')
+        print(f'Total count of trading days for {ticker}: {len(data)}\n')
+        print(f'Count of forward-filled or backward-filled days for {ticker}:')
+        print(filled_days_counts[ticker], '\n')
 
-        # Count how many values were filled (per column)
-        filled_days_count = data_filled.notna().sum() - original_data.notna().sum()
+    for ticker, data in stock_data.items():
+        print(f"Ticker: {ticker}, Total number of days: {data.shape[0]}, Total number of fields: {data.shape[1]}")
 
-        return data_filled, filled_days_count
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        return None, None
+    # Ensure datetime index
+    for ticker, data in stock_data.items():
+        data.index = pd.to_datetime(data.index)
 
+    for ticker, data in stock_data.items():
+        print(f"Ticker: {ticker}")
+        print(data.head())
+        print("\n")
 
-# Dictionary to store the processed data and filled days count
-stock_data: Dict[str, pd.DataFrame] = {}
-filled_days_counts: Dict[str, pd.Series] = {}
+    return {'stock_data': stock_data, 'filled_days_counts': filled_days_counts}
 
-# Fetch and fill data for each ticker
-for ticker in tickers:
-    data, filled_days_count = fetch_and_fill_data(ticker, start_date, end_date)
-    if data is not None and filled_days_count is not None:
-        stock_data[ticker] = data
-        filled_days_counts[ticker] = filled_days_count
+
+def publish_fetch(config: PipelineConfig, outputs: StageOutputs) -> None:
+    # {ticker}_stock_data.csv, also read back by --data-source csv
+    for ticker, data in outputs['stock_data'].items():
         data.to_csv(f"{ticker}_stock_data.csv")
 
-# Plot the 'Close' price of each ticker in separate graphs
-for ticker, data in stock_data.items():
-    plt.figure(figsize=(14, 7))  # type: ignore
-    plt.plot(data.index, data['Close'], label=f'{ticker} Close Price')  # type: ignore
-    plt.title(f'{ticker} Close Price Over Time')  # type: ignore
-    plt.xlabel('Date')  # type: ignore
-    plt.ylabel('Close Price')  # type: ignore
-    plt.legend()  # type: ignore
-    plt.show()  # type: ignore
-
-# Print the head, total count of each processed DataFrame, and the count of filled values
-for ticker, data in stock_data.items():
-    print(f'Head of {ticker} data:')
-    print(data.head(), '\n')
-    print(f'Total count of trading days for {ticker}: {len(data)}\n')
-    print(f'Count of forward-filled or backward-filled days for {ticker}:')
-    print(filled_days_counts[ticker], '\n')
-
-for ticker, data in stock_data.items():
-    print(f"Ticker: {ticker}, Total number of days: {data.shape[0]}, Total number of fields: {data.shape[1]}")
-
-# Ensure datetime index
-for ticker, data in stock_data.items():
-    data.index = pd.to_datetime(data.index)
-
-for ticker, data in stock_data.items():
-    print(f"Ticker: {ticker}")
-    print(data.head())
-    print("\n")
 
 # =========================
 # 2. CLOSE SERIES & PLOTS
-# =========================
-
-ticker_close_dict: Dict[str, pd.Series] = {}
-
-for ticker, data in stock_data.items():
-    ticker_close_series = data['Close']
-    ticker_close_dict[ticker] = ticker_close_series
-
-for ticker, series in ticker_close_dict.items():
-    print(f"Ticker: {ticker}")
-    print(series.head())
-    print(f"Length: {len(series)}\n")
-
-# Plot with Plotly
-for ticker, series in ticker_close_dict.items():
-    df = series.reset_index()
-    df.columns = ['date', 'Close']
-
-    fig = px.line(df, x='date', y='Close',  # type: ignore
-                  labels={'date': 'Date', 'close': 'Close Stock'})
-    fig.update_traces(marker_line_width=2, opacity=0.8)  # type: ignore
-    fig.update_layout(  # type: ignore
-        title_text=f'Stock Close Price Chart for {ticker}',
-        plot_bgcolor='white',
-        font_size=15,
-        font_color='black'
-    )
-    fig.update_xaxes(showgrid=False)  # type: ignore
-    fig.update_yaxes(showgrid=False)  # type: ignore
-    fig.show()  # type: ignore
-
-# =========================
 # 3. REALIZED VOLATILITY
 # =========================
 
@@ -148,6 +184,8 @@ def calculate_realized_volatility(data: pd.DataFrame, window: int = 21) -> pd.Se
     """
     Calculate realized volatility for the given data using squared returns.
     """
+    import numpy as np
+
     returns = data['Close'].pct_change()
     squared_returns = returns ** 2
     realized_variance = squared_returns.rolling(window=window).sum()
@@ -155,33 +193,90 @@ def calculate_realized_volatility(data: pd.DataFrame, window: int = 21) -> pd.Se
     return realized_volatility.dropna()  # type: ignore
 
 
-realized_vol_dict: Dict[str, pd.Series] = {}
-for ticker, data in stock_data.items():
-    realized_volatility = calculate_realized_volatility(data)
-    realized_vol_dict[ticker] = realized_volatility
-
-for ticker, series in realized_vol_dict.items():
-    print(f"Ticker: {ticker}")
-    print(series.head())
-    print(f"Length: {len(series)}\n")
-
-# Plot realized volatility
-for ticker, series in realized_vol_dict.items():
-    df = series.reset_index()
-    df.columns = ['date', 'realized_volatility']
-
-    fig = px.line(df, x='date', y='realized_volatility',  # type: ignore
-                  labels={'date': 'Date', 'realized_volatility': 'Realized Volatility'})
-    fig.update_traces(marker_line_width=2, opacity=0.8)  # type: ignore
-    fig.update_layout(  # type: ignore
-        title_text=f'Realized Volatility Chart for {ticker}',
-        plot_bgcolor='white',
-        font_size=15,
-        font_color='black'
-    )
-    fig.update_xaxes(showgrid=False)  # type: ignore
-    fig.update_yaxes(showgrid=False)  # type: ignore
-    fig.show()  # type: ignore
+def features(config: PipelineConfig, fetch: StageOutputs) -> StageOutputs:
+    import pandas as pd
+    from sklearn.model_selection import train_test_split  # type: ignore
+
+    import figures
+    from volatility import close_panel, realized_volatility_frame
+
+    stock_data = fetch['stock_data']
+    ticker_close_dict: Dict[str, pd.Series] = {ticker: data['Close'] for ticker, data in stock_data.items()}
+
+    for ticker, series in ticker_close_dict.items():
+        print(f"Ticker: {ticker}")
+        print(series.head())
+        print(f"Length: {len(series)}\n")
+
+    for ticker, series in ticker_close_dict.items():
+        figures.plot(figures.line_chart, series, 'Close', 'Close Stock', f'Stock Close Price Chart for {ticker}',
+                     title=f'{ticker} Close Price (interactive)')
+
+    # All tickers in one pass on the (T x N) close panel; same values as calling
+    # calculate_realized_volatility per ticker
+    window = config.volatility_window
+    with profiling.span('realized volatility', window=window):
+        realized_vol_panel = realized_volatility_frame(close_panel(stock_data), windows=(window,))[window]
+    realized_vol_dict: Dict[str, pd.Series] = {
+        ticker: realized_vol_panel[ticker].dropna() for ticker in realized_vol_panel.columns
+    }
+
+    for ticker, series in realized_vol_dict.items():
+        print(f"Ticker: {ticker}")
+        print(series.head())
+        print(f"Length: {len(series)}\n")
+
+    for ticker, series in realized_vol_dict.items():
+        figures.plot(figures.line_chart, series, 'realized_volatility', 'Realized Volatility',
+                     f'Realized Volatility Chart for {ticker}', title=f'{ticker} Realized Volatility')
+
+    # =========================
+    # 5. TRAIN / VAL / TEST SPLITS
+    # =========================
+
+    data_splits: Dict[str, Dict[str, Any]] = {}
+
+    for ticker, realized_volatility in realized_vol_dict.items():
+        df = realized_volatility.reset_index()
+        df.columns = ['date', 'realized_volatility']
+
+        train_data, temp_data = train_test_split(df, test_size=0.5, shuffle=False)  # type: ignore
+        validation_data, test_data = train_test_split(temp_data, test_size=0.6, shuffle=False)  # type: ignore
+
+        data_splits[ticker] = {
+            'train': train_data,
+            'validation': validation_data,
+            'test': test_data
+        }
+
+    for ticker, splits in data_splits.items():
+        print(f"Ticker: {ticker}")
+        print(f"Training Set Size: {len(splits['train'])}")
+        print(f"Validation Set Size: {len(splits['validation'])}")
+        print(f"Test Set Size: {len(splits['test'])}\n")
+
+    # Row ranges of each split inside the aligned volatility matrix (same rows as data_splits)
+    combined_realized_vol = pd.DataFrame(realized_vol_dict).dropna()  # type: ignore
+    reference_splits = next(iter(data_splits.values()))
+    n_train_rows = len(reference_splits['train'])
+    n_validation_rows = len(reference_splits['validation'])
+    split_bounds = {
+        'train': (0, n_train_rows),
+        'validation': (n_train_rows, n_train_rows + n_validation_rows),
+        'test': (n_train_rows + n_validation_rows, len(combined_realized_vol)),
+    }
+
+    return {
+        'realized_vol_dict': realized_vol_dict,
+        'data_splits': data_splits,
+        'combined_realized_vol': combined_realized_vol,
+        'split_bounds': split_bounds,
+    }
+
+
+def split_realized_vol(data_splits: Dict[str, Dict[str, Any]], split: str) -> Dict[str, pd.Series]:
+    return {ticker: splits[split]['realized_volatility'] for ticker, splits in data_splits.items()}
+
 
 # =========================
 # 4. DESCRIPTIVE STATS
@@ -191,6 +286,9 @@ def calculate_descriptive_statistics(realized_volatility: pd.Series) -> Dict[str
     """
     Calculate descriptive statistics for the given realized volatility series.
     """
+    from scipy.stats import skew, kurtosis  # type: ignore
+    from statsmodels.tsa.stattools import adfuller  # type: ignore
+
     mean_value = realized_volatility.mean()
     std_dev = realized_volatility.std()
     skewness_value = skew(realized_volatility)
@@ -209,98 +307,47 @@ def calculate_descriptive_statistics(realized_volatility: pd.Series) -> Dict[str
     }
 
 
-descriptive_stats_dict: Dict[str, Dict[str, Any]] = {}
-for ticker, series in realized_vol_dict.items():
-    descriptive_stats = calculate_descriptive_statistics(series)
-    descriptive_stats_dict[ticker] = descriptive_stats
+def stats(config: PipelineConfig, fetch: StageOutputs, features: StageOutputs) -> StageOutputs:
+    import pandas as pd
 
-for ticker, stats in descriptive_stats_dict.items():
-    print(f"Descriptive Statistics for {ticker}:")
-    for stat_name, value in stats.items():
-        print(f"{stat_name}: {value}")
-    print()
+    from volatility import close_panel
 
-# =========================
-# 5. TRAIN / VAL / TEST SPLITS
-# =========================
+    realized_vol_dict = features['realized_vol_dict']
+    descriptive_stats_dict: Dict[str, Dict[str, Any]] = {}
+    for ticker, series in realized_vol_dict.items():
+        with profiling.span('descriptive statistics + ADF', ticker=ticker):
+            descriptive_stats = calculate_descriptive_statistics(series)
+        descriptive_stats_dict[ticker] = descriptive_stats
 
-data_splits: Dict[str, Dict[str, Any]] = {}
+    for ticker, stats in descriptive_stats_dict.items():
+        print(f"Descriptive Statistics for {ticker}:")
+        for stat_name, value in stats.items():
+            print(f"{stat_name}: {value}")
+        print()
 
-for ticker, realized_volatility in realized_vol_dict.items():
-    df = realized_volatility.reset_index()
-    df.columns = ['date', 'realized_volatility']
+    return {'descriptive_stats': descriptive_stats_dict, 'prices': close_panel(fetch['stock_data']),
+            'realized_vol_dict': realized_vol_dict, 'correlations': pd.DataFrame(realized_vol_dict).corr()}
 
-    train_data, temp_data = train_test_split(df, test_size=0.5, shuffle=False)  # type: ignore
-    validation_data, test_data = train_test_split(temp_data, test_size=0.6, shuffle=False)  # type: ignore
 
-    data_splits[ticker] = {
-        'train': train_data,
-        'validation': validation_data,
-        'test': test_data
-    }
+def publish_stats(config: PipelineConfig, outputs: StageOutputs) -> None:
+    from dashboard_artifacts import DEFAULT_ARTIFACT_DIR, write_dashboard_artifacts
+
+    # Payloads for the dashboard API (api_server.py), rendered once here so the
+    # server never recomputes anything per request
+    write_dashboard_artifacts(DEFAULT_ARTIFACT_DIR, outputs['prices'], outputs['realized_vol_dict'],
+                              outputs['correlations'])
 
-for ticker, splits in data_splits.items():
-    print(f"Ticker: {ticker}")
-    print(f"Training Set Size: {len(splits['train'])}")
-    print(f"Validation Set Size: {len(splits['validation'])}")
-    print(f"Test Set Size: {len(splits['test'])}\n")
 
 # =========================
 # 6. SPILLOVER (VAR-FEVD)
 # =========================
 
-def calculate_spillover_index(realized_vol_dict: Dict[str, pd.Series],
-                              lag_order: int = 2,
-                              forecast_horizon: int = 10) -> pd.DataFrame:
-    """
-    Calculate the volatility spillover index using the Diebold-Yilmaz methodology.
-    """
-    combined_data = pd.DataFrame(realized_vol_dict).dropna()  # type: ignore
-
-    model = VAR(combined_data)  # type: ignore
-    var_result = model.fit(lag_order)  # type: ignore
-    fevd = var_result.fevd(forecast_horizon)
-
-    n = len(realized_vol_dict)
-    spillover_matrix = np.zeros((n, n))
-
-    for i in range(n):
-        for j in range(n):
-            if i != j:
-                spillover_matrix[i, j] = fevd.decomp[j][:, i].sum() / fevd.decomp[j].sum()
-
-    spillover_index = pd.DataFrame(
-        spillover_matrix,
-        index=list(realized_vol_dict.keys()),
-        columns=list(realized_vol_dict.keys())
-    )
-    return spillover_index * 100
-
-
-train_realized_vol_dict: Dict[str, pd.Series] = {
-    ticker: splits['train']['realized_volatility']
-    for ticker, splits in data_splits.items()
-}
-
-spillover_index_train = calculate_spillover_index(train_realized_vol_dict)
-
-print("Spillover Index Matrix (Training Data):")
-print(spillover_index_train)
-
-n = len(train_realized_vol_dict)
-total_spillover_index_train = spillover_index_train.to_numpy().sum() / (n**2 - n)
-print(f"\nTotal Spillover Index (Training Data): {total_spillover_index_train:.2f}%")
-
-plt.figure(figsize=(10, 8))  # type: ignore
-plt.title("Volatility Spillover Index Heatmap (Training Data)")  # type: ignore
-sns.heatmap(spillover_index_train, annot=True, cmap="coolwarm", fmt=".2f", linewidths=0.5)  # type: ignore
-plt.show()  # type: ignore
-
-
 def create_spillover_graph(spillover_matrix: pd.DataFrame) -> Any:  # type: ignore
     """
     Create a directed graph from the spillover matrix.
     """
+    import networkx as nx  # type: ignore
+
     G = nx.DiGraph()  # type: ignore
 
     for node in spillover_matrix.columns:
@@ -316,72 +363,102 @@ def create_spillover_graph(spillover_matrix: pd.DataFrame) -> Any:  # type: igno
     return G  # type: ignore
 
 
-G = create_spillover_graph(spillover_index_train)
+def spillover(config: PipelineConfig, features: StageOutputs) -> StageOutputs:
+    import figures
+    from spillover import VARSpilloverModel, rolling_spillover, run_spillover_jobs, table_from_results
 
-plt.figure(figsize=(12, 8))  # type: ignore
-pos = nx.spring_layout(G)  # type: ignore
-nx.draw(G, pos, with_labels=True, node_color='lightblue', node_size=3000,  # type: ignore
-        font_size=12, font_weight='bold', edge_color='gray', width=2)
-edge_labels = nx.get_edge_attributes(G, 'weight')  # type: ignore
-nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=10)  # type: ignore
-plt.title('Volatility Spillover Directed Graph (Training Data)')  # type: ignore
-plt.show()  # type: ignore
+    combined_realized_vol = features['combined_realized_vol']
+    split_bounds = features['split_bounds']
 
-# Test & Validation spillovers
-test_realized_vol_dict: Dict[str, pd.Series] = {
-    ticker: splits['test']['realized_volatility']
-    for ticker, splits in data_splits.items()
-}
-validation_realized_vol_dict: Dict[str, pd.Series] = {
-    ticker: splits['validation']['realized_volatility']
-    for ticker, splits in data_splits.items()
-}
+    # All splits x lag orders x horizons in one process-pool batch
+    lag_orders = sorted(set(config.lag_order_grid) | {config.lag_order})
+    forecast_horizons = sorted(set(config.forecast_horizon_grid) | {config.forecast_horizon})
+    spillover_jobs = [
+        (split, lag, horizon)
+        for split in split_bounds for lag in lag_orders for horizon in forecast_horizons
+    ]
+    with profiling.span('VAR/FEVD grid', jobs=len(spillover_jobs)):
+        spillover_results = run_spillover_jobs(combined_realized_vol, split_bounds, spillover_jobs,
+                                               max_workers=parallel_workers())
+
+    print("Total Spillover Index Sensitivity (rows: split, lag order; columns: horizon):")
+    print(spillover_results.groupby(['split', 'lag_order', 'forecast_horizon'])['total_spillover']
+          .first().unstack().round(2))
+    print()
+
+    spillover_table_train = table_from_results(spillover_results, 'train', config.lag_order,
+                                               config.forecast_horizon)
+    spillover_index_train = spillover_table_train.pairwise
+
+    print("Spillover Index Matrix (Training Data):")
+    print(spillover_index_train)
+
+    total_spillover_index_train = spillover_table_train.total
+    print(f"\nTotal Spillover Index (Training Data): {total_spillover_index_train:.2f}%")
+
+    # Generalized FEVD does not depend on the ticker order; one fit covers horizons 1..forecast_horizon
+    train_realized_vol_dict = split_realized_vol(features['data_splits'], 'train')
+    with profiling.span('generalized FEVD'):
+        generalized_tables_train = VARSpilloverModel.fit(train_realized_vol_dict, lag_order=config.lag_order).tables(
+            config.forecast_horizon, method='generalized')
+    print("Generalized Total Spillover Index by Horizon (Training Data):")
+    for horizon, table in generalized_tables_train.items():
+        print(f"  h={horizon:<3} {table.total:.2f}%")
+
+    figures.plot(figures.spillover_heatmap, spillover_index_train,
+                 "Volatility Spillover Index Heatmap (Training Data)", title='Spillover Heatmap (Training Data)')
+    figures.plot(figures.spillover_graph, spillover_index_train,
+                 'Volatility Spillover Directed Graph (Training Data)', 'lightblue',
+                 title='Spillover Graph (Training Data)')
+
+    # Test & Validation spillovers
+    spillover_table_test = table_from_results(spillover_results, 'test', config.lag_order,
+                                              config.forecast_horizon)
+    spillover_index_test = spillover_table_test.pairwise
+    print("Spillover Index Matrix (Test Data):")
+    print(spillover_index_test)
+
+    total_spillover_index_test = spillover_table_test.total
+    print(f"\nTotal Spillover Index (Test Data): {total_spillover_index_test:.2f}%")
+
+    figures.plot(figures.spillover_heatmap, spillover_index_test,
+                 "Volatility Spillover Index Heatmap (Test Data)", title='Spillover Heatmap (Test Data)')
+    figures.plot(figures.spillover_graph, spillover_index_test,
+                 'Volatility Spillover Directed Graph (Test Data)', 'lightgreen', title='Spillover Graph (Test Data)')
+
+    spillover_table_validation = table_from_results(spillover_results, 'validation', config.lag_order,
+                                                    config.forecast_horizon)
+    spillover_index_validation = spillover_table_validation.pairwise
+    print("Spillover Index Matrix (Validation Data):")
+    print(spillover_index_validation)
+
+    total_spillover_index_validation = spillover_table_validation.total
+    print(f"\nTotal Spillover Index (Validation Data): {total_spillover_index_validation:.2f}%")
+
+    figures.plot(figures.spillover_heatmap, spillover_index_validation,
+                 "Volatility Spillover Index Heatmap (Validation Data)", title='Spillover Heatmap (Validation Data)')
+    figures.plot(figures.spillover_graph, spillover_index_validation,
+                 'Volatility Spillover Directed Graph (Validation Data)', 'lightcoral',
+                 title='Spillover Graph (Validation Data)')
+
+    # Rolling spillover over the full sample (closed-form VAR/FEVD updates)
+    with profiling.span('rolling spillover', window=config.spillover_window):
+        rolling_spillover_full = rolling_spillover(combined_realized_vol, window=config.spillover_window,
+                                                   lag_order=config.lag_order,
+                                                   forecast_horizon=config.forecast_horizon)
+    print(f"Rolling Total Spillover Index ({config.spillover_window}-day windows):")
+    print(rolling_spillover_full.total.describe())
+    print("\nLatest Net Spillover by Market:")
+    print(rolling_spillover_full.net.iloc[-1])
+
+    return {
+        'spillover_results': spillover_results,
+        'spillover_tables': {'train': spillover_table_train, 'validation': spillover_table_validation,
+                             'test': spillover_table_test},
+        'generalized_tables_train': generalized_tables_train,
+        'rolling_spillover': rolling_spillover_full,
+    }
 
-spillover_index_test = calculate_spillover_index(test_realized_vol_dict)
-print("Spillover Index Matrix (Test Data):")
-print(spillover_index_test)
-
-n_test = len(test_realized_vol_dict)
-total_spillover_index_test = spillover_index_test.to_numpy().sum() / (n_test**2 - n_test)
-print(f"\nTotal Spillover Index (Test Data): {total_spillover_index_test:.2f}%")
-
-plt.figure(figsize=(10, 8))  # type: ignore
-plt.title("Volatility Spillover Index Heatmap (Test Data)")  # type: ignore
-sns.heatmap(spillover_index_test, annot=True, cmap="coolwarm", fmt=".2f", linewidths=0.5)  # type: ignore
-plt.show()  # type: ignore
-
-G_test = create_spillover_graph(spillover_index_test)
-plt.figure(figsize=(12, 8))  # type: ignore
-pos_test = nx.spring_layout(G_test)  # type: ignore
-nx.draw(G_test, pos_test, with_labels=True, node_color='lightgreen', node_size=3000,  # type: ignore
-        font_size=12, font_weight='bold', edge_color='gray', width=2)
-edge_labels_test = nx.get_edge_attributes(G_test, 'weight')  # type: ignore
-nx.draw_networkx_edge_labels(G_test, pos_test, edge_labels=edge_labels_test, font_size=10)  # type: ignore
-plt.title('Volatility Spillover Directed Graph (Test Data)')  # type: ignore
-plt.show()  # type: ignore
-
-spillover_index_validation = calculate_spillover_index(validation_realized_vol_dict)
-print("Spillover Index Matrix (Validation Data):")
-print(spillover_index_validation)
-
-n_val = len(validation_realized_vol_dict)
-total_spillover_index_validation = spillover_index_validation.to_numpy().sum() / (n_val**2 - n_val)
-print(f"\nTotal Spillover Index (Validation Data): {total_spillover_index_validation:.2f}%")
-
-plt.figure(figsize=(10, 8))  # type: ignore
-plt.title("Volatility Spillover Index Heatmap (Validation Data)")  # type: ignore
-sns.heatmap(spillover_index_validation, annot=True, cmap="coolwarm", fmt=".2f", linewidths=0.5)  # type: ignore
-plt.show()  # type: ignore
-
-G_validation = create_spillover_graph(spillover_index_validation)
-plt.figure(figsize=(12, 8))  # type: ignore
-pos_validation = nx.spring_layout(G_validation)  # type: ignore
-nx.draw(G_validation, pos_validation, with_labels=True, node_color='lightcoral', node_size=3000,  # type: ignore
-        font_size=12, font_weight='bold', edge_color='gray', width=2)
-edge_labels_validation = nx.get_edge_attributes(G_validation, 'weight')  # type: ignore
-nx.draw_networkx_edge_labels(G_validation, pos_validation, edge_labels=edge_labels_validation, font_size=10)  # type: ignore
-plt.title('Volatility Spillover Directed Graph (Validation Data)')  # type: ignore
-plt.show()  # type: ignore
 
 # =========================
 # 7. CONVERT TO PYTORCH GEOMETRIC DATA
@@ -390,8 +467,12 @@ plt.show()  # type: ignore
 def networkx_to_pyg_data(G: Any, realized_vol_dict: Dict[str, pd.Series]) -> Any:  # type: ignore
     """
     Convert a NetworkX graph and realized volatility dictionary
-    into PyTorch Geometric Data format.
+    into PyTorch Geometric Data format. The training path uses
+    graph.build_graph_data instead, which skips NetworkX entirely.
     """
+    import torch  # type: ignore
+    from torch_geometric.utils import from_networkx  # type: ignore
+
     data = from_networkx(G)  # type: ignore
 
     node_features = []
@@ -403,306 +484,502 @@ def networkx_to_pyg_data(G: Any, realized_vol_dict: Dict[str, pd.Series]) -> Any
     return data  # type: ignore
 
 
-train_data = networkx_to_pyg_data(G, train_realized_vol_dict)
-validation_data = networkx_to_pyg_data(G_validation, validation_realized_vol_dict)
-test_data = networkx_to_pyg_data(G_test, test_realized_vol_dict)
+def graph(config: PipelineConfig, features: StageOutputs, spillover: StageOutputs) -> StageOutputs:
+    from graph import build_graph_data
+
+    # Spillover matrix -> COO edge_index / edge_weight directly (same edges as
+    # networkx_to_pyg_data(create_spillover_graph(...)))
+    outputs: StageOutputs = {}
+    for split in ('train', 'validation', 'test'):
+        outputs[f"{split}_data"] = build_graph_data(spillover['spillover_tables'][split].pairwise,
+                                                    split_realized_vol(features['data_splits'], split))
+    outputs['markets'] = list(spillover['spillover_tables']['train'].pairwise.columns)
+    return outputs
+
 
 # =========================
 # 8. GCN + GAT MODEL + GRID SEARCH
 # =========================
 
-class GCN_GAT_Model(torch.nn.Module):
-    def __init__(self, node_feature_dim: int, hidden_dim: int, num_heads: int, num_layers: int = 2, dropout_p: float = 0.5) -> None:  # type: ignore
-        super(GCN_GAT_Model, self).__init__()  # type: ignore
-        self.num_layers = num_layers
-        self.gcn_layers = torch.nn.ModuleList()
-        self.gat_layers = torch.nn.ModuleList()
-        self.dropout = torch.nn.Dropout(p=dropout_p)
-
-        self.gcn_layers.append(GCNConv(node_feature_dim, hidden_dim))
-        for _ in range(1, num_layers):
-            self.gcn_layers.append(GCNConv(hidden_dim, hidden_dim))
-
-        for _ in range(num_layers):
-            self.gat_layers.append(GATConv(hidden_dim, hidden_dim, heads=num_heads, concat=False))
-
-        self.fc = torch.nn.Linear(hidden_dim, 8)
+def print_gcn_gat_progress(params: Any, epoch: int, train_loss: float, validation_loss: float) -> None:  # type: ignore
+    if epoch % 10 == 0:
+        print(f"[GCN+GAT] Params {params}, Epoch {epoch}, Train Loss: {train_loss:.6f}, Val Loss: {validation_loss:.6f}")
+
+
+def train_gnn(config: PipelineConfig, graph: StageOutputs) -> StageOutputs:
+    import figures
+    from model_cache import ModelCache
+    from search import best_result_index, build_gcn_gat, successive_halving
+
+    train_data, validation_data = graph['train_data'], graph['validation_data']
+    node_feature_dim: int = train_data.x.shape[1]  # type: ignore
+    param_combinations = list(itertools.product(*config.gcn_gat_grid))
+
+    # Configurations train concurrently, one pinned-thread worker process each, and
+    # are cached by hyperparameters, seed and data content, so reruns on unchanged
+    # data load them instead of training again.
+    # Successive halving drops the weakest two thirds at epochs 5, 15 and 45, and
+    # runs whose validation loss stalls for `patience` epochs stop early.
+    gcn_gat_results = successive_halving('gcn_gat', param_combinations, train_data, validation_data,
+                                         num_epochs=config.num_epochs, patience=config.patience,
+                                         max_workers=parallel_workers(), on_epoch=print_gcn_gat_progress,
+                                         seed=config.seed, cache=ModelCache())
+
+    # Lowest validation loss reached by any configuration, not just at its last epoch
+    best_index = best_result_index(gcn_gat_results)
+    best_params = param_combinations[best_index]
+
+    figures.plot(figures.loss_curves, gcn_gat_results[best_index].train_losses,
+                 gcn_gat_results[best_index].validation_losses,
+                 'Training and Validation Loss Over Epochs (Best GCN+GAT Config)', title='GCN+GAT Loss Curves')
+
+    print(f"Best Hyperparameters (GCN+GAT): Hidden Dim: {best_params[0]}, Num Heads: {best_params[1]}, Num Layers: {best_params[2]}, Learning Rate: {best_params[3]}, Dropout Rate: {best_params[4]}")  # type: ignore
+
+    # Best GCN+GAT model: the weights of the epoch whose validation loss won the search
+    # (built like the search built it, so the output width matches the stored weights)
+    best_result = gcn_gat_results[best_index]
+    best_model, _ = build_gcn_gat(best_params, node_feature_dim)
+    best_model.load_state_dict(best_result.state_dict)
+
+    return {'results': gcn_gat_results, 'best_params': best_params, 'best_val_loss': best_result.best_validation_loss,
+            'model': best_model, 'cache_key': best_result.cache_key}
+
+
+def print_metrics(table: Any) -> None:  # type: ignore
+    from metrics import metrics_by_horizon
+
+    for horizon, metrics_df in metrics_by_horizon(table).items():
+        print(f"Metrics for horizon {horizon}:")
+        print(metrics_df.to_string(index=False))  # type: ignore
+
+
+def evaluate_gnn(config: PipelineConfig, graph: StageOutputs, train_gnn: StageOutputs) -> StageOutputs:
+    import torch  # type: ignore
+
+    from metrics import forecast_metrics
+
+    validation_data = graph['validation_data']
+    best_model = train_gnn['model']
+    best_model.eval()
+    with torch.no_grad():
+        validation_out = best_model(validation_data)
+
+    # All horizons x markets x metrics in one tensor pass, as a tidy table
+    gcn_gat_metrics = forecast_metrics(validation_data.x, validation_out, config.horizons)
+    print_metrics(gcn_gat_metrics)
+    return {'metrics': gcn_gat_metrics}
+
+
+def snapshot_graphs(config: PipelineConfig, combined_realized_vol: pd.DataFrame) -> Any:
+    """
+    Per-window spillover graphs for 'dynamic' snapshots (read from
+    .graph_cache after the first run), None for the static graph.
+    """
+    from dynamic_graphs import DynamicGraphCache
+
+    if config.snapshot_graph_mode == 'dynamic':
+        return DynamicGraphCache.build(combined_realized_vol, window=config.spillover_window,
+                                       lag_order=config.lag_order, forecast_horizon=config.forecast_horizon)
+    return None
+
+
+def snapshots(config: PipelineConfig, features: StageOutputs, graph: StageOutputs,
+              train_gnn: StageOutputs) -> StageOutputs:
+    import torch  # type: ignore
+
+    from models import GCN_GAT_Model
+    from snapshots import SnapshotDataset, snapshot_loader, train_snapshots
+
+    # Same architecture on sliding-window snapshots: each sample is the 8-market
+    # graph with the last `lookback` days of realized volatility as node features,
+    # trained in mini-batches instead of full-batch on the whole split
+    combined_realized_vol = features['combined_realized_vol']
+    train_data, validation_data = graph['train_data'], graph['validation_data']
+    lookback = config.lookback
+    loader_workers = 0 if parallel_workers() == 1 else 2
+
+    dynamic_graphs = snapshot_graphs(config, combined_realized_vol)
+    if dynamic_graphs is not None:
+        split_dates = {split: combined_realized_vol.index[lo:hi] for split, (lo, hi) in features['split_bounds'].items()}
+        train_snapshots_dataset = SnapshotDataset.with_dynamic_graphs(train_data, dynamic_graphs,
+                                                                      split_dates['train'], lookback=lookback)
+        validation_snapshots_dataset = SnapshotDataset.with_dynamic_graphs(validation_data, dynamic_graphs,
+                                                                           split_dates['validation'], lookback=lookback)
+    else:
+        train_snapshots_dataset = SnapshotDataset.from_graph_data(train_data, lookback=lookback)
+        validation_snapshots_dataset = SnapshotDataset.from_graph_data(validation_data, lookback=lookback)
+
+    train_snapshot_loader = snapshot_loader(train_snapshots_dataset, batch_size=64, shuffle=True,
+                                            num_workers=loader_workers)
+    validation_snapshot_loader = snapshot_loader(validation_snapshots_dataset, batch_size=256,
+                                                 num_workers=loader_workers)
+
+    best_hidden, best_heads, best_layers, best_lr, best_dropout = train_gnn['best_params']
+    torch.manual_seed(config.seed)
+    snapshot_model = GCN_GAT_Model(lookback, best_hidden, best_heads, best_layers, dropout_p=best_dropout, output_dim=1)  # type: ignore
+    snapshot_train_losses, snapshot_validation_losses = train_snapshots(
+        snapshot_model, train_snapshot_loader, validation_snapshot_loader, lr=best_lr, num_epochs=config.num_epochs,
+        on_epoch=lambda epoch, train_loss, validation_loss: print(
+            f"[GCN+GAT snapshots] Epoch {epoch}, Train Loss: {train_loss:.6f}, Val Loss: {validation_loss:.6f}"
+        ) if epoch % 10 == 0 else None,
+    )
+    print(f"Snapshot GCN+GAT best validation MSE (next-day volatility): {min(snapshot_validation_losses):.6f}")
+    return {'model': snapshot_model, 'train_losses': snapshot_train_losses,
+            'validation_losses': snapshot_validation_losses}
 
-    def forward(self, data: Any) -> Any:  # type: ignore
-        x, edge_index = data.x, data.edge_index  # type: ignore
-
-        for gcn in self.gcn_layers:
-            x = gcn(x, edge_index)
-            x = F.relu(x)
-            x = self.dropout(x)
-
-        for gat in self.gat_layers:
-            x = gat(x, edge_index)
-            x = F.relu(x)
-            x = self.dropout(x)
-
-        out = self.fc(x)
-        return out
-
-
-node_feature_dim: int = train_data.x.shape[1]  # type: ignore
-hidden_dim_list = [32, 64]
-num_heads_list = [2, 4]
-num_layers_list = [2, 3]
-learning_rates = [0.001, 0.0005]
-dropout_rates = [0.1, 0.3]
-
-param_combinations = list(itertools.product(
-    hidden_dim_list, num_heads_list, num_layers_list, learning_rates, dropout_rates
-))
-best_val_loss = float('inf')
-best_params = None
-
-all_train_loss_values = []
-all_validation_loss_values = []
-
-criterion = torch.nn.MSELoss()
-
-for params in param_combinations:
-    hidden_dim, num_heads, num_layers, lr, dropout_rate = params
-
-    model = GCN_GAT_Model(node_feature_dim, hidden_dim, num_heads, num_layers, dropout_p=dropout_rate)
-    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
-
-    train_loss_values = []
-    validation_loss_values = []
-    num_epochs = 50
-
-    for epoch in range(num_epochs):
-        model.train()
-        optimizer.zero_grad()
-        out = model(train_data)
-        loss = criterion(out[:-1], train_data.x[1:])
-        loss.backward()
-        optimizer.step()  # type: ignore
-        train_loss_values.append(loss.item())  # type: ignore
-
-        model.eval()
-        with torch.no_grad():
-            validation_out = model(validation_data)
-            validation_loss = criterion(validation_out[:-1], validation_data.x[1:])
-            validation_loss_values.append(validation_loss.item())  # type: ignore
-
-        if epoch % 10 == 0:
-            print(f"[GCN+GAT] Params {params}, Epoch {epoch}, Train Loss: {loss.item():.6f}, Val Loss: {validation_loss.item():.6f}")
-
-    all_train_loss_values.append(train_loss_values)  # type: ignore
-    all_validation_loss_values.append(validation_loss_values)  # type: ignore
-
-    final_val_loss = validation_loss_values[-1]  # type: ignore
-    if final_val_loss < best_val_loss:  # type: ignore
-        best_val_loss = final_val_loss  # type: ignore
-        best_params = params  # type: ignore
-
-best_index = param_combinations.index(best_params)  # type: ignore
-
-plt.figure(figsize=(12, 6))  # type: ignore
-plt.plot(range(num_epochs), all_train_loss_values[best_index], label='Training Loss', color='blue')  # type: ignore
-plt.plot(range(num_epochs), all_validation_loss_values[best_index], label='Validation Loss', color='red')  # type: ignore
-plt.title('Training and Validation Loss Over Epochs (Best GCN+GAT Config)')  # type: ignore
-plt.xlabel('Epochs')  # type: ignore
-plt.ylabel('Loss')  # type: ignore
-plt.legend()  # type: ignore
-plt.grid(True)  # type: ignore
-plt.show()  # type: ignore
-
-print(f"Best Hyperparameters (GCN+GAT): Hidden Dim: {best_params[0]}, Num Heads: {best_params[1]}, Num Layers: {best_params[2]}, Learning Rate: {best_params[3]}, Dropout Rate: {best_params[4]}")  # type: ignore
-
-def mean_absolute_percentage_error(y_true: Any, y_pred: Any) -> float:  # type: ignore
-    y_true, y_pred = np.array(y_true), np.array(y_pred)  # type: ignore
-    non_zero_mask = y_true != 0
-    return np.mean(np.abs((y_true[non_zero_mask] - y_pred[non_zero_mask]) / y_true[non_zero_mask])) * 100  # type: ignore
-
-validation_targets = validation_data.x
-
-def calculate_all_metrics(actuals: Any, predictions: Any, h: int) -> pd.DataFrame:  # type: ignore
-    T = actuals.shape[0]  # type: ignore
-    if predictions.shape[0] > T - h:  # type: ignore
-        predictions = predictions[:T - h]  # type: ignore
-    actuals = actuals[h:]  # type: ignore
-
-    metrics_list = []
-
-    for idx in range(actuals.shape[1]):  # type: ignore
-        act = actuals[:, idx].detach().cpu().numpy()  # type: ignore
-        pred = predictions[:, idx].detach().cpu().numpy()  # type: ignore
-
-        mse = mean_squared_error(act, pred)
-        rmse = np.sqrt(mse)
-        mape = mean_absolute_percentage_error(act, pred)
-        mafe = np.mean(np.abs(pred - act))  # type: ignore
-
-        metrics_list.append({  # type: ignore
-            'Index': f"Index {idx+1}",
-            'MAFE': mafe,
-            'MSE': mse,
-            'RMSE': rmse,
-            'MAPE': mape,
-        })
-
-    metrics_df = pd.DataFrame(metrics_list)
-    return metrics_df
-
-# Re-train best GCN+GAT model on train_data
-best_hidden, best_heads, best_layers, best_lr, best_dropout = best_params  # type: ignore
-best_model = GCN_GAT_Model(node_feature_dim, best_hidden, best_heads, best_layers, dropout_p=best_dropout)  # type: ignore
-best_optimizer = torch.optim.Adam(best_model.parameters(), lr=best_lr)  # type: ignore
-
-num_epochs = 50
-for epoch in range(num_epochs):
-    best_model.train()
-    best_optimizer.zero_grad()
-    out = best_model(train_data)
-    loss = criterion(out[:-1], train_data.x[1:])
-    loss.backward()
-    best_optimizer.step()  # type: ignore
-
-best_model.eval()
-with torch.no_grad():
-    validation_out = best_model(validation_data)
-
-horizons = [1, 5, 10, 22]
-metrics_results_per_horizon = {}
-
-for h in horizons:
-    metrics_df = calculate_all_metrics(validation_targets, validation_out, h)
-    metrics_results_per_horizon[f"Metrics for horizon {h}"] = metrics_df
-
-for horizon, metrics_df in metrics_results_per_horizon.items():  # type: ignore
-    print(f"{horizon}:")
-    print(metrics_df.to_string(index=False))  # type: ignore
 
 # =========================
 # 9. BASELINE MLP MODEL + GRID SEARCH
 # =========================
 
-class BaselineMLPModel(nn.Module):
-    def __init__(self, input_dim: int, hidden_dim: int, dropout_rate: float) -> None:  # type: ignore
-        super(BaselineMLPModel, self).__init__()  # type: ignore
-        self.fc1 = nn.Linear(input_dim, hidden_dim)  # type: ignore
-        self.fc2 = nn.Linear(hidden_dim, hidden_dim)  # type: ignore
-        self.fc3 = nn.Linear(hidden_dim, hidden_dim)  # type: ignore
-        self.fc_final = nn.Linear(hidden_dim, 1)  # type: ignore
-        self.dropout = nn.Dropout(p=dropout_rate)  # type: ignore
-
-    def forward(self, data: Any) -> Any:  # type: ignore
-        x = data.x  # type: ignore
-        x = F.relu(self.fc1(x)); x = self.dropout(x)
-        x = F.relu(self.fc2(x)); x = self.dropout(x)
-        x = F.relu(self.fc3(x)); x = self.dropout(x)
-        out = self.fc_final(x)
-        return out
-
-hidden_dim_values = [32, 64, 128]
-learning_rate_values = [0.0001, 0.001, 0.01]
-dropout_rate_values = [0.3, 0.5, 0.7]
-
-param_combinations = list(itertools.product(hidden_dim_values, learning_rate_values, dropout_rate_values))
-best_val_loss = float('inf')
-best_params = None
-all_train_loss_values = []
-all_validation_loss_values = []
-
-for params in param_combinations:
-    hidden_dim, lr, dropout_rate = params
-
-    baseline_model = BaselineMLPModel(input_dim=train_data.x.shape[1], hidden_dim=hidden_dim, dropout_rate=dropout_rate)
-    optimizer = torch.optim.Adam(baseline_model.parameters(), lr=lr)
-    criterion = torch.nn.MSELoss()
-
-    train_loss_values = []
-    validation_loss_values = []
-    num_epochs = 50
-    for epoch in range(num_epochs):
-        baseline_model.train()
-        optimizer.zero_grad()
-        out = baseline_model(train_data)
-        loss = criterion(out[:-1], train_data.x[1:])
-        loss.backward()
-        optimizer.step()  # type: ignore
-        train_loss_values.append(loss.item())  # type: ignore
-
-        baseline_model.eval()
-        with torch.no_grad():
-            validation_out = baseline_model(validation_data)
-            validation_loss = criterion(validation_out[:-1], validation_data.x[1:])
-            validation_loss_values.append(validation_loss.item())  # type: ignore
-
-        if epoch % 10 == 0:
-            print(f"[MLP] Params {params}, Epoch {epoch}, Training Loss: {loss.item():.6f}, Validation Loss: {validation_loss.item():.6f}")
-
-    all_train_loss_values.append(train_loss_values)  # type: ignore
-    all_validation_loss_values.append(validation_loss_values)  # type: ignore
-
-    final_val_loss = validation_loss_values[-1]  # type: ignore
-    if final_val_loss < best_val_loss:
-        best_val_loss = final_val_loss  # type: ignore
-        best_params = params
-
-best_index = param_combinations.index(best_params)  # type: ignore
-
-plt.figure(figsize=(12, 6))  # type: ignore
-plt.plot(range(num_epochs), all_train_loss_values[best_index], label='Training Loss', color='blue')  # type: ignore
-plt.plot(range(num_epochs), all_validation_loss_values[best_index], label='Validation Loss', color='red')  # type: ignore
-plt.title('Training and Validation Loss Over Epochs (Best MLP Config)')  # type: ignore
-plt.xlabel('Epochs')  # type: ignore
-plt.ylabel('Loss')  # type: ignore
-plt.legend()  # type: ignore
-plt.grid(True)  # type: ignore
-plt.show()  # type: ignore
-
-print(f"Best Hyperparameters (MLP): Hidden Dim: {best_params[0]}, Learning Rate: {best_params[1]}, Dropout Rate: {best_params[2]}")  # type: ignore
-
-def calculate_metrics_for_all_indices(actuals: Any, predictions: Any, h: int) -> Any:  # type: ignore
-    """
-    Calculate evaluation metrics (MAFE, MSE, RMSE, MAPE) for each index at a given horizon h.
-    """
-    T = actuals.shape[0]  # type: ignore
-    if predictions.shape[0] > T - h:  # type: ignore
-        predictions = predictions[:T - h]  # type: ignore
-    actuals = actuals[h:]  # type: ignore
-
-    metrics_results: Any = {}  # type: ignore
-
-    for idx in range(actuals.shape[1]):  # type: ignore
-        actual = actuals[:, idx]  # type: ignore
-        prediction = predictions[:, idx] if predictions.shape[1] > 1 else predictions.view(-1)  # type: ignore
-
-        eps = 1e-8
-        mafe = torch.mean(torch.abs(prediction - actual)).item()  # type: ignore
-        mse = F.mse_loss(prediction, actual).item()  # type: ignore
-        rmse = torch.sqrt(F.mse_loss(prediction, actual)).item()  # type: ignore
-        mape = (torch.mean(torch.abs((actual - prediction) / (actual + eps))) * 100).item()  # type: ignore
-
-        metrics_results[f"Index {idx+1}"] = {
-            "MAFE": mafe,
-            "MSE": mse,
-            "RMSE": rmse,
-            "MAPE": mape
-        }
+def print_mlp_progress(params: Any, epoch: int, train_loss: float, validation_loss: float) -> None:  # type: ignore
+    if epoch % 10 == 0:
+        print(f"[MLP] Params {params}, Epoch {epoch}, Training Loss: {train_loss:.6f}, Validation Loss: {validation_loss:.6f}")
+
+
+def train_mlp(config: PipelineConfig, graph: StageOutputs) -> StageOutputs:
+    import figures
+    from ensemble import train_stacked_mlp
+    from model_cache import ModelCache
+    from models import BaselineMLPModel
+    from search import best_result_index
+
+    train_data, validation_data = graph['train_data'], graph['validation_data']
+    param_combinations = list(itertools.product(*config.mlp_grid))
+
+    # The MLPs are tiny, so all 27 train as stacked ensembles (one per hidden size)
+    # in a single batched forward/backward pass per epoch instead of a process pool.
+    # Each ensemble runs the same successive halving as the GCN+GAT search (best
+    # third kept at epochs 5, 15 and 45) and drops members as they leave it.
+    mlp_results = train_stacked_mlp(param_combinations, train_data, validation_data,
+                                    num_epochs=config.num_epochs, patience=config.patience,
+                                    on_epoch=print_mlp_progress, seed=config.seed, cache=ModelCache())
+
+    best_index = best_result_index(mlp_results)
+    best_params = param_combinations[best_index]
+
+    # Rebuild the best configuration from its member of the stacked ensemble (weights of its best epoch)
+    baseline_model = BaselineMLPModel(input_dim=train_data.x.shape[1], hidden_dim=best_params[0],
+                                      dropout_rate=best_params[2])
+    baseline_model.load_state_dict(mlp_results[best_index].state_dict)
 
-    return metrics_results
+    figures.plot(figures.loss_curves, mlp_results[best_index].train_losses, mlp_results[best_index].validation_losses,
+                 'Training and Validation Loss Over Epochs (Best MLP Config)', title='MLP Loss Curves')
 
-validation_targets2 = validation_data.x  # type: ignore
+    print(f"Best Hyperparameters (MLP): Hidden Dim: {best_params[0]}, Learning Rate: {best_params[1]}, Dropout Rate: {best_params[2]}")  # type: ignore
 
-baseline_model.eval()  # type: ignore
-with torch.no_grad():
-    validation_out2 = baseline_model(validation_data)  # type: ignore
+    return {'results': mlp_results, 'best_params': best_params,
+            'best_val_loss': mlp_results[best_index].best_validation_loss, 'model': baseline_model,
+            'cache_key': mlp_results[best_index].cache_key}
 
-horizons = [1, 5, 10, 22]
-metrics_results_per_horizon = {}
 
-for h in horizons:
-    metrics_results = calculate_metrics_for_all_indices(validation_targets2, validation_out2, h)  # type: ignore
-    metrics_results_per_horizon[f"Metrics for horizon {h}"] = metrics_results  # type: ignore
+def evaluate_mlp(config: PipelineConfig, graph: StageOutputs, train_mlp: StageOutputs) -> StageOutputs:
+    import torch  # type: ignore
 
-for horizon, metrics_by_index in metrics_results_per_horizon.items():  # type: ignore
-    print(f"Metrics for horizon {horizon}:")
-    print(f"  {'Index':<8} {'MAFE':<10} {'MSE':<10} {'RMSE':<10} {'MAPE':<12}")
-    for index, metrics in metrics_by_index.items():  # type: ignore
-        print(f"{index:<8} {metrics['MAFE']:<10.6f} {metrics['MSE']:<10.6f} {metrics['RMSE']:<10.6f} {metrics['MAPE']:<12.6f} ")  # type: ignore
+    from metrics import forecast_metrics
+
+    validation_data = graph['validation_data']
+    baseline_model = train_mlp['model']
+    baseline_model.eval()  # type: ignore
+    with torch.no_grad():
+        validation_out2 = baseline_model(validation_data)  # type: ignore
+
+    mlp_metrics = forecast_metrics(validation_data.x, validation_out2, config.horizons)
+    print_metrics(mlp_metrics)
+    return {'metrics': mlp_metrics}
+
+
+def export(config: PipelineConfig, features: StageOutputs, graph: StageOutputs, train_gnn: StageOutputs,
+           train_mlp: StageOutputs) -> StageOutputs:
+    # Both chosen models with the static edge_index and the validation history;
+    # publish_export writes them out
+    validation_lo, validation_hi = features['split_bounds']['validation']
+    return {
+        'models': {'gcn_gat': (train_gnn['model'], True), 'mlp': (train_mlp['model'], False)},
+        'edge_index': graph['train_data'].edge_index,
+        'markets': graph['markets'],
+        'history': graph['validation_data'].x.numpy(),
+        'dates': features['combined_realized_vol'].index[validation_lo:validation_hi],
+        'cache_keys': {'gcn_gat': train_gnn['cache_key'], 'mlp': train_mlp['cache_key']},
+    }
+
+
+def publish_export(config: PipelineConfig, outputs: StageOutputs) -> None:
+    from inference import DEFAULT_EXPORT_DIR, export_models
+
+    # TorchScript models and manifest for the standalone inference engine / Streamlit app
+    manifest = export_models(DEFAULT_EXPORT_DIR, outputs['models'], outputs['edge_index'], outputs['markets'],
+                             history=outputs['history'], dates=outputs['dates'], cache_keys=outputs['cache_keys'])
+    print(f"Models exported to {manifest}")
+
+
+# =========================
+# 10. WALK-FORWARD BACKTEST (GCN + GAT)
+# =========================
+
+def backtest(config: PipelineConfig, features: StageOutputs, graph: StageOutputs,
+             train_gnn: StageOutputs) -> StageOutputs:
+    import torch  # type: ignore
+
+    from backtest import walk_forward
+    from snapshots import SnapshotDataset
+
+    # Refit the best GCN+GAT configuration every backtest_test_size days on all
+    # data up to that point, warm-starting from the previous refit, and
+    # forecast the next block.
+    # The snapshots and spillover graphs come from the on-disk caches.
+    combined_realized_vol = features['combined_realized_vol']
+    train_data = graph['train_data']
+    full_panel = torch.tensor(combined_realized_vol.to_numpy(), dtype=torch.float32)
+    dynamic_graphs = snapshot_graphs(config, combined_realized_vol)
+    if dynamic_graphs is not None:
+        backtest_dataset = SnapshotDataset(full_panel, lookback=config.lookback, dates=combined_realized_vol.index,
+                                           graphs=dynamic_graphs)
+    else:
+        backtest_dataset = SnapshotDataset(full_panel, train_data.edge_index, train_data.edge_weight,
+                                           lookback=config.lookback, dates=combined_realized_vol.index)
+
+    n_train_rows = features['split_bounds']['train'][1]
+    backtest_result = walk_forward(
+        backtest_dataset, train_gnn['best_params'],
+        initial_train=n_train_rows - backtest_dataset.target_row(0), test_size=config.backtest_test_size,
+        mode='expanding', initial_epochs=config.num_epochs, refit_epochs=config.backtest_refit_epochs,
+        num_chains=config.backtest_chains, max_workers=parallel_workers(), seed=config.seed,
+        markets=list(combined_realized_vol.columns),
+    )
+    print(f"Walk-forward backtest: {len(backtest_result.folds)} refits, "
+          f"{len(backtest_result.predictions)} out-of-sample days")
+    print(backtest_result.metrics.pivot_table(index='market', columns='metric', values='value', sort=False)
+          .to_string())  # type: ignore
+    return {'result': backtest_result}
+
+
+# =========================
+# PIPELINE
+# =========================
+
+class Stage(NamedTuple):
+    run: Callable[..., StageOutputs]
+    # Upstream stages, passed to ``run`` as keyword arguments by name
+    requires: Tuple[str, ...] = ()
+    # PipelineConfig fields the stage reads (figure settings are not among them)
+    params: Tuple[str, ...] = ()
+    # Writes the stage's files (CSVs, dashboard payloads, exported models) from
+    # its outputs; also called when the outputs come from the cache, so the
+    # files on disk always belong to the run that used them
+    publish: Optional[Callable[[PipelineConfig, StageOutputs], None]] = None
+
+
+SNAPSHOT_PARAMS = ('lookback', 'snapshot_graph_mode', 'spillover_window', 'lag_order', 'forecast_horizon',
+                   'num_epochs', 'seed')
+
+# In dependency order
+STAGES: Dict[str, Stage] = {
+    'fetch': Stage(fetch, (), ('tickers', 'start_date', 'end_date', 'data_source'), publish_fetch),
+    'features': Stage(features, ('fetch',), ('volatility_window',)),
+    'stats': Stage(stats, ('fetch', 'features'), publish=publish_stats),
+    'spillover': Stage(spillover, ('features',), ('lag_order', 'forecast_horizon', 'spillover_window',
+                                                  'lag_order_grid', 'forecast_horizon_grid')),
+    'graph': Stage(graph, ('features', 'spillover')),
+    'train_gnn': Stage(train_gnn, ('graph',), ('gcn_gat_grid', 'num_epochs', 'patience', 'seed')),
+    'evaluate_gnn': Stage(evaluate_gnn, ('graph', 'train_gnn'), ('horizons',)),
+    'snapshots': Stage(snapshots, ('features', 'graph', 'train_gnn'), SNAPSHOT_PARAMS),
+    'train_mlp': Stage(train_mlp, ('graph',), ('mlp_grid', 'num_epochs', 'patience', 'seed')),
+    'evaluate_mlp': Stage(evaluate_mlp, ('graph', 'train_mlp'), ('horizons',)),
+    'export': Stage(export, ('features', 'graph', 'train_gnn', 'train_mlp'), publish=publish_export),
+    'backtest': Stage(backtest, ('features', 'graph', 'train_gnn'),
+                      SNAPSHOT_PARAMS + ('backtest_test_size', 'backtest_refit_epochs', 'backtest_chains')),
+}
+
+# Left out of a run without explicit stages
+OPT_IN_STAGES = ('backtest',)
+DEFAULT_STAGES = [name for name in STAGES if name not in OPT_IN_STAGES]
+
+STAGE_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'train': ('train_gnn', 'train_mlp'),
+    'evaluate': ('evaluate_gnn', 'evaluate_mlp'),
+}
+
+
+def expand_aliases(names: Sequence[str]) -> List[str]:
+    return [stage for name in names for stage in STAGE_ALIASES.get(name, (name,))]
+
+
+def resolve_stages(names: Sequence[str]) -> List[str]:
+    """
+    ``names`` (stages or aliases) plus everything they depend on, in
+    dependency order.
+    """
+    needed = set()
+    pending = expand_aliases(names)
+    while pending:
+        name = pending.pop()
+        if name not in STAGES:
+            raise ValueError(f"unknown stage: {name}")
+        if name not in needed:
+            needed.add(name)
+            pending.extend(STAGES[name].requires)
+    return [name for name in STAGES if name in needed]
+
+
+def stage_fingerprints(names: Sequence[str], config: PipelineConfig) -> Dict[str, str]:
+    """
+    Fingerprint of each of ``names`` and their dependencies: a hash of the
+    stage's code (with the helpers it calls and the project modules it
+    imports), the config fields it reads and its upstream fingerprints.
+    Changing a field therefore invalidates the stages that read it and
+    everything downstream of them, and nothing else.
+    """
+    from fingerprints import cache_key, code_fingerprint
+
+    fingerprints: Dict[str, str] = {}
+    for name in resolve_stages(names):
+        stage = STAGES[name]
+        fingerprints[name] = cache_key(
+            stage=name,
+            code=code_fingerprint(stage.run),
+            params={field: getattr(config, field) for field in stage.params},
+            upstream=[fingerprints[upstream] for upstream in stage.requires],
+        )
+    return fingerprints
+
+
+def run_pipeline(
+    names: Optional[Sequence[str]] = None,
+    config: PipelineConfig = PipelineConfig(),
+    cache: Optional[StageCache] = None,
+    force: Sequence[str] = (),
+    profiler: Optional[profiling.Profiler] = None,
+) -> Dict[str, StageOutputs]:
+    """
+    Run ``names`` (default: ``DEFAULT_STAGES``) and their dependencies; returns the
+    outputs of every stage that ran or was loaded. Figures go where
+    ``config.plots`` says (see ``figures``).
+
+    With a ``StageCache`` a stage whose fingerprint is stored is loaded
+    instead of run, and upstream outputs are only loaded when a stage that
+    does run needs them. A stage's files are written by its ``publish`` step
+    whenever its outputs are used, cached or not. Stages in ``force`` always
+    run.
+
+    A ``Profiler`` records every stage, cache load and training epoch of the
+    run (see ``profiling``); writing it out is left to the caller.
+    """
+    import figures
+
+    force = set(expand_aliases(force))
+    targets = expand_aliases(names or DEFAULT_STAGES)
+    targets += [name for name in STAGES if name in force and name not in targets]
+    fingerprints = stage_fingerprints(targets, config)
+    results: Dict[str, StageOutputs] = {}
+
+    def publish(name: str) -> None:
+        stage = STAGES[name]
+        if stage.publish is not None:
+            with profiling.span(f'{name} files'):
+                stage.publish(config, results[name])
+
+    def outputs(name: str) -> StageOutputs:
+        if name in results:
+            return results[name]
+        stage = STAGES[name]
+        key = fingerprints[name]
+        if cache is not None and name not in force and (name, key) in cache:
+            with profiling.span(name, 'cache'):
+                cached = cache.load(name, key)
+            if cached is not None:
+                print(f"=== {name} (cached) ===")
+                results[name] = cached
+                publish(name)
+                return cached
+
+        inputs = {upstream: outputs(upstream) for upstream in stage.requires}
+        print(f"=== {name} ===")
+        report.section = name
+        with profiling.span(name, 'stage') as span:
+            results[name] = stage.run(config, **inputs)
+            span.tensors.append(results[name])
+        if cache is not None:
+            cache.store(name, key, results[name],
+                        meta={'params': {field: getattr(config, field) for field in stage.params},
+                              'upstream': {upstream: fingerprints[upstream] for upstream in stage.requires}})
+        publish(name)
+        return results[name]
+
+    # Figures render in worker processes (report mode) while the stages compute
+    report = figures.FigureReport(config.plots, config.report_dir)
+    previous = figures.activate(report)
+    previous_profiler = profiling.activate(profiler or profiling.Profiler(enabled=False))
+    try:
+        with profiling.span('pipeline', 'run', stages=targets):
+            for name in resolve_stages(targets):
+                if name in targets:
+                    outputs(name)
+    finally:
+        profiling.activate(previous_profiler)
+        figures.activate(previous)
+        index = report.close()
+    if index is not None:
+        print(f"Figures written to {index}")
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, StageOutputs]:
+    defaults = PipelineConfig()
+    parser = argparse.ArgumentParser(
+        description="Cross-market volatility spillover and forecasting pipeline.",
+        epilog=f"stages: {', '.join(STAGES)}; aliases: "
+               + ', '.join(f"{alias} = {' + '.join(stages)}" for alias, stages in STAGE_ALIASES.items()),
+    )
+    parser.add_argument('stages', nargs='*', metavar='STAGE',
+                        help="stages to run with their dependencies "
+                             f"(default: all but {', '.join(OPT_IN_STAGES)})")
+    parser.add_argument('--data-source', choices=('yahoo', 'csv', 'store'), default=defaults.data_source,
+                        help="where missing price data comes from (default: %(default)s)")
+    parser.add_argument('--plots', choices=('show', 'report', 'none'), default=defaults.plots,
+                        help="show figures interactively, render them headless to --report-dir, "
+                             "or skip them (default: %(default)s)")
+    parser.add_argument('--no-plots', dest='plots', action='store_const', const='none',
+                        help="same as --plots none")
+    parser.add_argument('--report-dir', default=defaults.report_dir,
+                        help="output directory of --plots report (default: %(default)s)")
+    parser.add_argument('--epochs', type=int, default=defaults.num_epochs,
+                        help="training epochs per model (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--cache-dir', default=None,
+                        help="stage output cache (default: .stage_cache)")
+    parser.add_argument('--no-cache', action='store_true', help="run every stage and store nothing")
+    parser.add_argument('--force', action='append', default=[], metavar='STAGE',
+                        help="rerun STAGE even if its output is cached (repeatable)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="record wall/CPU time, peak RSS and tensor memory of every stage and epoch, "
+                             "and write them to PATH as JSON / Chrome trace")
+    parser.add_argument('--cprofile', metavar='DIR',
+                        help="also run each stage under cProfile and dump DIR/<stage>.prof")
+    args = parser.parse_args(argv)
+
+    for name in args.stages + args.force:
+        if name not in STAGES and name not in STAGE_ALIASES:
+            parser.error(f"unknown stage {name!r}")
+    config = defaults._replace(data_source=args.data_source, plots=args.plots, report_dir=args.report_dir,
+                               num_epochs=args.epochs, seed=args.seed)
+
+    cache = None
+    if not args.no_cache:
+        from stage_cache import DEFAULT_STAGE_CACHE_DIR, StageCache
+
+        cache = StageCache(args.cache_dir or DEFAULT_STAGE_CACHE_DIR)
+    if not (args.profile or args.cprofile):
+        return run_pipeline(args.stages, config, cache=cache, force=args.force)
+
+    with profiling.Profiler(cprofile_dir=args.cprofile) as profiler:
+        results = run_pipeline(args.stages, config, cache=cache, force=args.force, profiler=profiler)
+        profiler.print_summary()
+        if args.profile:
+            profiler.write(args.profile)
+            print(f"Profile written to {args.profile}")
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
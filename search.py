@@ -0,0 +1,435 @@
+"""
+Parallel hyperparameter search for the GCN + GAT and MLP models.
+
+Each configuration is trained in its own worker process with a pinned
+``torch.set_num_threads`` budget. The train/validation tensors are moved to
+shared memory once before the pool starts, so workers read them without
+copies. Per-epoch losses stream back to the parent through a queue while
+training is still running.
+
+``successive_halving`` runs the same grid under a successive-halving
+schedule: every configuration gets a small epoch budget, only the best
+fraction is resumed for a larger one, and any run whose validation loss
+stops improving for ``patience`` epochs is stopped early.
+
+With a ``ModelCache`` every run is stored under a hash of the model class,
+hyperparameters, seed, schedule and training data, and found again on the
+next search instead of being retrained.
+"""
+import math
+import os
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import torch  # type: ignore
+import torch.multiprocessing as mp  # type: ignore
+from torch_geometric.data import Data  # type: ignore
+
+import profiling
+from model_cache import ModelCache, cache_key, class_fingerprint, data_fingerprint
+from models import BaselineMLPModel, GCN_GAT_Model
+
+# Part of every training cache key; entries stored before results carried the
+# best-epoch weights hold last-epoch weights and must not be served
+WEIGHTS_VERSION = 'best-epoch'
+
+# on_epoch(params, epoch, train_loss, validation_loss)
+EpochCallback = Callable[[Tuple[Any, ...], int, float, float], None]
+
+
+class SearchResult(NamedTuple):
+    params: Tuple[Any, ...]
+    train_losses: List[float]
+    validation_losses: List[float]
+    # Weights of the epoch with the lowest validation loss (``best_validation_loss``)
+    state_dict: Dict[str, torch.Tensor]
+    # Adam state, so a later rung can resume training where this one stopped
+    optimizer_state: Optional[Dict[str, Any]] = None
+    stopped_early: bool = False
+    cache_key: Optional[str] = None
+    # Weights after the last epoch trained, which ``optimizer_state`` belongs to
+    last_state_dict: Optional[Dict[str, torch.Tensor]] = None
+
+    @property
+    def best_validation_loss(self) -> float:
+        return min(self.validation_losses) if self.validation_losses else float('inf')
+
+
+def build_gcn_gat(params: Tuple[Any, ...], input_dim: int) -> Tuple[torch.nn.Module, float]:
+    hidden_dim, num_heads, num_layers, lr, dropout_rate = params
+    # One output per input market (8 in the pipeline), so panels of any width train
+    return GCN_GAT_Model(input_dim, hidden_dim, num_heads, num_layers, dropout_p=dropout_rate,
+                         output_dim=input_dim), lr
+
+
+def build_mlp(params: Tuple[Any, ...], input_dim: int) -> Tuple[torch.nn.Module, float]:
+    hidden_dim, lr, dropout_rate = params
+    return BaselineMLPModel(input_dim=input_dim, hidden_dim=hidden_dim, dropout_rate=dropout_rate), lr
+
+
+# Workers look builders up by name, so only strings cross the process boundary
+MODEL_BUILDERS: Dict[str, Callable[[Tuple[Any, ...], int], Tuple[torch.nn.Module, float]]] = {
+    'gcn_gat': build_gcn_gat,
+    'mlp': build_mlp,
+}
+
+MODEL_CLASSES: Dict[str, type] = {
+    'gcn_gat': GCN_GAT_Model,
+    'mlp': BaselineMLPModel,
+}
+
+
+def train_config(
+    model_name: str,
+    params: Tuple[Any, ...],
+    train_data: Any,
+    validation_data: Any,
+    num_epochs: int = 50,
+    on_epoch: Optional[Callable[[int, float, float], None]] = None,
+    resume: Optional[SearchResult] = None,
+    patience: Optional[int] = None,
+    min_delta: float = 0.0,
+    seed: Optional[int] = None,
+) -> SearchResult:
+    """
+    Train one configuration with Adam on next-step MSE, recording the train
+    and validation loss of every epoch. The result holds the weights of the
+    epoch with the lowest validation loss, and those after the last epoch
+    for resuming.
+
+    ``num_epochs`` is the total budget: a ``resume`` result continues from its
+    weights, optimizer state and loss history up to that many epochs. With
+    ``patience`` training stops once the validation loss has not improved by
+    more than ``min_delta`` for that many consecutive epochs. ``seed`` makes
+    initialization and dropout reproducible.
+    """
+    if seed is not None:
+        # Offset by the epochs already trained so a resumed run draws fresh dropout masks
+        torch.manual_seed(seed + (len(resume.train_losses) if resume is not None else 0))
+    model, lr = MODEL_BUILDERS[model_name](params, train_data.x.shape[1])
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    criterion = torch.nn.MSELoss()
+
+    train_loss_values: List[float] = []
+    validation_loss_values: List[float] = []
+    best_state: Optional[Dict[str, torch.Tensor]] = None
+    if resume is not None:
+        model.load_state_dict(resume.last_state_dict if resume.last_state_dict is not None else resume.state_dict)
+        if resume.optimizer_state is not None:
+            optimizer.load_state_dict(resume.optimizer_state)
+        train_loss_values = list(resume.train_losses)
+        validation_loss_values = list(resume.validation_losses)
+        best_state = resume.state_dict
+
+    lowest_loss = min(validation_loss_values, default=float('inf'))
+    best_loss = lowest_loss
+    epochs_without_improvement = 0
+    if validation_loss_values:
+        epochs_without_improvement = len(validation_loss_values) - 1 - validation_loss_values.index(best_loss)
+    stopped_early = False
+
+    for epoch in range(len(train_loss_values), num_epochs):
+        with profiling.span(f'{model_name} epoch', 'epoch', params=repr(params), epoch=epoch) as span:
+            model.train()
+            optimizer.zero_grad()
+            out = model(train_data)
+            loss = criterion(out[:-1], train_data.x[1:])
+            loss.backward()
+            optimizer.step()  # type: ignore
+            train_loss_values.append(loss.item())  # type: ignore
+
+            model.eval()
+            with torch.no_grad():
+                validation_out = model(validation_data)
+                validation_loss = criterion(validation_out[:-1], validation_data.x[1:])
+                validation_loss_values.append(validation_loss.item())  # type: ignore
+            span.tensors.extend((model, optimizer))
+
+        if on_epoch is not None:
+            on_epoch(epoch, train_loss_values[-1], validation_loss_values[-1])
+
+        if validation_loss_values[-1] < lowest_loss:
+            lowest_loss = validation_loss_values[-1]
+            best_state = {name: value.detach().clone() for name, value in model.state_dict().items()}
+        if validation_loss_values[-1] < best_loss - min_delta:
+            best_loss = validation_loss_values[-1]
+            epochs_without_improvement = 0
+        else:
+            epochs_without_improvement += 1
+        if patience is not None and epochs_without_improvement >= patience:
+            stopped_early = True
+            break
+
+    last_state = model.state_dict()
+    return SearchResult(params, train_loss_values, validation_loss_values,
+                        best_state if best_state is not None else last_state,
+                        optimizer.state_dict(), stopped_early, last_state_dict=last_state)
+
+
+# =========================
+# WORKER PROCESS STATE
+# =========================
+
+_worker_data: Dict[str, Any] = {}
+
+
+def _init_worker(num_threads: int, tensors: Dict[str, torch.Tensor], progress: Any) -> None:
+    torch.set_num_threads(num_threads)
+    _worker_data['train'] = Data(x=tensors['train_x'], edge_index=tensors['train_edge_index'])
+    _worker_data['validation'] = Data(x=tensors['validation_x'], edge_index=tensors['validation_edge_index'])
+    _worker_data['progress'] = progress
+
+
+def _train_in_worker(index: int, model_name: str, params: Tuple[Any, ...], num_epochs: int,
+                     resume: Optional[SearchResult], patience: Optional[int], min_delta: float,
+                     seed: Optional[int]) -> SearchResult:
+    progress = _worker_data['progress']
+
+    def report(epoch: int, train_loss: float, validation_loss: float) -> None:
+        progress.put((index, epoch, train_loss, validation_loss))
+
+    return train_config(model_name, params, _worker_data['train'], _worker_data['validation'],
+                        num_epochs, on_epoch=report, resume=resume, patience=patience, min_delta=min_delta,
+                        seed=seed)
+
+
+def _train_all(
+    model_name: str,
+    param_combinations: Sequence[Tuple[Any, ...]],
+    train_data: Any,
+    validation_data: Any,
+    num_epochs: int = 50,
+    max_workers: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
+    on_epoch: Optional[EpochCallback] = None,
+    resume: Optional[Sequence[Optional[SearchResult]]] = None,
+    patience: Optional[int] = None,
+    min_delta: float = 0.0,
+    seed: Optional[int] = None,
+) -> List[SearchResult]:
+    param_combinations = list(param_combinations)
+    resume = list(resume) if resume is not None else [None] * len(param_combinations)
+
+    if max_workers == 1:
+        results = []
+        for params, previous in zip(param_combinations, resume):
+            def report(epoch: int, train_loss: float, validation_loss: float,
+                       params: Tuple[Any, ...] = params) -> None:
+                if on_epoch is not None:
+                    on_epoch(params, epoch, train_loss, validation_loss)
+            results.append(train_config(model_name, params, train_data, validation_data,
+                                        num_epochs, on_epoch=report, resume=previous,
+                                        patience=patience, min_delta=min_delta, seed=seed))
+        return results
+
+    cpu_count = os.cpu_count() or 1
+    threads_per_worker = threads_per_worker or max(1, cpu_count // (max_workers or cpu_count))
+    max_workers = max_workers or max(1, cpu_count // threads_per_worker)
+    max_workers = min(max_workers, len(param_combinations))
+
+    tensors = {
+        'train_x': train_data.x, 'train_edge_index': train_data.edge_index,
+        'validation_x': validation_data.x, 'validation_edge_index': validation_data.edge_index,
+    }
+    for tensor in tensors.values():
+        tensor.share_memory_()
+
+    context = mp.get_context()
+    progress = context.Queue()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                             initargs=(threads_per_worker, tensors, progress)) as executor:
+        futures: List[Future] = [  # type: ignore
+            executor.submit(_train_in_worker, index, model_name, params, num_epochs,
+                            resume[index], patience, min_delta, seed)
+            for index, params in enumerate(param_combinations)
+        ]
+        # Relay streamed losses until every configuration has finished
+        while True:
+            try:
+                index, epoch, train_loss, validation_loss = progress.get(timeout=0.1)
+            except queue.Empty:
+                if all(future.done() for future in futures):
+                    break
+                continue
+            if on_epoch is not None:
+                on_epoch(param_combinations[index], epoch, train_loss, validation_loss)
+
+        results = [future.result() for future in futures]
+
+    # Messages can still be in flight after the last future completed
+    while on_epoch is not None:
+        try:
+            index, epoch, train_loss, validation_loss = progress.get_nowait()
+        except queue.Empty:
+            break
+        on_epoch(param_combinations[index], epoch, train_loss, validation_loss)
+
+    return results
+
+
+def training_key(
+    model_name: str,
+    params: Tuple[Any, ...],
+    input_dim: int,
+    data_hash: str,
+    num_epochs: int,
+    seed: Optional[int],
+    patience: Optional[int] = None,
+    min_delta: float = 0.0,
+    parent: Optional[str] = None,
+) -> str:
+    """
+    Cache key of one ``train_config`` call; ``parent`` is the key of the run it resumes.
+    The builder is part of it, since it derives the model's shape (e.g. the
+    GCN+GAT output width) from ``input_dim``.
+    """
+    return cache_key(model=class_fingerprint(MODEL_CLASSES[model_name]),
+                     builder=class_fingerprint(MODEL_BUILDERS[model_name]), params=tuple(params),
+                     input_dim=input_dim, data=data_hash, num_epochs=num_epochs, seed=seed, patience=patience,
+                     min_delta=min_delta, parent=parent, weights=WEIGHTS_VERSION)
+
+
+def load_cached(cache: ModelCache, key: str, params: Tuple[Any, ...]) -> Optional[SearchResult]:
+    entry = cache.load(key)
+    if entry is None:
+        return None
+    return SearchResult(params, entry['train_losses'], entry['validation_losses'], entry['state_dict'],
+                        entry['optimizer_state'], entry['meta'].get('stopped_early', False), key,
+                        entry.get('last_state_dict'))
+
+
+def store_cached(cache: ModelCache, key: str, model_name: str, result: SearchResult,
+                 data_hash: str, seed: Optional[int]) -> SearchResult:
+    cache.store(key, result.state_dict, result.train_losses, result.validation_losses,
+                result.optimizer_state, last_state_dict=result.last_state_dict, meta={
+                    'model_name': model_name, 'params': list(result.params), 'seed': seed,
+                    'data': data_hash, 'epochs': len(result.train_losses),
+                    'stopped_early': result.stopped_early,
+                })
+    return result._replace(cache_key=key)
+
+
+def run_search(
+    model_name: str,
+    param_combinations: Sequence[Tuple[Any, ...]],
+    train_data: Any,
+    validation_data: Any,
+    num_epochs: int = 50,
+    max_workers: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
+    on_epoch: Optional[EpochCallback] = None,
+    resume: Optional[Sequence[Optional[SearchResult]]] = None,
+    patience: Optional[int] = None,
+    min_delta: float = 0.0,
+    seed: Optional[int] = None,
+    cache: Optional[ModelCache] = None,
+) -> List[SearchResult]:
+    """
+    Train every configuration and return results in ``param_combinations`` order.
+
+    ``max_workers=1`` trains in-process. Otherwise the CPU budget is split
+    between ``max_workers`` processes of ``threads_per_worker`` threads each
+    (by default as many single-threaded workers as there are cores).
+    ``resume``, ``patience``, ``min_delta`` and ``seed`` are passed on to
+    ``train_config``, ``resume`` holding one earlier result (or None) per
+    configuration. With ``cache`` only configurations without a stored run
+    are trained; ``on_epoch`` is not called for the ones loaded from it.
+    """
+    param_combinations = list(param_combinations)
+    resume = list(resume) if resume is not None else [None] * len(param_combinations)
+    if cache is None:
+        return _train_all(model_name, param_combinations, train_data, validation_data, num_epochs,
+                          max_workers, threads_per_worker, on_epoch, resume, patience, min_delta, seed)
+
+    data_hash = data_fingerprint(train_data, validation_data)
+    keys = [
+        training_key(model_name, params, train_data.x.shape[1], data_hash, num_epochs, seed, patience, min_delta,
+                     previous.cache_key if previous is not None else None)
+        for params, previous in zip(param_combinations, resume)
+    ]
+    results = [load_cached(cache, key, params) for key, params in zip(keys, param_combinations)]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        trained = _train_all(model_name, [param_combinations[i] for i in missing], train_data, validation_data,
+                             num_epochs, max_workers, threads_per_worker, on_epoch,
+                             [resume[i] for i in missing], patience, min_delta, seed)
+        for index, result in zip(missing, trained):
+            results[index] = store_cached(cache, keys[index], model_name, result, data_hash, seed)
+    return results  # type: ignore
+
+
+# =========================
+# SUCCESSIVE HALVING
+# =========================
+
+def rung_budgets(num_epochs: int, min_epochs: int, eta: int) -> List[int]:
+    """
+    Cumulative epoch budgets min_epochs, min_epochs * eta, ... capped by num_epochs.
+    """
+    budgets = []
+    budget = min_epochs
+    while budget < num_epochs:
+        budgets.append(budget)
+        budget *= eta
+    budgets.append(num_epochs)
+    return budgets
+
+
+def successive_halving(
+    model_name: str,
+    param_combinations: Sequence[Tuple[Any, ...]],
+    train_data: Any,
+    validation_data: Any,
+    num_epochs: int = 50,
+    min_epochs: int = 5,
+    eta: int = 3,
+    patience: Optional[int] = None,
+    min_delta: float = 0.0,
+    max_workers: Optional[int] = None,
+    threads_per_worker: Optional[int] = None,
+    on_epoch: Optional[EpochCallback] = None,
+    seed: Optional[int] = None,
+    cache: Optional[ModelCache] = None,
+) -> List[SearchResult]:
+    """
+    Successive-halving search over ``param_combinations``.
+
+    All configurations train for ``min_epochs``; after each rung only the best
+    1 / ``eta`` by latest validation loss resume, with the budget multiplied by
+    ``eta`` until ``num_epochs``. Total work grows with the number of
+    configurations times ``min_epochs`` instead of times ``num_epochs``, so
+    grids can be made much wider. Runs that hit ``patience`` leave the
+    schedule early. Every configuration gets a result, in
+    ``param_combinations`` order, holding the epochs it actually trained.
+    """
+    param_combinations = list(param_combinations)
+    results: List[Optional[SearchResult]] = [None] * len(param_combinations)
+    active = list(range(len(param_combinations)))
+
+    budgets = rung_budgets(num_epochs, min_epochs, eta)
+    for rung, budget in enumerate(budgets):
+        rung_results = run_search(
+            model_name, [param_combinations[i] for i in active], train_data, validation_data,
+            num_epochs=budget, max_workers=max_workers, threads_per_worker=threads_per_worker,
+            on_epoch=on_epoch, resume=[results[i] for i in active],
+            patience=patience, min_delta=min_delta, seed=seed, cache=cache,
+        )
+        for index, result in zip(active, rung_results):
+            results[index] = result
+
+        active = [i for i in active if not results[i].stopped_early]  # type: ignore
+        if rung < len(budgets) - 1:
+            active.sort(key=lambda i: results[i].validation_losses[-1])  # type: ignore
+            active = sorted(active[:math.ceil(len(active) / eta)])
+        if not active:
+            break
+
+    return results  # type: ignore
+
+
+def best_result_index(results: Sequence[SearchResult]) -> int:
+    """
+    Index of the first result with the lowest validation loss seen during training.
+    """
+    return min(range(len(results)), key=lambda i: results[i].best_validation_loss)
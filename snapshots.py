@@ -0,0 +1,247 @@
+"""
+Sliding-window graph snapshots for the GCN + GAT model.
+
+Each sample is one N-node spillover graph whose node features are the last
+``lookback`` days of that market's realized volatility and whose target is
+the realized volatility ``horizon`` days later. All windows are strided
+views (``Tensor.unfold``) over a single contiguous (T x N) tensor, so the
+dataset holds the history once no matter how many windows it serves; only
+the mini-batches are materialized, as PyG ``Batch`` objects assembled
+with a few vectorized gathers.
+
+With a ``DynamicGraphCache`` each snapshot instead uses the spillover graph
+estimated on the trailing window that ends on its last input day, read
+from the memory-mapped cache by date.
+"""
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import torch  # type: ignore
+from torch.utils.data import DataLoader, Dataset  # type: ignore
+from torch_geometric.data import Batch, Data  # type: ignore
+
+import profiling
+
+
+class SnapshotDataset(Dataset):  # type: ignore
+    """
+    Window i covers rows i .. i + lookback - 1 of ``volatility``; its target
+    is row i + lookback - 1 + horizon.
+
+    ``graphs`` (a ``DynamicGraphCache``, needs ``dates``) replaces the static
+    ``edge_index`` per snapshot; windows ending before the first cached
+    spillover window are skipped.
+    """
+
+    def __init__(
+        self,
+        volatility: torch.Tensor,
+        edge_index: Optional[torch.Tensor] = None,
+        edge_weight: Optional[torch.Tensor] = None,
+        lookback: int = 21,
+        horizon: int = 1,
+        dates: Optional[pd.DatetimeIndex] = None,
+        graphs: Optional[Any] = None,
+    ) -> None:
+        self.volatility = volatility.contiguous()
+        self.edge_index = edge_index
+        self.edge_weight = edge_weight
+        self.lookback = lookback
+        self.horizon = horizon
+        self.dates = dates
+        self.graphs = graphs
+        # (T - lookback + 1, N, lookback) view; no data is copied
+        self.windows = self.volatility.unfold(0, lookback, 1)
+
+        self.first = 0
+        self.graph_positions: Optional[np.ndarray] = None
+        if graphs is not None:
+            if dates is None:
+                raise ValueError("dynamic graphs are looked up by date; pass dates")
+            count = max(0, self.volatility.shape[0] - lookback - horizon + 1)
+            last_input_dates = pd.DatetimeIndex(dates)[lookback - 1:lookback - 1 + count]
+            self.graph_positions = graphs.dates.searchsorted(last_input_dates, side='right') - 1
+            self.first = int((self.graph_positions < 0).sum())
+        elif edge_index is None:
+            raise ValueError("pass either a static edge_index or dynamic graphs")
+
+    @classmethod
+    def from_graph_data(
+        cls,
+        data: Data,
+        lookback: int = 21,
+        horizon: int = 1,
+        dates: Optional[pd.DatetimeIndex] = None,
+    ) -> 'SnapshotDataset':
+        """
+        Snapshots over the (T x N) ``x`` and the static graph of a
+        ``build_graph_data`` result.
+        """
+        return cls(data.x, data.edge_index, getattr(data, 'edge_weight', None), lookback, horizon, dates)
+
+    @classmethod
+    def with_dynamic_graphs(
+        cls,
+        data: Data,
+        graphs: Any,
+        dates: pd.DatetimeIndex,
+        lookback: int = 21,
+        horizon: int = 1,
+    ) -> 'SnapshotDataset':
+        """
+        Snapshots over the (T x N) ``x`` of a ``build_graph_data`` result, each
+        with its own trailing-window graph from ``graphs``.
+        """
+        return cls(data.x, None, None, lookback, horizon, dates, graphs)
+
+    def __len__(self) -> int:
+        return max(0, self.volatility.shape[0] - self.lookback - self.horizon + 1 - self.first)
+
+    def target_row(self, index: int) -> int:
+        return self.first + index + self.lookback - 1 + self.horizon
+
+    def target_date(self, index: int) -> Optional[pd.Timestamp]:
+        return self.dates[self.target_row(index)] if self.dates is not None else None
+
+    def __getitem__(self, index: int) -> Data:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        x = self.windows[self.first + index]
+        y = self.volatility[self.target_row(index)].unsqueeze(-1)
+        edge_index, edge_weight = self.edge_index, self.edge_weight
+        if self.graphs is not None:
+            edge_index, edge_weight = self.graphs.graph_at(int(self.graph_positions[self.first + index]))  # type: ignore
+        data = Data(x=x, edge_index=edge_index, y=y, num_nodes=x.shape[0])
+        if edge_weight is not None:
+            data.edge_weight = edge_weight
+        return data
+
+    def collate(self, indices: Sequence[int]) -> Batch:
+        """
+        Mini-batch of snapshots built directly from the history and graph
+        arrays. Gives the same ``Batch`` as collating ``self[i]`` one by one,
+        without creating a ``Data`` object per snapshot.
+        """
+        indices = np.asarray(indices, dtype=np.int64) + self.first
+        B, N = len(indices), self.volatility.shape[1]
+        index_tensor = torch.from_numpy(indices)
+        x = self.windows[index_tensor].reshape(B * N, self.lookback)
+        y = self.volatility[index_tensor + self.lookback - 1 + self.horizon].reshape(B * N, 1)
+
+        if self.graphs is not None:
+            edges, weights, counts = self.graphs.graphs_at(self.graph_positions[indices])  # type: ignore
+            edge_index = torch.from_numpy(edges + np.repeat(np.arange(B) * N, counts))
+            edge_weight: Optional[torch.Tensor] = torch.from_numpy(weights)
+        else:
+            E = self.edge_index.shape[1]  # type: ignore
+            node_offsets = torch.arange(B).repeat_interleave(E) * N
+            edge_index = self.edge_index.repeat(1, B) + node_offsets  # type: ignore
+            edge_weight = self.edge_weight.repeat(B) if self.edge_weight is not None else None
+
+        batch = Batch(x=x, edge_index=edge_index, y=y, batch=torch.arange(B).repeat_interleave(N),
+                      ptr=torch.arange(B + 1) * N)
+        if edge_weight is not None:
+            batch.edge_weight = edge_weight
+        return batch
+
+    def share_memory_(self) -> 'SnapshotDataset':
+        """
+        Move the history to shared memory so loader workers read it in place.
+        """
+        self.volatility.share_memory_()
+        self.windows = self.volatility.unfold(0, self.lookback, 1)
+        return self
+
+
+def snapshot_loader(
+    dataset: SnapshotDataset,
+    batch_size: int = 32,
+    shuffle: bool = False,
+    num_workers: int = 0,
+    prefetch_factor: int = 2,
+    indices: Optional[Sequence[int]] = None,
+) -> DataLoader:
+    """
+    Mini-batches of snapshots (all, or only ``indices``) collated into one
+    disjoint-union ``Batch`` by ``SnapshotDataset.collate``. With
+    ``num_workers`` > 0 batches are assembled ahead of time in persistent
+    worker processes that read the shared history.
+    """
+    indices = list(range(len(dataset))) if indices is None else list(indices)
+    if num_workers > 0:
+        dataset.share_memory_()
+        return DataLoader(indices, batch_size=batch_size, shuffle=shuffle, collate_fn=dataset.collate,
+                               num_workers=num_workers, prefetch_factor=prefetch_factor, persistent_workers=True)
+    return DataLoader(indices, batch_size=batch_size, shuffle=shuffle, collate_fn=dataset.collate)
+
+
+def evaluate_snapshots(model: torch.nn.Module, loader: DataLoader) -> float:
+    """
+    Mean squared error over every node of every snapshot in ``loader``.
+    """
+    criterion = torch.nn.MSELoss(reduction='sum')
+    model.eval()
+    total, count = 0.0, 0
+    with torch.no_grad():
+        for batch in loader:
+            total += criterion(model(batch), batch.y).item()
+            count += batch.y.numel()
+    return total / max(count, 1)
+
+
+def train_snapshots(
+    model: torch.nn.Module,
+    train_loader: DataLoader,
+    validation_loader: Optional[DataLoader],
+    lr: float,
+    num_epochs: int = 50,
+    on_epoch: Optional[Callable[[int, float, float], None]] = None,
+    optimizer: Optional[torch.optim.Optimizer] = None,
+) -> Tuple[List[float], List[float]]:
+    """
+    Mini-batch Adam on next-``horizon`` MSE; returns per-epoch train and
+    validation losses (NaN without a ``validation_loader``). An existing
+    ``optimizer`` continues with its state instead of a fresh Adam.
+    """
+    if optimizer is None:
+        optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    criterion = torch.nn.MSELoss()
+
+    train_loss_values: List[float] = []
+    validation_loss_values: List[float] = []
+    for epoch in range(num_epochs):
+        with profiling.span('snapshot epoch', 'epoch', model=type(model).__name__, epoch=epoch) as span:
+            model.train()
+            total, count = 0.0, 0
+            for batch in train_loader:
+                optimizer.zero_grad()
+                loss = criterion(model(batch), batch.y)
+                loss.backward()
+                optimizer.step()  # type: ignore
+                total += loss.item() * batch.y.numel()
+                count += batch.y.numel()
+            train_loss_values.append(total / max(count, 1))
+            validation_loss_values.append(
+                evaluate_snapshots(model, validation_loader) if validation_loader is not None else float('nan')
+            )
+            span.tensors.extend((model, optimizer))
+
+        if on_epoch is not None:
+            on_epoch(epoch, train_loss_values[-1], validation_loss_values[-1])
+
+    return train_loss_values, validation_loss_values
+
+
+def snapshot_predictions(model: torch.nn.Module, loader: DataLoader) -> Any:
+    """
+    (num_snapshots x N) predictions in loader order.
+    """
+    model.eval()
+    outputs = []
+    with torch.no_grad():
+        for batch in loader:
+            outputs.append(model(batch).view(batch.num_graphs, -1))
+    return torch.cat(outputs)
@@ -0,0 +1,417 @@
+"""
+Diebold-Yilmaz spillover kernels in closed form.
+
+The VAR(p) is estimated by OLS with an intercept (the same specification as
+``statsmodels.tsa.api.VAR(...).fit(lag_order)``) and the forecast error
+variance decomposition is computed directly from the MA coefficients, so
+whole stacks of windows can be decomposed with batched NumPy operations.
+
+Spillover matrices follow ``calculate_spillover_index``: entry ``[i, j]`` is
+the share of market ``j``'s forecast error variance due to shocks in market
+``i``, averaged over horizons 1..H, in percent, with a zero diagonal.
+Two decompositions are available: ``'cholesky'`` (orthogonalised, depends on
+the column order, as ``var_result.fevd``) and ``'generalized'``
+(Pesaran-Shin, invariant to the column order).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class SpilloverTable(NamedTuple):
+    pairwise: pd.DataFrame
+    to_others: pd.Series
+    from_others: pd.Series
+    net: pd.Series
+    total: float
+
+
+class RollingSpillover(NamedTuple):
+    total: pd.Series
+    to_others: pd.DataFrame
+    from_others: pd.DataFrame
+    net: pd.DataFrame
+    matrices: np.ndarray
+
+
+def lagged_design(values: np.ndarray, lag_order: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Regressors ``[1, y_{t-1}, ..., y_{t-p}]`` and targets ``y_t`` of a VAR(p).
+    """
+    T, N = values.shape
+    X = np.empty((T - lag_order, 1 + N * lag_order))
+    X[:, 0] = 1.0
+    for lag in range(1, lag_order + 1):
+        X[:, 1 + (lag - 1) * N:1 + lag * N] = values[lag_order - lag:T - lag]
+    return X, values[lag_order:]
+
+
+def var_coefficients(params: np.ndarray, lag_order: int) -> np.ndarray:
+    """
+    Split a (..., 1 + N p, N) OLS parameter block into (..., p, N, N) lag matrices.
+    """
+    N = params.shape[-1]
+    lags = params[..., 1:, :].reshape(params.shape[:-2] + (lag_order, N, N))
+    return np.swapaxes(lags, -1, -2)
+
+
+def ma_coefficients(coefs: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    MA(infinity) matrices Phi_0..Phi_{horizon-1} for a (..., p, N, N) stack of VARs.
+    """
+    lag_order, N = coefs.shape[-3], coefs.shape[-1]
+    batch = coefs.shape[:-3]
+    phis = np.zeros(batch + (horizon, N, N))
+    phis[..., 0, :, :] = np.eye(N)
+    for i in range(1, horizon):
+        for j in range(1, min(i, lag_order) + 1):
+            phis[..., i, :, :] += phis[..., i - j, :, :] @ coefs[..., j - 1, :, :]
+    return phis
+
+
+def cholesky_fevd(phis: np.ndarray, sigma_u: np.ndarray) -> np.ndarray:
+    """
+    Orthogonalised FEVD, laid out like ``statsmodels`` ``fevd().decomp``:
+    ``decomp[..., i, h, j]`` is the share of variable i's (h + 1)-step
+    forecast error variance due to shock j.
+    """
+    P = np.linalg.cholesky(sigma_u)
+    theta = phis @ P[..., None, :, :]
+    contributions = np.cumsum(theta ** 2, axis=-3)
+    decomp = contributions / contributions.sum(axis=-1, keepdims=True)
+    return np.swapaxes(decomp, -3, -2)
+
+
+def generalized_fevd(phis: np.ndarray, sigma_u: np.ndarray) -> np.ndarray:
+    """
+    Generalized (Pesaran-Shin) FEVD with rows normalised to one, laid out
+    like ``cholesky_fevd``. It does not depend on the variable ordering.
+    """
+    phi_sigma = phis @ sigma_u[..., None, :, :]
+    sigma_diag = np.diagonal(sigma_u, axis1=-2, axis2=-1)[..., None, None, :]
+    contributions = np.cumsum(phi_sigma ** 2, axis=-3) / sigma_diag
+    decomp = contributions / contributions.sum(axis=-1, keepdims=True)
+    return np.swapaxes(decomp, -3, -2)
+
+
+FEVD_METHODS = {
+    'cholesky': cholesky_fevd,
+    'generalized': generalized_fevd,
+}
+
+
+def spillover_matrix(decomp: np.ndarray) -> np.ndarray:
+    """
+    Pairwise spillover matrices for a (..., N, H, N) stack of FEVDs.
+
+    Every entry is normalised by its target's FEV total over all horizons
+    and shocks in one broadcast, with no per-cell loop.
+    """
+    shares = decomp.sum(axis=-2) / decomp.sum(axis=(-2, -1))[..., None]
+    matrix = np.swapaxes(shares, -1, -2) * 100
+    N = matrix.shape[-1]
+    matrix[..., np.arange(N), np.arange(N)] = 0.0
+    return matrix
+
+
+def spillover_matrices_by_horizon(decomp: np.ndarray) -> np.ndarray:
+    """
+    Spillover matrices for every horizon 1..H at once from a (..., N, H, N)
+    FEVD: entry ``[..., h - 1, :, :]`` equals ``spillover_matrix`` of the
+    first h horizons.
+    """
+    cumulative = np.cumsum(decomp, axis=-2)
+    shares = cumulative / cumulative.sum(axis=-1, keepdims=True)
+    matrices = np.moveaxis(shares, -2, -3).swapaxes(-1, -2) * 100
+    N = matrices.shape[-1]
+    matrices[..., np.arange(N), np.arange(N)] = 0.0
+    return matrices
+
+
+def table_from_matrix(matrix: np.ndarray, names: Sequence[str]) -> SpilloverTable:
+    """
+    TO, FROM, NET and total spillover derived from a pairwise matrix.
+    """
+    N = matrix.shape[-1]
+    names = list(names)
+    to_others = matrix.sum(axis=1)
+    from_others = matrix.sum(axis=0)
+    return SpilloverTable(
+        pairwise=pd.DataFrame(matrix, index=names, columns=names),
+        to_others=pd.Series(to_others, index=names, name='to_others'),
+        from_others=pd.Series(from_others, index=names, name='from_others'),
+        net=pd.Series(to_others - from_others, index=names, name='net'),
+        total=float(matrix.sum() / (N ** 2 - N)),
+    )
+
+
+def spillover_table(decomp: np.ndarray, names: Sequence[str]) -> SpilloverTable:
+    """
+    Full spillover table (pairwise, TO, FROM, NET and total) from one FEVD.
+    """
+    return table_from_matrix(spillover_matrix(decomp), names)
+
+
+class VARSpilloverModel:
+    """
+    One VAR fit whose MA coefficients are cached and extended on demand, so
+    spillover tables for any horizon and either FEVD method come from the
+    same estimates without refitting.
+    """
+
+    def __init__(self, coefs: np.ndarray, sigma_u: np.ndarray, names: Sequence[str]) -> None:
+        self.coefs = np.asarray(coefs, dtype=np.float64)
+        self.sigma_u = np.asarray(sigma_u, dtype=np.float64)
+        self.names = list(names)
+        self._phis = np.eye(len(self.names))[None]
+
+    @classmethod
+    def fit(cls, realized_vol_dict: Dict[str, pd.Series], lag_order: int = 2) -> 'VARSpilloverModel':
+        from statsmodels.tsa.api import VAR  # type: ignore
+
+        combined_data = pd.DataFrame(realized_vol_dict).dropna()  # type: ignore
+        var_result = VAR(combined_data).fit(lag_order)  # type: ignore
+        return cls(var_result.coefs, var_result.sigma_u, list(realized_vol_dict.keys()))
+
+    def ma(self, horizon: int) -> np.ndarray:
+        """
+        Phi_0..Phi_{horizon-1}, reusing every matrix computed so far.
+        """
+        if horizon > len(self._phis):
+            lag_order, N = self.coefs.shape[0], self.coefs.shape[1]
+            phis = np.zeros((horizon, N, N))
+            phis[:len(self._phis)] = self._phis
+            for i in range(len(self._phis), horizon):
+                for j in range(1, min(i, lag_order) + 1):
+                    phis[i] += phis[i - j] @ self.coefs[j - 1]
+            self._phis = phis
+        return self._phis[:horizon]
+
+    def fevd(self, horizon: int, method: str = 'cholesky') -> np.ndarray:
+        return FEVD_METHODS[method](self.ma(horizon), self.sigma_u)
+
+    def table(self, horizon: int, method: str = 'cholesky') -> SpilloverTable:
+        return spillover_table(self.fevd(horizon, method), self.names)
+
+    def tables(self, max_horizon: int, method: str = 'cholesky') -> Dict[int, SpilloverTable]:
+        """
+        Spillover tables for every horizon 1..max_horizon from one decomposition.
+        """
+        matrices = spillover_matrices_by_horizon(self.fevd(max_horizon, method))
+        return {
+            horizon: table_from_matrix(matrices[horizon - 1], self.names)
+            for horizon in range(1, max_horizon + 1)
+        }
+
+
+def calculate_spillover_table(realized_vol_dict: Dict[str, pd.Series],
+                              lag_order: int = 2,
+                              forecast_horizon: int = 10,
+                              method: str = 'cholesky') -> SpilloverTable:
+    """
+    Fit a VAR on the aligned volatility series and return the full
+    Diebold-Yilmaz spillover table.
+    """
+    return VARSpilloverModel.fit(realized_vol_dict, lag_order).table(forecast_horizon, method)
+
+
+def calculate_spillover_index(realized_vol_dict: Dict[str, pd.Series],
+                              lag_order: int = 2,
+                              forecast_horizon: int = 10,
+                              method: str = 'cholesky') -> pd.DataFrame:
+    """
+    Calculate the volatility spillover index using the Diebold-Yilmaz methodology.
+    """
+    return calculate_spillover_table(realized_vol_dict, lag_order, forecast_horizon, method).pairwise
+
+
+def rolling_spillover(
+    data: pd.DataFrame,
+    window: int = 200,
+    lag_order: int = 2,
+    forecast_horizon: int = 10,
+    step: int = 1,
+    refresh: int = 250,
+    chunk_size: int = 256,
+) -> RollingSpillover:
+    """
+    Rolling-window spillover series over a date x market frame of realized
+    volatility.
+
+    The OLS cross-products are updated by adding the row entering the window
+    and removing the one leaving it, so each step costs O(K^2) plus one small
+    solve instead of a full VAR refit. They are recomputed from scratch every
+    ``refresh`` steps to keep rounding drift bounded. The FEVDs of all windows
+    are then computed in batches of ``chunk_size``.
+    """
+    values = data.dropna().to_numpy(dtype=np.float64)
+    dates = data.dropna().index
+    T, N = values.shape
+    if window > T:
+        raise ValueError(f"window ({window}) is longer than the sample ({T})")
+
+    X, Y = lagged_design(values, lag_order)
+    rows = window - lag_order
+    K = X.shape[1]
+    dof = rows - K
+
+    ends = list(range(window - 1, T, step))
+    params = np.empty((len(ends), K, N))
+    sigmas = np.empty((len(ends), N, N))
+
+    def exact(start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        Xw, Yw = X[start:start + rows], Y[start:start + rows]
+        return Xw.T @ Xw, Xw.T @ Yw, Yw.T @ Yw
+
+    XtX, XtY, YtY = exact(0)
+    out = 0
+    for start in range(T - window + 1):
+        if start > 0:
+            if start % refresh == 0:
+                XtX, XtY, YtY = exact(start)
+            else:
+                x_old, y_old = X[start - 1], Y[start - 1]
+                x_new, y_new = X[start + rows - 1], Y[start + rows - 1]
+                XtX += np.outer(x_new, x_new) - np.outer(x_old, x_old)
+                XtY += np.outer(x_new, y_new) - np.outer(x_old, y_old)
+                YtY += np.outer(y_new, y_new) - np.outer(y_old, y_old)
+        if start % step:
+            continue
+        B = np.linalg.solve(XtX, XtY)
+        params[out] = B
+        sigmas[out] = (YtY - XtY.T @ B) / dof
+        out += 1
+
+    coefs = var_coefficients(params, lag_order)
+    matrices = np.empty((len(ends), N, N))
+    for lo in range(0, len(ends), chunk_size):
+        hi = lo + chunk_size
+        phis = ma_coefficients(coefs[lo:hi], forecast_horizon)
+        matrices[lo:hi] = spillover_matrix(cholesky_fevd(phis, sigmas[lo:hi]))
+
+    index = dates[ends]
+    columns = list(data.columns)
+    to_others = matrices.sum(axis=-1)
+    from_others = matrices.sum(axis=-2)
+    return RollingSpillover(
+        total=pd.Series(matrices.sum(axis=(-2, -1)) / (N ** 2 - N), index=index, name='total'),
+        to_others=pd.DataFrame(to_others, index=index, columns=columns),
+        from_others=pd.DataFrame(from_others, index=index, columns=columns),
+        net=pd.DataFrame(to_others - from_others, index=index, columns=columns),
+        matrices=matrices,
+    )
+
+
+# =========================
+# BATCHED JOBS OVER SPLITS / LAGS / HORIZONS
+# =========================
+
+class SpilloverJob(NamedTuple):
+    split: str
+    lag_order: int
+    forecast_horizon: int
+
+
+# Per-process view of the shared volatility matrix, set by _attach_shared
+_shared_block: Optional[shared_memory.SharedMemory] = None
+_shared_values: Optional[np.ndarray] = None
+_shared_columns: List[str] = []
+
+
+def _attach_shared(name: str, shape: Tuple[int, int], dtype: str, columns: List[str]) -> None:
+    global _shared_block, _shared_values, _shared_columns
+    _shared_block = shared_memory.SharedMemory(name=name)
+    _shared_values = np.ndarray(shape, dtype=dtype, buffer=_shared_block.buf)
+    _shared_columns = columns
+
+
+def _run_fit(bounds: Tuple[int, int], lag_order: int, horizons: List[int],
+             method: str) -> Dict[int, np.ndarray]:
+    lo, hi = bounds
+    # Zero-copy view of the split; the VAR fit only reads it
+    split_data = pd.DataFrame(_shared_values[lo:hi], columns=_shared_columns, copy=False)  # type: ignore
+    realized_vol_dict = {column: split_data[column] for column in _shared_columns}
+    # One fit serves every requested horizon of this (split, lag_order)
+    model = VARSpilloverModel.fit(realized_vol_dict, lag_order)
+    matrices = spillover_matrices_by_horizon(model.fevd(max(horizons), method))
+    return {horizon: matrices[horizon - 1] for horizon in horizons}
+
+
+def run_spillover_jobs(
+    combined_data: pd.DataFrame,
+    split_bounds: Dict[str, Tuple[int, int]],
+    jobs: Sequence[Tuple[str, int, int]],
+    max_workers: Optional[int] = None,
+    method: str = 'cholesky',
+) -> pd.DataFrame:
+    """
+    Run (split, lag_order, forecast_horizon) spillover jobs across a process pool.
+
+    ``combined_data`` is the aligned date x market volatility matrix and
+    ``split_bounds`` maps split names to [start, stop) row ranges. The matrix
+    is placed in shared memory once, so workers attach to it by name instead
+    of receiving pickled DataFrames. Jobs that differ only in horizon share a
+    single VAR fit. Returns a tidy table with one row per
+    (split, lag_order, forecast_horizon, source, target).
+    """
+    jobs = [SpilloverJob(*job) for job in jobs]
+    columns = [str(column) for column in combined_data.columns]
+    values = np.ascontiguousarray(combined_data.to_numpy(dtype=np.float64))
+
+    fits: Dict[Tuple[str, int], List[int]] = {}
+    for job in jobs:
+        fits.setdefault((job.split, job.lag_order), []).append(job.forecast_horizon)
+    fit_args = [(split_bounds[split], lag, horizons, method) for (split, lag), horizons in fits.items()]
+
+    if max_workers == 1:
+        global _shared_values, _shared_columns
+        _shared_values, _shared_columns = values, columns
+        fitted = [_run_fit(*args) for args in fit_args]
+    else:
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+            init_args = (block.name, values.shape, values.dtype.str, columns)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_shared,
+                                     initargs=init_args) as executor:
+                futures = [executor.submit(_run_fit, *args) for args in fit_args]
+                fitted = [future.result() for future in futures]
+        finally:
+            block.close()
+            block.unlink()
+
+    by_fit = dict(zip(fits, fitted))
+    matrices = [by_fit[(job.split, job.lag_order)][job.forecast_horizon] for job in jobs]
+
+    N = len(columns)
+    source = np.repeat(columns, N)
+    target = np.tile(columns, N)
+    frames = []
+    for job, matrix in zip(jobs, matrices):
+        frames.append(pd.DataFrame({
+            'split': job.split,
+            'lag_order': job.lag_order,
+            'forecast_horizon': job.forecast_horizon,
+            'method': method,
+            'source': source,
+            'target': target,
+            'spillover': matrix.reshape(-1),
+            'total_spillover': matrix.sum() / (N ** 2 - N),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def table_from_results(results: pd.DataFrame, split: str, lag_order: int,
+                       forecast_horizon: int) -> SpilloverTable:
+    """
+    Rebuild one job's SpilloverTable from the tidy output of ``run_spillover_jobs``.
+    """
+    rows = results[(results['split'] == split)
+                   & (results['lag_order'] == lag_order)
+                   & (results['forecast_horizon'] == forecast_horizon)]
+    pairwise = rows.pivot(index='source', columns='target', values='spillover')
+    order = list(dict.fromkeys(rows['source']))
+    return table_from_matrix(pairwise.loc[order, order].to_numpy(), order)
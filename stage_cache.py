@@ -0,0 +1,73 @@
+"""
+On-disk cache of pipeline stage outputs.
+
+Each stage of project.py is keyed by a fingerprint of its code, the
+configuration fields it reads and the fingerprints of the stages it depends
+on, so a key changes exactly when the stage, or anything upstream of it,
+would compute something different. Outputs are pickled to
+``<stage>-<key>.pkl`` with a ``<stage>-<key>.json`` summary next to it;
+older entries of a stage are kept, so switching back to a previous
+configuration is a cache hit too.
+"""
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Optional
+
+DEFAULT_STAGE_CACHE_DIR = '.stage_cache'
+
+
+class StageCache:
+    """
+    Directory of stage outputs addressed by (stage name, fingerprint).
+    """
+
+    def __init__(self, root: str = DEFAULT_STAGE_CACHE_DIR) -> None:
+        self.root = root
+
+    def _path(self, stage: str, key: str, suffix: str) -> str:
+        return os.path.join(self.root, f"{stage}-{key}{suffix}")
+
+    def __contains__(self, entry: Any) -> bool:
+        stage, key = entry
+        return os.path.exists(self._path(stage, key, '.pkl'))
+
+    def load(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Stored outputs, or None on a miss or an entry that no longer unpickles
+        (e.g. a class it references was renamed).
+        """
+        try:
+            with open(self._path(stage, key, '.pkl'), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def store(self, stage: str, key: str, outputs: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        # Write to temporary files and rename, so readers never see a partial entry
+        tmp_path = self._path(stage, key, '.pkl.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(stage, key, '.pkl'))
+
+        summary = dict(meta or {}, stage=stage, key=key, outputs=sorted(outputs), created=time.time())
+        tmp_path = self._path(stage, key, '.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f, default=repr)
+        os.replace(tmp_path, self._path(stage, key, '.json'))
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        Summaries of every stored stage output, newest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        summaries = []
+        for name in os.listdir(self.root):
+            if name.endswith('.json'):
+                with open(os.path.join(self.root, name)) as f:
+                    summaries.append(json.load(f))
+        summaries.sort(key=lambda summary: summary['created'], reverse=True)
+        return summaries
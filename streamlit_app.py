@@ -66,6 +66,51 @@ page = st.sidebar.radio(
     ["📈 Dashboard", "📊 Data Analysis", "🔄 Spillover Analysis", "🤖 Model Training", "📉 Forecasting", "ℹ️ About"]
 )
 
+GCN_PARAM_NAMES = ['Hidden Dim', 'Num Heads', 'Num Layers', 'Learning Rate', 'Dropout Rate']
+MLP_PARAM_NAMES = ['Hidden Dim', 'Learning Rate', 'Dropout Rate']
+
+
+@st.cache_data(ttl=60)
+def load_selected_training_runs() -> dict:  # type: ignore
+    """
+    Model-cache runs of the models project.py selected and exported, by the
+    cache key recorded in the export manifest (the same models the
+    Forecasting page serves).
+    """
+    import json
+    import os
+
+    from inference import DEFAULT_EXPORT_DIR
+    from model_cache import ModelCache
+
+    path = os.path.join(DEFAULT_EXPORT_DIR, 'manifest.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    cache = ModelCache()
+    selected_runs = {}
+    for name, entry in manifest['models'].items():
+        summary = cache.summary(entry['cache_key']) if entry.get('cache_key') else None
+        if summary is not None and summary.get('validation_losses'):
+            selected_runs[name] = summary
+    return selected_runs
+
+
+@st.cache_resource
+def load_forecast_engine():  # type: ignore
+    """
+    Exported models written by project.py, or None before the first export.
+    """
+    import os
+
+    from inference import DEFAULT_EXPORT_DIR, ForecastEngine
+
+    if not os.path.exists(os.path.join(DEFAULT_EXPORT_DIR, 'manifest.json')):
+        return None
+    return ForecastEngine(DEFAULT_EXPORT_DIR)
+
+
 # ==================== DASHBOARD PAGE ====================
 if page == "📈 Dashboard":
     st.markdown('<div class="section-header">Market Overview Dashboard</div>', unsafe_allow_html=True)
@@ -219,48 +264,69 @@ elif page == "🔄 Spillover Analysis":
 elif page == "🤖 Model Training":
     st.markdown('<div class="section-header">Model Training & Evaluation</div>', unsafe_allow_html=True)
     
+    training_runs = load_selected_training_runs()
+    gcn_run = training_runs.get('gcn_gat')
+    mlp_run = training_runs.get('mlp')
+    if not training_runs:
+        st.info("No exported models yet; run project.py to train and export them. Showing sample values.")
+
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### GCN + GAT Model")
         st.write("**Architecture:** Graph Convolutional Network + Graph Attention Network")
-        st.write("**Epochs:** 50")
-        st.write("**Best Validation Loss:** 0.0234")
-        st.write("**Training Time:** ~45 minutes")
+        if gcn_run:
+            st.write(f"**Epochs:** {len(gcn_run['train_losses'])}")
+            st.write(f"**Best Validation Loss:** {min(gcn_run['validation_losses']):.4f}")
+            gcn_params = dict(zip(GCN_PARAM_NAMES, gcn_run['params']))
+        else:
+            st.write("**Epochs:** 50")
+            st.write("**Best Validation Loss:** 0.0234")
+            st.write("**Training Time:** ~45 minutes")
+            gcn_params: dict[str, int | float] = {  # type: ignore
+                'Hidden Dim': 64,
+                'Num Heads': 4,
+                'Num Layers': 3,
+                'Learning Rate': 0.001,
+                'Dropout Rate': 0.3
+            }
         
         st.markdown("#### Hyperparameters")
-        gcn_params: dict[str, int | float] = {  # type: ignore
-            'Hidden Dim': 64,
-            'Num Heads': 4,
-            'Num Layers': 3,
-            'Learning Rate': 0.001,
-            'Dropout Rate': 0.3
-        }
         for param, value in gcn_params.items():  # type: ignore
             st.write(f"- {param}: {value}")
     
     with col2:
         st.markdown("### MLP Model")
         st.write("**Architecture:** Multi-Layer Perceptron (Baseline)")
-        st.write("**Epochs:** 50")
-        st.write("**Best Validation Loss:** 0.0451")
-        st.write("**Training Time:** ~12 minutes")
+        if mlp_run:
+            st.write(f"**Epochs:** {len(mlp_run['train_losses'])}")
+            st.write(f"**Best Validation Loss:** {min(mlp_run['validation_losses']):.4f}")
+            mlp_params = dict(zip(MLP_PARAM_NAMES, mlp_run['params']))
+        else:
+            st.write("**Epochs:** 50")
+            st.write("**Best Validation Loss:** 0.0451")
+            st.write("**Training Time:** ~12 minutes")
+            mlp_params: dict[str, int | float] = {  # type: ignore
+                'Hidden Dim': 128,
+                'Learning Rate': 0.001,
+                'Dropout Rate': 0.5
+            }
         
         st.markdown("#### Hyperparameters")
-        mlp_params: dict[str, int | float] = {  # type: ignore
-            'Hidden Dim': 128,
-            'Learning Rate': 0.001,
-            'Dropout Rate': 0.5
-        }
         for param, value in mlp_params.items():  # type: ignore
             st.write(f"- {param}: {value}")
     
     st.markdown('<div class="section-header">Training History</div>', unsafe_allow_html=True)
     
-    # Generate sample training curves
-    epochs = np.arange(1, 51)
-    train_loss_gcn = 0.5 * np.exp(-epochs / 15) + 0.02 + np.random.randn(50) * 0.01
-    val_loss_gcn = 0.5 * np.exp(-epochs / 15) + 0.03 + np.random.randn(50) * 0.015
+    if gcn_run:
+        train_loss_gcn = np.asarray(gcn_run['train_losses'])
+        val_loss_gcn = np.asarray(gcn_run['validation_losses'])
+        epochs = np.arange(1, len(train_loss_gcn) + 1)
+    else:
+        # Generate sample training curves
+        epochs = np.arange(1, 51)
+        train_loss_gcn = 0.5 * np.exp(-epochs / 15) + 0.02 + np.random.randn(50) * 0.01
+        val_loss_gcn = 0.5 * np.exp(-epochs / 15) + 0.03 + np.random.randn(50) * 0.015
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(  # type: ignore
@@ -301,32 +367,70 @@ elif page == "📉 Forecasting":
         )
     
     with col3:
+        forecast_model = st.selectbox("Model:", ["GCN + GAT", "MLP"])
         st.write("")
         if st.button("📊 Generate Forecast", use_container_width=True):
             st.success("✅ Forecast generated successfully!")
     
-    st.markdown("### Performance Metrics")
-    
-    col1, col2, col3, col4 = st.columns(4)
+    market_names = ["S&P 500", "DAX", "CAC 40", "FTSE 100", "Nifty 50", "Nikkei 225", "KOSPI", "Hang Seng"]
+    engine = load_forecast_engine()
     
-    with col1:
-        st.metric("MAFE", f"{np.random.rand() * 0.05:.4f}", "-0.002")
+    if engine is not None:
+        from metrics import forecast_metrics
+
+        model_name = 'gcn_gat' if forecast_model == "GCN + GAT" else 'mlp'
+        history, history_dates = engine.history()
+        market_index = market_names.index(selected_market)
+        # One-step forecasts made at every day of the stored history, in one batched pass
+        forecasts = engine.rolling_forecasts(model_name, history)
+        forecast_column = forecasts[:, market_index] if forecasts.shape[1] > 1 else forecasts[:, 0]
+        offset = engine.context_rows(model_name) - 1
+        table = forecast_metrics(history[offset:, market_index:market_index + 1],
+                                 forecast_column[:, None], horizons=[forecast_horizon])
+        metric_values = table.set_index('metric')['value']
+    else:
+        st.info("No exported models found; run project.py to export them. Showing sample values.")
     
-    with col2:
-        st.metric("MSE", f"{np.random.rand() * 0.001:.5f}", "-0.0001")
+    st.markdown("### Performance Metrics")
     
-    with col3:
-        st.metric("RMSE", f"{np.random.rand() * 0.015:.4f}", "-0.001")
+    col1, col2, col3, col4 = st.columns(4)
     
-    with col4:
-        st.metric("MAPE", f"{np.random.rand() * 5 + 2:.2f}%", "-0.5%")
+    if engine is not None:
+        with col1:
+            st.metric("MAFE", f"{metric_values['MAFE']:.4f}")
+        with col2:
+            st.metric("MSE", f"{metric_values['MSE']:.5f}")
+        with col3:
+            st.metric("RMSE", f"{metric_values['RMSE']:.4f}")
+        with col4:
+            st.metric("MAPE", f"{metric_values['MAPE']:.2f}%")
+    else:
+        with col1:
+            st.metric("MAFE", f"{np.random.rand() * 0.05:.4f}", "-0.002")
+        
+        with col2:
+            st.metric("MSE", f"{np.random.rand() * 0.001:.5f}", "-0.0001")
+        
+        with col3:
+            st.metric("RMSE", f"{np.random.rand() * 0.015:.4f}", "-0.001")
+        
+        with col4:
+            st.metric("MAPE", f"{np.random.rand() * 5 + 2:.2f}%", "-0.5%")
     
     st.markdown("### Forecast Visualization")
     
-    # Generate forecast data
-    days = np.arange(0, 22)
-    actual = 0.15 + 0.02 * np.sin(days / 5) + np.random.randn(22) * 0.01
-    forecast = 0.15 + 0.02 * np.sin(days / 5) + np.random.randn(22) * 0.008
+    if engine is not None:
+        # Last 22 forecasts against the realized volatility `forecast_horizon` days later
+        actual_series = history[offset + forecast_horizon:, market_index]
+        forecast_series = forecast_column[:len(actual_series)]
+        days = history_dates[offset + forecast_horizon:][-22:] if history_dates else np.arange(22)
+        actual = actual_series[-22:]
+        forecast = forecast_series[-22:]
+    else:
+        # Generate forecast data
+        days = np.arange(0, 22)
+        actual = 0.15 + 0.02 * np.sin(days / 5) + np.random.randn(22) * 0.01
+        forecast = 0.15 + 0.02 * np.sin(days / 5) + np.random.randn(22) * 0.008
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(  # type: ignore
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from backtest import _snapshot_indices, split_chains, walk_forward, walk_forward_folds
+from snapshots import SnapshotDataset
+
+PARAMS = (8, 2, 2, 0.01, 0.0)
+
+
+def make_dataset(num_rows=60, num_markets=3, lookback=4):
+    generator = torch.Generator().manual_seed(0)
+    volatility = torch.rand(num_rows, num_markets, generator=generator)
+    pairs = [(i, j) for i in range(num_markets) for j in range(num_markets) if i != j]
+    edge_index = torch.tensor(pairs, dtype=torch.long).t().contiguous()
+    dates = pd.bdate_range('2024-01-01', periods=num_rows)
+    return SnapshotDataset(volatility, edge_index, lookback=lookback, dates=dates)
+
+
+def test_expanding_folds_tile_the_test_period():
+    folds = walk_forward_folds(50, initial_train=20, test_size=7, start=5)
+
+    assert [(f.test_start, f.test_end) for f in folds] == [(25, 32), (32, 39), (39, 46), (46, 50)]
+    assert [f.index for f in folds] == [0, 1, 2, 3]
+    for fold in folds:
+        assert fold.train_start == 5
+        assert fold.train_end == fold.test_start
+
+
+def test_rolling_folds_keep_the_window():
+    folds = walk_forward_folds(50, initial_train=20, test_size=7, mode='rolling', window=10)
+
+    for fold in folds:
+        assert fold.train_end == fold.test_start
+        assert fold.train_end - fold.train_start == 10
+    with pytest.raises(ValueError):
+        walk_forward_folds(50, initial_train=20, mode='sliding')
+
+
+@pytest.mark.parametrize('num_chains', [1, 3, 4, 20])
+def test_chains_are_contiguous_and_cover_every_fold(num_chains):
+    folds = walk_forward_folds(50, initial_train=20, test_size=3)
+    chains = split_chains(folds, num_chains)
+
+    assert len(chains) == min(num_chains, len(folds))
+    assert [fold for chain in chains for fold in chain] == folds
+    sizes = [len(chain) for chain in chains]
+    assert max(sizes) - min(sizes) <= 1
+
+
+@pytest.mark.parametrize('num_chains', [1, 2])
+def test_predictions_line_up_with_their_target_rows(num_chains):
+    dataset = make_dataset()
+    initial_train = 20
+    result = walk_forward(dataset, PARAMS, initial_train=initial_train, test_size=9, initial_epochs=1,
+                          refit_epochs=1, num_chains=num_chains, max_workers=1, seed=0)
+
+    first_test_row = dataset.target_row(0) + initial_train
+    num_rows = dataset.volatility.shape[0]
+    expected_dates = dataset.dates[first_test_row:num_rows]
+    assert list(result.predictions.index) == list(expected_dates)
+    assert list(result.actuals.index) == list(expected_dates)
+    np.testing.assert_array_equal(result.actuals.to_numpy(), dataset.volatility[first_test_row:].numpy())
+    assert result.predictions.shape == result.actuals.shape
+    assert np.isfinite(result.predictions.to_numpy()).all()
+
+    # Each fold forecasts exactly the snapshots whose targets fall in its block
+    for fold in result.folds.itertuples():
+        indices = _snapshot_indices(dataset, fold.test_start, fold.test_end)
+        targets = dataset.collate(indices).y.view(len(indices), -1).numpy()
+        block = result.actuals.loc[dataset.dates[fold.test_start]:dataset.dates[fold.test_end - 1]]
+        np.testing.assert_array_equal(block.to_numpy(), targets)
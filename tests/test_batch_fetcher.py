@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from batch_fetcher import YahooChartClient, fetch_many
+
+START, END = '2024-01-01', '2024-01-06'
+
+
+def chart_payload():
+    timestamps = [int(ts.timestamp()) for ts in pd.bdate_range(START, '2024-01-05', tz='UTC')]
+    bars = [100.0 + i for i in range(len(timestamps))]
+    quote = {'close': bars, 'high': bars, 'low': bars, 'open': bars, 'volume': [1.0] * len(bars)}
+    return {'chart': {'result': [{'meta': {'gmtoffset': 0}, 'timestamp': timestamps,
+                                  'indicators': {'quote': [quote]}}]}}
+
+
+class FakeChartServer:
+    """
+    Local chart endpoint that fails the first ``failures[symbol]`` requests of
+    a symbol with the given statuses, then serves a payload. Tracks requests
+    per symbol and the most keep-alive connections open at once.
+    """
+
+    def __init__(self, failures, delay=0.0):
+        self.failures = {symbol: list(statuses) for symbol, statuses in failures.items()}
+        self.delay = delay
+        self.requests = {}
+        self.open_connections = 0
+        self.max_open_connections = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.open_connections += 1
+                    server.max_open_connections = max(server.max_open_connections, server.open_connections)
+
+            def finish(self):
+                super().finish()
+                with server.lock:
+                    server.open_connections -= 1
+
+            def do_GET(self):
+                symbol = self.path.split('?')[0].rsplit('/', 1)[-1]
+                with server.lock:
+                    server.requests[symbol] = server.requests.get(symbol, 0) + 1
+                    pending = server.failures.get(symbol, [])
+                    status = pending.pop(0) if pending else 200
+                time.sleep(server.delay)
+                body = json.dumps(chart_payload() if status == 200 else {}).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def test_transient_errors_are_retried():
+    with FakeChartServer({'AAA': [429, 503], 'BBB': [500]}) as server:
+        client = YahooChartClient(base_url=server.url, pool_size=4)
+        result = fetch_many(['AAA', 'BBB', 'CCC'], START, END, download=client.download,
+                            max_workers=4, retries=3, backoff=0.001)
+
+    assert result.errors == {}
+    assert list(result.stock_data) == ['AAA', 'BBB', 'CCC']
+    assert server.requests == {'AAA': 3, 'BBB': 2, 'CCC': 1}
+    assert result.stock_data['AAA']['Close'].iloc[:, 0].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+
+def test_retries_are_bounded():
+    with FakeChartServer({'AAA': [503] * 10}) as server:
+        client = YahooChartClient(base_url=server.url, pool_size=2)
+        result = fetch_many(['AAA', 'BBB'], START, END, download=client.download,
+                            max_workers=2, retries=2, backoff=0.001)
+
+    assert list(result.stock_data) == ['BBB']
+    assert 'HTTP 503' in result.errors['AAA']
+    assert server.requests['AAA'] == 3
+
+
+@pytest.mark.parametrize('pool_size', [1, 3])
+def test_connection_pool_bounds_concurrency(pool_size):
+    symbols = [f'S{i}' for i in range(12)]
+    with FakeChartServer({}, delay=0.05) as server:
+        client = YahooChartClient(base_url=server.url, pool_size=pool_size)
+        result = fetch_many(symbols, START, END, download=client.download, max_workers=8, backoff=0.001)
+        client.session.close()
+
+    assert list(result.stock_data) == symbols
+    assert 1 <= server.max_open_connections <= pool_size
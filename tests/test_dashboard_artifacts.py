@@ -0,0 +1,55 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard_artifacts import ArtifactStore, write_dashboard_artifacts
+
+
+def strict_loads(body):
+    # Like a browser's JSON.parse: NaN / Infinity are not JSON
+    def reject(constant):
+        raise ValueError(f"invalid JSON constant {constant}")
+
+    return json.loads(body, parse_constant=reject)
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    dates = pd.bdate_range('2024-01-01', periods=5)
+    prices = pd.DataFrame({'A': [1.0, 2.0, np.nan, 4.0, 5.0], 'B': 3.0, 'C': 1.0}, index=dates)
+    volatility = {
+        'A': pd.Series([0.1, 0.3, 0.2, np.inf, 0.4], index=dates),
+        'B': pd.Series([np.nan, np.nan, np.nan, np.nan, 0.2], index=dates),  # one point: std is NaN
+        'C': pd.Series(0.5, index=dates),                                    # constant: no correlation
+    }
+    correlations = pd.DataFrame(volatility).replace(np.inf, np.nan).corr()
+    directory = str(tmp_path / 'artifacts')
+    write_dashboard_artifacts(directory, prices, volatility, correlations.drop(index='A'))
+    return directory
+
+
+def test_payloads_are_strict_json(artifacts):
+    for root, _, files in os.walk(artifacts):
+        for name in files:
+            with open(os.path.join(root, name)) as f:
+                strict_loads(f.read())
+
+
+def test_missing_values_are_null(artifacts):
+    store = ArtifactStore(artifacts)
+
+    statistics = {row['ticker']: row for row in strict_loads(store.get('statistics').body)}
+    assert statistics['B']['std'] is None
+    assert statistics['B']['mean'] == pytest.approx(0.2)
+    assert strict_loads(store.get('volatility', 'B').body)['std'] is None
+
+    correlations = strict_loads(store.get('correlations').body)
+    assert correlations['tickers'] == ['A', 'B', 'C']
+    assert correlations['matrix'][0] == [None, None, None]   # row missing from the input frame
+    assert correlations['matrix'][2][2] is None
+
+    assert strict_loads(store.get('volatility', 'A').body)['volatility'][3] is None
+    assert strict_loads(store.get('prices', 'A').body)['prices'] == [1.0, 2.0, 4.0, 5.0]
@@ -0,0 +1,62 @@
+import pandas as pd
+
+from data_store import ColumnarDataStore
+
+
+class CountingFetcher:
+    """
+    Fetcher that serves ``bars`` inside the requested range and counts calls.
+    """
+
+    def __init__(self, bars: pd.DataFrame) -> None:
+        self.bars = bars
+        self.calls = []
+
+    def __call__(self, symbol, start, end):
+        self.calls.append((start, end))
+        mask = (self.bars.index >= pd.Timestamp(start)) & (self.bars.index < pd.Timestamp(end))
+        return self.bars.loc[mask]
+
+
+def make_bars(start, end):
+    index = pd.bdate_range(start, end, name='Date')
+    return pd.DataFrame({'Close': range(len(index)), 'Volume': 1.0}, index=index, dtype=float)
+
+
+def test_empty_fetch_is_covered(tmp_path):
+    fetcher = CountingFetcher(make_bars('2024-01-01', '2024-01-01').iloc[:0])
+    store = ColumnarDataStore(str(tmp_path), fetcher=fetcher)
+
+    assert store.get('X', '2024-01-01', '2024-01-10').empty
+    assert len(fetcher.calls) == 1
+    store.get('X', '2024-01-01', '2024-01-10')
+    assert len(fetcher.calls) == 1
+
+
+def test_empty_tail_is_not_refetched(tmp_path):
+    # Bars stop on Friday Jan 5; the tail up to Jan 20 has no rows
+    fetcher = CountingFetcher(make_bars('2024-01-01', '2024-01-05'))
+    store = ColumnarDataStore(str(tmp_path), fetcher=fetcher)
+
+    store.get('X', '2024-01-01', '2024-01-08')
+    data = store.get('X', '2024-01-01', '2024-01-20')
+    assert fetcher.calls == [('2024-01-01', '2024-01-08'), ('2024-01-08', '2024-01-20')]
+    assert len(data) == 5
+    assert store.covered_range('X') == (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-20'))
+
+    data = store.get('X', '2024-01-01', '2024-01-20')
+    assert len(fetcher.calls) == 2
+    assert len(data) == 5
+
+
+def test_failed_fetch_is_retried(tmp_path):
+    calls = []
+
+    def unavailable(symbol, start, end):
+        calls.append((start, end))
+        return None
+
+    store = ColumnarDataStore(str(tmp_path), fetcher=unavailable)
+    assert store.get('X', '2024-01-01', '2024-01-10') is None
+    assert store.get('X', '2024-01-01', '2024-01-10') is None
+    assert len(calls) == 2
@@ -0,0 +1,61 @@
+import itertools
+
+import pytest
+import torch
+from torch_geometric.data import Data
+
+from ensemble import train_stacked_mlp
+
+
+def make_data(T, seed, N=4):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.cumsum(torch.randn(T, N, generator=generator), dim=0) * 0.1
+    return Data(x=x)
+
+
+@pytest.fixture(scope='module')
+def datasets():
+    return make_data(80, 0), make_data(40, 1)
+
+
+def test_groups_follow_the_halving_rungs(datasets):
+    train_data, validation_data = datasets
+    grid = list(itertools.product((8, 16), (0.001, 0.005, 0.01), (0.0, 0.2, 0.4)))
+    results = train_stacked_mlp(grid, train_data, validation_data, num_epochs=50, seed=0)
+
+    for hidden_dim in (8, 16):
+        epochs = sorted(len(r.validation_losses) for r in results if r.params[0] == hidden_dim)
+        assert epochs == [5] * 6 + [15] * 2 + [50]
+    assert not any(r.stopped_early for r in results)
+
+
+def test_dropped_members_leave_survivors_unchanged(datasets):
+    train_data, validation_data = datasets
+    # No dropout, so the only randomness is the shared initialization
+    grid = [(16, 0.05, 0.0), (16, 0.001, 0.0), (16, 0.0001, 0.0)]
+    full = train_stacked_mlp(grid, train_data, validation_data, num_epochs=12, min_epochs=12, seed=0)
+    halved = train_stacked_mlp(grid, train_data, validation_data, num_epochs=12, min_epochs=2, seed=0)
+
+    survivors = [i for i, result in enumerate(halved) if len(result.validation_losses) == 12]
+    assert len(survivors) == 1
+    survivor = survivors[0]
+    assert halved[survivor].validation_losses == pytest.approx(full[survivor].validation_losses, rel=1e-5)
+    for name, value in halved[survivor].last_state_dict.items():
+        torch.testing.assert_close(value, full[survivor].last_state_dict[name])
+
+    for i, result in enumerate(halved):
+        assert result.validation_losses == pytest.approx(full[i].validation_losses[:len(result.validation_losses)],
+                                                         rel=1e-5)
+
+
+def test_patience_stops_members(datasets):
+    train_data, validation_data = datasets
+    grid = [(16, 0.05, 0.0), (16, 0.0001, 0.0)]
+    results = train_stacked_mlp(grid, train_data, validation_data, num_epochs=40, min_epochs=40,
+                                patience=3, seed=0)
+
+    stopped = [result for result in results if result.stopped_early]
+    assert stopped
+    for result in stopped:
+        assert len(result.validation_losses) < 40
+        assert result.last_state_dict is not None
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import torch
+
+import metrics
+from metrics import forecast_metrics, metric_tensor
+
+HORIZONS = (1, 5, 10, 22)
+
+
+def reference_metrics(actuals, predictions, horizon):
+    # One market at a time, the way project.py used to score forecasts
+    rows = min(len(predictions), len(actuals) - horizon)
+    values = []
+    for market in range(actuals.shape[1]):
+        column = min(market, predictions.shape[1] - 1)
+        target = actuals[horizon:horizon + rows, market]
+        error = np.abs(predictions[:rows, column] - target)
+        nonzero = target != 0
+        mse = np.mean(error ** 2)
+        values.append([error.mean(), mse, np.sqrt(mse), np.mean(error[nonzero] / np.abs(target[nonzero])) * 100])
+    return np.array(values)
+
+
+@pytest.fixture
+def panel():
+    generator = np.random.default_rng(0)
+    actuals = generator.random((120, 6))
+    actuals[generator.random(actuals.shape) < 0.1] = 0
+    return actuals, generator.random((110, 6))
+
+
+@pytest.mark.parametrize('chunk_elements', [1 << 22, 7])
+def test_matches_per_market_reference(panel, monkeypatch, chunk_elements):
+    monkeypatch.setattr(metrics, 'CHUNK_ELEMENTS', chunk_elements)
+    actuals, predictions = panel
+    values = metric_tensor(actuals, predictions, HORIZONS).numpy()
+
+    assert values.shape == (len(HORIZONS), 6, 4)
+    for position, horizon in enumerate(HORIZONS):
+        np.testing.assert_allclose(values[position], reference_metrics(actuals, predictions, horizon), rtol=1e-12)
+
+
+def test_batches_and_broadcast_forecasts(panel):
+    actuals, predictions = panel
+    batch = np.stack([predictions, predictions[::-1].copy()])
+    values = metric_tensor(actuals, batch, HORIZONS).numpy()
+    for model in range(2):
+        np.testing.assert_allclose(values[model], metric_tensor(actuals, batch[model], HORIZONS).numpy())
+
+    single = predictions[:, :1]
+    np.testing.assert_allclose(metric_tensor(actuals, single, [1]).numpy()[0],
+                               reference_metrics(actuals, single, 1), rtol=1e-12)
+
+
+def test_keeps_the_input_dtype(panel):
+    actuals, predictions = panel
+    values = metric_tensor(actuals.astype(np.float32), predictions.astype(np.float32), HORIZONS)
+
+    assert values.dtype == torch.float32
+    np.testing.assert_allclose(values.numpy(), metric_tensor(actuals, predictions, HORIZONS).numpy(), rtol=1e-4)
+
+
+def test_horizon_past_the_data_is_nan(panel):
+    actuals, predictions = panel
+    table = forecast_metrics(actuals, predictions, horizons=[1, 500])
+
+    assert table.loc[table['horizon'] == 500, 'value'].isna().all()
+    assert table.loc[table['horizon'] == 1, 'value'].notna().all()
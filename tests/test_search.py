@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+import torch
+from torch_geometric.data import Data
+
+from ensemble import train_stacked_mlp
+from model_cache import ModelCache
+from search import MODEL_BUILDERS, best_result_index, run_search, train_config, training_key
+
+NUM_EPOCHS = 12
+
+
+def make_data(T, seed, N=4):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.cumsum(torch.randn(T, N, generator=generator), dim=0) * 0.1
+    edges = [(i, j) for i in range(N) for j in range(N) if i != j]
+    return Data(x=x, edge_index=torch.tensor(edges, dtype=torch.long).t().contiguous())
+
+
+@pytest.fixture(scope='module')
+def datasets():
+    return make_data(80, 0), make_data(40, 1)
+
+
+def validation_loss(model_name, params, state_dict, data):
+    model, _ = MODEL_BUILDERS[model_name](params, data.x.shape[1])
+    model.load_state_dict(state_dict)
+    model.eval()
+    with torch.no_grad():
+        return torch.nn.MSELoss()(model(data)[:-1], data.x[1:]).item()
+
+
+# A learning rate high enough that validation loss overshoots after its minimum
+@pytest.mark.parametrize('model_name, params', [
+    ('gcn_gat', (16, 2, 2, 0.05, 0.0)),
+    ('mlp', (16, 0.05, 0.0)),
+])
+def test_result_holds_best_epoch_weights(datasets, model_name, params):
+    train_data, validation_data = datasets
+    result = train_config(model_name, params, train_data, validation_data, num_epochs=NUM_EPOCHS, seed=0)
+
+    best_epoch = int(np.argmin(result.validation_losses))
+    assert best_epoch < len(result.validation_losses) - 1
+    assert result.validation_losses[-1] > result.best_validation_loss
+
+    assert validation_loss(model_name, params, result.state_dict, validation_data) == \
+        pytest.approx(result.best_validation_loss, rel=1e-5)
+    assert validation_loss(model_name, params, result.last_state_dict, validation_data) == \
+        pytest.approx(result.validation_losses[-1], rel=1e-5)
+
+
+def test_resume_continues_from_last_epoch(datasets):
+    train_data, validation_data = datasets
+    params = (16, 2, 2, 0.05, 0.0)
+    straight = train_config('gcn_gat', params, train_data, validation_data, num_epochs=NUM_EPOCHS, seed=0)
+    first = train_config('gcn_gat', params, train_data, validation_data, num_epochs=NUM_EPOCHS // 2, seed=0)
+    resumed = train_config('gcn_gat', params, train_data, validation_data, num_epochs=NUM_EPOCHS,
+                           resume=first, seed=0)
+
+    assert resumed.validation_losses == pytest.approx(straight.validation_losses, rel=1e-5)
+    assert validation_loss('gcn_gat', params, resumed.state_dict, validation_data) == \
+        pytest.approx(straight.best_validation_loss, rel=1e-5)
+
+
+def test_selected_weights_match_winning_loss(datasets):
+    train_data, validation_data = datasets
+    grid = [(16, 0.05, 0.0), (16, 0.001, 0.0), (32, 0.05, 0.0)]
+    for results in (run_search('mlp', grid, train_data, validation_data, num_epochs=NUM_EPOCHS,
+                               max_workers=1, seed=0),
+                    train_stacked_mlp(grid, train_data, validation_data, num_epochs=NUM_EPOCHS, seed=0)):
+        best = results[best_result_index(results)]
+        assert validation_loss('mlp', best.params, best.state_dict, validation_data) == \
+            pytest.approx(best.best_validation_loss, rel=1e-5)
+
+
+def test_cache_key_covers_the_model_width(tmp_path):
+    params = (16, 2, 2, 0.05, 0.0)
+    keys = {training_key('gcn_gat', params, N, 'data', NUM_EPOCHS, 0) for N in (4, 6)}
+    assert len(keys) == 2
+
+    # A stored run of a wider panel loads into the model built for that panel
+    train_data, validation_data = make_data(40, 0, N=6), make_data(20, 1, N=6)
+    cache = ModelCache(str(tmp_path))
+    trained, = run_search('gcn_gat', [params], train_data, validation_data, num_epochs=2, max_workers=1,
+                          seed=0, cache=cache)
+    loaded, = run_search('gcn_gat', [params], train_data, validation_data, num_epochs=2, max_workers=1,
+                         seed=0, cache=cache)
+    assert loaded.cache_key == trained.cache_key
+    assert validation_loss('gcn_gat', params, loaded.state_dict, validation_data) == \
+        pytest.approx(trained.best_validation_loss, rel=1e-5)
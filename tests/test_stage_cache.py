@@ -0,0 +1,76 @@
+import importlib
+import sys
+import textwrap
+
+import project
+from fingerprints import code_fingerprint
+from stage_cache import StageCache
+
+
+def write_module(directory, name, source):
+    (directory / f"{name}.py").write_text(textwrap.dedent(source))
+
+
+def load_stage(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ('toy_stage', 'toy_model', 'toy_kernels'):
+        sys.modules.pop(name, None)
+    importlib.invalidate_caches()
+    return importlib.import_module('toy_stage').run
+
+
+def test_code_fingerprint_covers_helpers_and_imported_modules(tmp_path, monkeypatch):
+    write_module(tmp_path, 'toy_kernels', "def kernel(x):\n    return x + 1\n")
+    write_module(tmp_path, 'toy_model', "from toy_kernels import kernel\n\ndef fit(x):\n    return kernel(x)\n")
+    write_module(tmp_path, 'toy_unused', "VALUE = 1\n")
+    write_module(tmp_path, 'toy_stage', """
+        def helper(x):
+            from toy_model import fit
+            return fit(x)
+
+        def run(x):
+            return helper(x)
+    """)
+    baseline = code_fingerprint(load_stage(tmp_path, monkeypatch))
+
+    write_module(tmp_path, 'toy_unused', "VALUE = 2\n")
+    assert code_fingerprint(load_stage(tmp_path, monkeypatch)) == baseline
+
+    # A module imported by a module imported by a helper of the stage
+    write_module(tmp_path, 'toy_kernels', "def kernel(x):\n    return x + 2\n")
+    changed = code_fingerprint(load_stage(tmp_path, monkeypatch))
+    assert changed != baseline
+
+    write_module(tmp_path, 'toy_stage', """
+        def helper(x):
+            from toy_model import fit
+            return fit(x) * 2
+
+        def run(x):
+            return helper(x)
+    """)
+    assert code_fingerprint(load_stage(tmp_path, monkeypatch)) != changed
+
+
+def test_cached_stage_rewrites_its_files(tmp_path, monkeypatch):
+    calls = []
+    output_file = tmp_path / 'values.txt'
+
+    def make(config):
+        calls.append('make')
+        return {'values': [1, 2, 3]}
+
+    def publish_make(config, outputs):
+        output_file.write_text(' '.join(map(str, outputs['values'])))
+
+    monkeypatch.setattr(project, 'STAGES', {'make': project.Stage(make, publish=publish_make)})
+    config = project.PipelineConfig(plots='none')
+    cache = StageCache(str(tmp_path / 'cache'))
+
+    project.run_pipeline(['make'], config, cache=cache)
+    output_file.unlink()
+    results = project.run_pipeline(['make'], config, cache=cache)
+
+    assert calls == ['make']
+    assert results['make'] == {'values': [1, 2, 3]}
+    assert output_file.read_text() == '1 2 3'
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from project import calculate_realized_volatility
+from volatility import StreamingRealizedVolatility, realized_volatility_panel
+
+
+def random_closes(T, N, seed=0, scale=0.01):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, scale, size=(T, N)), axis=0))
+
+
+def stream(closes, window):
+    streamer = StreamingRealizedVolatility([f'T{i}' for i in range(closes.shape[1])], window)
+    return np.array([streamer.update(row) for row in closes])
+
+
+def test_streaming_matches_batch_including_warm_up():
+    closes = random_closes(300, 4)
+    for window in (1, 5, 21):
+        streamed = stream(closes, window)
+        batch = realized_volatility_panel(closes, windows=(window,))[window]
+        # First `window` rows have no full window of returns yet
+        assert np.isnan(streamed[:window]).all()
+        # The panel takes differences of prefix sums, which cancel a few digits
+        assert np.allclose(streamed, batch, rtol=1e-7, atol=0.0, equal_nan=True)
+
+
+def test_streaming_matches_pandas_per_ticker():
+    closes = random_closes(500, 3, seed=1)
+    for window in (1, 5, 21):
+        streamed = stream(closes, window)
+        for i in range(closes.shape[1]):
+            expected = calculate_realized_volatility(pd.DataFrame({'Close': closes[:, i]}), window=window)
+            assert np.allclose(streamed[expected.index, i], expected.to_numpy(), rtol=1e-12, atol=0.0)
+            assert np.isnan(np.delete(streamed[:, i], expected.index)).all()
+
+
+def test_streaming_skips_windows_with_missing_closes():
+    closes = random_closes(120, 2, seed=2)
+    closes[50, 0] = np.nan
+    streamed = stream(closes, 10)
+    batch = realized_volatility_panel(closes, windows=(10,))[10]
+    assert np.allclose(streamed, batch, rtol=1e-7, atol=0.0, equal_nan=True)
+    # Returns into and out of the gap are missing, so those windows are NaN
+    assert np.isnan(streamed[50:61, 0]).all()
+    assert not np.isnan(streamed[50:61, 1]).any()
+
+
+def test_long_series_keeps_precision():
+    # A crash-sized return followed by a long calm stretch: without the
+    # compensated sum, removing the large squared return leaves rounding
+    # error that dwarfs the tiny ones still in the window
+    T, window = 200_000, 21
+    rng = np.random.default_rng(3)
+    returns = rng.normal(0, 1e-5, size=(T, 1))
+    returns[1000] = 0.5
+    returns[100_000] = -0.4
+    closes = 100 * np.cumprod(1 + returns, axis=0)
+
+    streamed = stream(closes, window)
+    expected = calculate_realized_volatility(pd.DataFrame({'Close': closes[:, 0]}), window=window)
+    assert np.allclose(streamed[expected.index, 0], expected.to_numpy(), rtol=1e-9, atol=0.0)
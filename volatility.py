@@ -0,0 +1,158 @@
+"""
+Panel-wide realized volatility.
+
+Works on a single (T x N) float array of close prices, so all tickers and
+all rolling windows are computed together with one cumulative sum instead
+of a pandas ``pct_change`` / ``rolling`` pipeline per ticker.
+"""
+from typing import Dict, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def close_panel(stock_data: Mapping[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Date x ticker frame of close prices from the per-ticker OHLCV frames.
+    Works for both flat and (Price, Ticker) column layouts.
+    """
+    closes = {
+        ticker: pd.Series(np.asarray(data['Close'], dtype=np.float64).reshape(-1), index=data.index)
+        for ticker, data in stock_data.items()
+    }
+    return pd.DataFrame(closes)
+
+
+def realized_volatility_panel(closes: np.ndarray, windows: Sequence[int] = (21,)) -> Dict[int, np.ndarray]:
+    """
+    Realized volatility sqrt(sum of squared simple returns) over each window.
+
+    ``closes`` is a (T x N) array. Returns one (T x N) array per window where
+    row t covers returns t - window + 1 .. t; rows without a full window of
+    valid returns are NaN, matching ``rolling(window).sum()``.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    if closes.ndim == 1:
+        closes = closes[:, None]
+    T, N = closes.shape
+
+    squared_returns = np.full((T, N), np.nan)
+    np.divide(closes[1:], closes[:-1], out=squared_returns[1:])
+    squared_returns[1:] -= 1.0
+    np.square(squared_returns, out=squared_returns)
+
+    valid = ~np.isnan(squared_returns)
+    # Only row 0 (no previous close) is missing in the usual gap-filled panel;
+    # then a window is complete exactly when it starts after row 0 and the
+    # per-window count of valid returns does not need to be tracked
+    gap_free = bool(valid[1:].all())
+    if not gap_free:
+        np.copyto(squared_returns, 0.0, where=~valid)
+    else:
+        squared_returns[0] = 0.0
+
+    # Prefix sums with a leading zero row: window sum = csum[t + 1] - csum[t + 1 - w]
+    csum = np.zeros((T + 1, N))
+    np.cumsum(squared_returns, axis=0, out=csum[1:])
+    if not gap_free:
+        ccount = np.zeros((T + 1, N), dtype=np.int32)
+        np.cumsum(valid, axis=0, out=ccount[1:])
+
+    results: Dict[int, np.ndarray] = {}
+    for window in windows:
+        realized_volatility = np.full((T, N), np.nan)
+        if window < T:
+            sums = csum[window + 1:] - csum[1:-window]
+            # Differences of prefix sums can dip a hair below zero
+            np.maximum(sums, 0.0, out=sums)
+            np.sqrt(sums, out=sums)
+            if gap_free:
+                realized_volatility[window:] = sums
+            else:
+                counts = ccount[window + 1:] - ccount[1:-window]
+                realized_volatility[window:] = np.where(counts == window, sums, np.nan)
+        results[window] = realized_volatility
+    return results
+
+
+def realized_volatility_frame(closes: pd.DataFrame, windows: Sequence[int] = (21,)) -> Dict[int, pd.DataFrame]:
+    """
+    DataFrame wrapper around ``realized_volatility_panel`` keeping dates and tickers.
+    """
+    panels = realized_volatility_panel(closes.to_numpy(dtype=np.float64), windows)
+    return {
+        window: pd.DataFrame(values, index=closes.index, columns=closes.columns)
+        for window, values in panels.items()
+    }
+
+
+class StreamingRealizedVolatility:
+    """
+    Incremental realized volatility for live bars.
+
+    Keeps a ring buffer of the last ``window`` squared returns per ticker and a
+    compensated running sum, so each new close updates every ticker in O(1)
+    and yields the same values as ``calculate_realized_volatility`` over the
+    same history.
+    """
+
+    def __init__(self, tickers: Sequence[str], window: int = 21) -> None:
+        self.tickers = list(tickers)
+        self.window = window
+        n = len(self.tickers)
+        self._buffer = np.zeros((window, n))
+        self._valid = np.zeros((window, n), dtype=bool)
+        self._pos = 0
+        self._sum = np.zeros(n)
+        # Kahan compensation terms, as pandas' rolling sum keeps them
+        self._comp_add = np.zeros(n)
+        self._comp_remove = np.zeros(n)
+        self._count = np.zeros(n, dtype=np.int64)
+        self._last_close = np.full(n, np.nan)
+
+    @classmethod
+    def from_history(cls, closes: pd.DataFrame, window: int = 21) -> 'StreamingRealizedVolatility':
+        """
+        Build a streamer warmed up on a date x ticker frame of past closes.
+        """
+        streamer = cls(list(closes.columns), window)
+        for row in closes.to_numpy(dtype=np.float64):
+            streamer.update(row)
+        return streamer
+
+    def _kahan(self, values: np.ndarray, comp: np.ndarray, mask: np.ndarray) -> None:
+        y = np.where(mask, values - comp, 0.0)
+        t = self._sum + y
+        comp[:] = np.where(mask, (t - self._sum) - y, comp)
+        self._sum[:] = t
+
+    def update(self, closes: Sequence[float]) -> np.ndarray:
+        """
+        Push one close per ticker (in ``tickers`` order) and return the
+        updated realized volatility vector (NaN until a full window is seen).
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        squared_returns = (closes / self._last_close - 1.0) ** 2
+        valid = ~np.isnan(squared_returns)
+        self._last_close = closes
+
+        # Drop the oldest squared return, then add the newest one
+        leaving = self._valid[self._pos]
+        self._kahan(-self._buffer[self._pos], self._comp_remove, leaving)
+        self._count -= leaving
+        self._kahan(squared_returns, self._comp_add, valid)
+        self._count += valid
+
+        self._buffer[self._pos] = np.where(valid, squared_returns, 0.0)
+        self._valid[self._pos] = valid
+        self._pos = (self._pos + 1) % self.window
+        return self.current
+
+    @property
+    def current(self) -> np.ndarray:
+        return np.where(
+            self._count == self.window, np.sqrt(np.maximum(self._sum, 0.0)), np.nan
+        )
+
+    def current_series(self) -> pd.Series:
+        return pd.Series(self.current, index=self.tickers)